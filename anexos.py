@@ -0,0 +1,62 @@
+# anexos.py
+# ------------------------------------------------------------
+# Cache de anexos já codificados (base64) para os e-mails
+# - Cada arquivo é lido e codificado uma única vez
+# - Mensagens diferentes recebem uma parte MIME nova, mas todas
+#   apontam para o MESMO payload base64 (sem recodificar)
+# - Se o arquivo mudar no disco (mtime/tamanho), o cache é refeito
+# - Arquivos grandes são lidos via mmap (sem cópia extra em memória)
+# ------------------------------------------------------------
+
+import base64
+import mmap
+import os
+import threading
+from email.mime.base import MIMEBase
+
+# Acima disso o arquivo é mapeado em memória em vez de lido inteiro
+LIMITE_MMAP = 1024 * 1024  # 1 MB
+
+
+class CacheAnexos:
+    def __init__(self):
+        self._cache = {}   # caminho -> (mtime_ns, tamanho, payload_base64)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _codificar(caminho: str, tamanho: int) -> str:
+        with open(caminho, "rb") as f:
+            if tamanho >= LIMITE_MMAP:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return base64.encodebytes(mm).decode("ascii")
+            return base64.encodebytes(f.read()).decode("ascii")
+
+    def payload(self, caminho: str) -> str:
+        """Conteúdo em base64 (linhas de 76 colunas, como o email.encoders gera)."""
+        st = os.stat(caminho)
+        with self._lock:
+            atual = self._cache.get(caminho)
+            if atual and atual[0] == st.st_mtime_ns and atual[1] == st.st_size:
+                return atual[2]
+            codificado = self._codificar(caminho, st.st_size)
+            self._cache[caminho] = (st.st_mtime_ns, st.st_size, codificado)
+            return codificado
+
+    def parte(self, caminho: str, nome_arquivo: str, subtipo: str = "pdf") -> MIMEBase:
+        """Parte MIME pronta para msg.attach(), reaproveitando o payload do cache."""
+        part = MIMEBase("application", subtipo)
+        part.set_payload(self.payload(caminho))
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header("Content-Disposition", "attachment", filename=nome_arquivo)
+        return part
+
+    def invalidar(self, caminho: str = None):
+        with self._lock:
+            if caminho is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(caminho, None)
+
+
+# Cache único do processo
+cache_anexos = CacheAnexos()
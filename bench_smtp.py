@@ -0,0 +1,94 @@
+# bench_smtp.py
+# ------------------------------------------------------------
+# Benchmark: uma conexão SMTP por e-mail (jeito antigo) x PoolSMTP
+#
+# Sobe um servidor SMTP local (aiosmtpd) que só descarta as mensagens
+# e mede e-mails/segundo nos dois modos.
+#
+#   pip install aiosmtpd
+#   python bench_smtp.py --mensagens 200 --pool 4
+#   python bench_smtp.py --mensagens 200 --pool 4 --latencia-ms 20
+#
+# O servidor local não tem TLS nem login; em produção (Gmail) cada
+# conexão nova ainda paga STARTTLS + AUTH, então o ganho real é maior.
+# ------------------------------------------------------------
+
+import argparse
+import smtplib
+import time
+
+from smtp_pool import PoolSMTP
+
+REMETENTE = "bench@phoenix.local"
+DESTINO = "cliente@phoenix.local"
+
+
+def _mensagem(i: int, tamanho_kb: int) -> str:
+    corpo = "\r\n".join(["x" * 76] * (tamanho_kb * 1024 // 78))
+    return f"Subject: bench {i}\r\nFrom: {REMETENTE}\r\nTo: {DESTINO}\r\n\r\n{corpo}\r\n"
+
+
+def _subir_servidor(porta: int, latencia_ms: int):
+    import asyncio
+    from aiosmtpd.controller import Controller
+
+    class Handler:
+        # simula o RTT de um provedor real a cada mensagem aceita
+        async def handle_DATA(self, server, session, envelope):
+            if latencia_ms:
+                await asyncio.sleep(latencia_ms / 1000)
+            return "250 OK"
+
+    controller = Controller(Handler(), hostname="127.0.0.1", port=porta)
+    controller.start()
+    return controller
+
+
+def bench_conexao_por_email(porta: int, mensagens: list) -> float:
+    t0 = time.perf_counter()
+    for m in mensagens:
+        server = smtplib.SMTP("127.0.0.1", porta)
+        server.sendmail(REMETENTE, [DESTINO], m)
+        server.quit()
+    return time.perf_counter() - t0
+
+
+def bench_pool(porta: int, mensagens: list, tamanho: int) -> float:
+    pool = PoolSMTP("127.0.0.1", porta, tamanho=tamanho, starttls=False)
+    t0 = time.perf_counter()
+    resultados = pool.enviar_lote([(REMETENTE, [DESTINO], m) for m in mensagens])
+    dt = time.perf_counter() - t0
+    pool.fechar()
+    falhas = [r for r in resultados if not r[0]]
+    if falhas:
+        raise RuntimeError(f"{len(falhas)} falhas no pool: {falhas[0][1]}")
+    return dt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do PoolSMTP contra um SMTP local.")
+    parser.add_argument("--mensagens", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--tamanho-kb", type=int, default=20)
+    parser.add_argument("--porta", type=int, default=8025)
+    parser.add_argument("--latencia-ms", type=int, default=0, help="atraso simulado por mensagem no servidor")
+    args = parser.parse_args()
+
+    mensagens = [_mensagem(i, args.tamanho_kb) for i in range(args.mensagens)]
+    controller = _subir_servidor(args.porta, args.latencia_ms)
+    try:
+        t_antigo = bench_conexao_por_email(args.porta, mensagens)
+        t_pool1 = bench_pool(args.porta, mensagens, 1)
+        t_pool = bench_pool(args.porta, mensagens, args.pool)
+    finally:
+        controller.stop()
+
+    n = args.mensagens
+    print(f"{n} mensagens de {args.tamanho_kb} KB")
+    print(f"  conexão por e-mail : {t_antigo:7.3f}s  ({n / t_antigo:8.1f} msg/s)")
+    print(f"  pool (1 conexão)   : {t_pool1:7.3f}s  ({n / t_pool1:8.1f} msg/s)  x{t_antigo / t_pool1:.1f}")
+    print(f"  pool ({args.pool} conexões)  : {t_pool:7.3f}s  ({n / t_pool:8.1f} msg/s)  x{t_antigo / t_pool:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 
 import os
+import json
+import sqlite3
 import time
+import threading
 import requests
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+from telegram_envio import AgendadorTelegram
 
 # ============================================================
 # CONFIGURAÇÕES
@@ -23,39 +31,152 @@ GRUPOS = {
 
 
 
-BASE_API = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+# TELEGRAM_API_URL permite apontar para um servidor fake local nos testes
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+BASE_API = f"{TELEGRAM_API_URL}/bot{TELEGRAM_TOKEN}"
+
+# Long polling: o Telegram segura o getUpdates até chegar algo (ou estourar o timeout)
+LONG_POLL_TIMEOUT = int(os.getenv("LONG_POLL_TIMEOUT", 50))
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+# Cache de clientes (evita ida ao Supabase no /start e no VALIDAR ACESSO)
+CACHE_TTL = int(os.getenv("BOT_CACHE_TTL", 600))
+CACHE_MAX = int(os.getenv("BOT_CACHE_MAX", 20000))
+PREFETCH_PAGINA = 1000
+
+# Processamento concorrente dos updates
+WORKERS = int(os.getenv("BOT_WORKERS", 16))
+MAX_EM_VOO = int(os.getenv("BOT_MAX_EM_VOO", 200))
+# Updates já confirmados ao Telegram e ainda não concluídos (reprocessados se o bot cair)
+ARQUIVO_PENDENTES = os.getenv(
+    "BOT_PENDENTES_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot_pendentes.sqlite3")
+)
+
+# Threads que fazem as chamadas de saída (sendMessage, ban…) já limitadas por taxa
+ENVIO_WORKERS = int(os.getenv("BOT_ENVIO_WORKERS", 8))
+
+# Sessão HTTP única com keep-alive (Telegram + Supabase reaproveitam a conexão TLS)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 
 # ============================================================
 # FUNÇÕES DE SUPABASE
 # ============================================================
+SUPABASE_HEADERS = {
+    "apikey": SUPABASE_KEY,
+    "Authorization": f"Bearer {SUPABASE_KEY}"
+}
+
+
+class CacheClientes:
+    """Cache em memória com TTL e despejo LRU (clientes por id)."""
+
+    def __init__(self, ttl=CACHE_TTL, max_itens=CACHE_MAX):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()   # id -> (expira_em, cliente)
+        self._lock = threading.Lock()
+
+    def get(self, cliente_id):
+        chave = str(cliente_id)
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return item[1]
+
+    def put(self, cliente):
+        chave = str(cliente["id"])
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, cliente)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def __len__(self):
+        return len(self._itens)
+
+
+CACHE = CacheClientes()
+
+
 def supabase_get_client(cliente_id):
-    """Busca cliente no Supabase pelo ID"""
+    """Busca cliente pelo ID — primeiro no cache, depois no Supabase"""
+    cliente = CACHE.get(cliente_id)
+    if cliente is not None:
+        return cliente
+
     url = f"{SUPABASE_URL}/rest/v1/clientes?id=eq.{cliente_id}"
-    headers = {
-        "apikey": SUPABASE_KEY,
-        "Authorization": f"Bearer {SUPABASE_KEY}"
-    }
-    r = requests.get(url, headers=headers)
+    r = SESSION.get(url, headers=SUPABASE_HEADERS, timeout=15)
     try:
-        return r.json()[0]
+        cliente = r.json()[0]
     except:
         return None
+    CACHE.put(cliente)
+    return cliente
+
+
+def supabase_prefetch_ativos():
+    """Carrega nome/carteiras de todos os clientes com vigência ativa no cache"""
+    hoje = datetime.now().date().isoformat()
+    total, offset = 0, 0
+    while True:
+        url = (f"{SUPABASE_URL}/rest/v1/clientes?select=id,nome,carteiras"
+               f"&data_fim=gte.{hoje}&order=id&limit={PREFETCH_PAGINA}&offset={offset}")
+        lote = SESSION.get(url, headers=SUPABASE_HEADERS, timeout=30).json()
+        for cliente in lote:
+            CACHE.put(cliente)
+        total += len(lote)
+        if len(lote) < PREFETCH_PAGINA:
+            return total
+        offset += PREFETCH_PAGINA
+
+
+def rotina_prefetch():
+    """Recarrega o cache antes de ele expirar (roda em thread daemon)"""
+    while True:
+        try:
+            n = supabase_prefetch_ativos()
+            print(f"📦 Cache de clientes: {n} ativos carregados")
+        except Exception as e:
+            print("Erro no prefetch de clientes:", e)
+        time.sleep(max(60, CACHE_TTL // 2))
+
+
+def rotina_metricas(intervalo=300):
+    """Loga fila/latência do agendador de envio (roda em thread daemon)"""
+    while True:
+        time.sleep(intervalo)
+        print("📊 Envio Telegram:", json.dumps(AGENDADOR.metricas()))
 
 
 # ============================================================
 # FUNÇÕES TELEGRAM
 # ============================================================
-def tg_get_updates(offset=None):
-    """Pega mensagens novas do Telegram"""
-    url = BASE_API + "/getUpdates"
+def tg_get_updates(offset=None, timeout=LONG_POLL_TIMEOUT):
+    """Pega mensagens novas do Telegram (long polling: bloqueia até `timeout` segundos)"""
+    params = {"timeout": timeout, "allowed_updates": json.dumps(ALLOWED_UPDATES)}
     if offset:
-        url += f"?offset={offset}"
-    return requests.get(url).json()
+        params["offset"] = offset
+    return SESSION.get(BASE_API + "/getUpdates", params=params, timeout=timeout + 10).json()
+
+
+def _tg_post(metodo, payload):
+    return SESSION.post(BASE_API + "/" + metodo, json=payload, timeout=15).json()
+
+
+# Toda chamada de saída passa por aqui: limites por chat/global e retry_after do 429
+AGENDADOR = AgendadorTelegram(_tg_post, workers=ENVIO_WORKERS)
 
 
 def tg_send_message(chat_id, text, reply_markup=None):
-    """Envia mensagem simples"""
+    """Envia mensagem simples (espera a vez no agendador) e devolve a resposta"""
     payload = {
         "chat_id": chat_id,
         "text": text,
@@ -63,14 +184,23 @@ def tg_send_message(chat_id, text, reply_markup=None):
     }
     if reply_markup:
         payload["reply_markup"] = reply_markup
-    requests.post(BASE_API + "/sendMessage", json=payload)
+    return AGENDADOR.chamar("sendMessage", payload, chat_id=chat_id)
 
 
 def tg_kick_user(group_id, user_id):
-    """Expulsa usuário do grupo - usado mais tarde"""
-    url = BASE_API + "/kickChatMember"
+    """
+    Expulsa usuário do grupo (ban + unban: sai do grupo, mas pode voltar
+    por um convite novo se renovar). Devolve a resposta do banChatMember,
+    ou ok=False se o unban falhar (senão quem renovar ficaria banido).
+    """
     payload = {"chat_id": group_id, "user_id": user_id}
-    requests.post(url, json=payload)
+    r = AGENDADOR.chamar("banChatMember", payload)
+    if not r.get("ok"):
+        return r
+    u = AGENDADOR.chamar("unbanChatMember", {**payload, "only_if_banned": True})
+    if not u.get("ok"):
+        return {"ok": False, "description": f"banido, mas o unban falhou: {u.get('description', 'erro desconhecido')}"}
+    return r
 
 
 # ============================================================
@@ -145,34 +275,196 @@ def process_callback(callback):
 
 
 
+# ============================================================
+# DESPACHO CONCORRENTE
+# ============================================================
+def process_update(u):
+    # mensagem normal
+    if "message" in u and "text" in u["message"]:
+        texto = u["message"]["text"]
+        if texto.startswith("/start"):
+            process_start(u["message"])
+
+    # callback
+    if "callback_query" in u:
+        process_callback(u["callback_query"])
+
+
+def chat_do_update(u):
+    """Chave de ordenação: updates do mesmo chat são processados em sequência."""
+    if "message" in u:
+        return u["message"]["chat"]["id"]
+    if "callback_query" in u:
+        cb = u["callback_query"]
+        return cb.get("message", {}).get("chat", {}).get("id", cb["from"]["id"])
+    return None
+
+
+class DiarioPendentes:
+    """
+    Diário em SQLite dos updates despachados e ainda não concluídos, mais o
+    maior update_id visto. O getUpdates confirma tudo abaixo do offset, então
+    é daqui que um update em processamento volta depois de uma queda.
+    """
+
+    def __init__(self, caminho=ARQUIVO_PENDENTES):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript("""
+            create table if not exists pendentes (update_id integer primary key, dados text not null);
+            create table if not exists estado (chave text primary key, valor integer not null);
+        """)
+
+    def gravar(self, u):
+        with self._lock:
+            self._conn.execute("begin immediate")
+            self._conn.execute("insert or ignore into pendentes (update_id, dados) values (?, ?)",
+                               (u["update_id"], json.dumps(u)))
+            self._conn.execute("insert into estado (chave, valor) values ('maior_visto', ?) "
+                               "on conflict (chave) do update set valor = max(valor, excluded.valor)",
+                               (u["update_id"],))
+            self._conn.execute("commit")
+
+    def concluir(self, update_id):
+        with self._lock:
+            self._conn.execute("delete from pendentes where update_id = ?", (update_id,))
+
+    def pendentes(self) -> list:
+        with self._lock:
+            linhas = self._conn.execute("select dados from pendentes order by update_id").fetchall()
+        return [json.loads(d) for (d,) in linhas]
+
+    def maior_visto(self):
+        with self._lock:
+            linha = self._conn.execute("select valor from estado where chave = 'maior_visto'").fetchone()
+        return linha[0] if linha else None
+
+
+class Despachante:
+    """
+    Processa updates em paralelo num pool de threads:
+    - mesmo chat → em ordem, um de cada vez
+    - no máximo `max_em_voo` updates ao mesmo tempo (o loop de polling espera)
+    - offset = maior update despachado + 1: o long polling só devolve
+      updates novos, mesmo com handlers lentos ainda rodando
+    - com `diario` (polling), cada update é gravado antes de ser confirmado
+      ao Telegram e apagado ao concluir; retomar() reprocessa o que sobrou
+      de uma queda
+    - ordenado=False (webhook): updates podem chegar fora de ordem; a
+      deduplicação passa a ser por um conjunto dos ids recentes
+    """
+
+    def __init__(self, handler=process_update, workers=WORKERS, max_em_voo=MAX_EM_VOO, ordenado=True,
+                 diario=None):
+        self.handler = handler
+        self.ordenado = ordenado
+        self.diario = diario
+        self._recentes = OrderedDict()  # modo não ordenado: update_id -> None
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._vagas = threading.BoundedSemaphore(max_em_voo)
+        self._lock = threading.Lock()
+        self._filas = {}            # chat_id -> deque de updates aguardando
+        self._maior_visto = None
+
+    def offset(self):
+        """Próximo offset do getUpdates (confirma tudo o que já foi despachado)."""
+        with self._lock:
+            return self._maior_visto + 1 if self._maior_visto is not None else None
+
+    def retomar(self) -> int:
+        """Reprocessa os updates que ficaram pendentes no diário. Devolve quantos."""
+        if self.diario is None:
+            return 0
+        pendentes = self.diario.pendentes()
+        with self._lock:
+            self._maior_visto = self.diario.maior_visto()
+        for u in pendentes:
+            self._agendar(u)
+        return len(pendentes)
+
+    def despachar(self, u) -> bool:
+        """Agenda o update; devolve False se ele já tinha sido despachado antes."""
+        uid = u["update_id"]
+        with self._lock:
+            if self.ordenado:
+                if self._maior_visto is not None and uid <= self._maior_visto:
+                    return False
+                self._maior_visto = uid
+            else:
+                if uid in self._recentes:
+                    return False
+                self._recentes[uid] = None
+                if len(self._recentes) > 10000:
+                    self._recentes.popitem(last=False)
+
+        if self.diario is not None:
+            self.diario.gravar(u)   # antes do próximo getUpdates confirmar o update
+        self._agendar(u)
+        return True
+
+    def _agendar(self, u):
+        self._vagas.acquire()  # backpressure: segura o polling quando o pool está cheio
+        chat = chat_do_update(u)
+        with self._lock:
+            fila = self._filas.get(chat)
+            if fila is not None:
+                fila.append(u)      # já tem alguém drenando esse chat
+                return
+            self._filas[chat] = deque([u])
+        self._pool.submit(self._drenar_chat, chat)
+
+    def _drenar_chat(self, chat):
+        while True:
+            with self._lock:
+                fila = self._filas[chat]
+                if not fila:
+                    del self._filas[chat]
+                    return
+                u = fila.popleft()
+            try:
+                self.handler(u)
+            except Exception as e:
+                print("Erro ao processar update", u.get("update_id"), e)
+            finally:
+                if self.diario is not None:
+                    try:
+                        self.diario.concluir(u["update_id"])
+                    except Exception as e:
+                        print("Erro ao apagar update do diário", u.get("update_id"), e)
+                self._vagas.release()
+
+    def aguardar(self):
+        """Espera tudo o que foi despachado terminar (usado no desligamento)."""
+        self._pool.shutdown(wait=True)
+
+
 # ============================================================
 # LOOP PRINCIPAL
 # ============================================================
 def main():
-    print("🤖 Bot do Telegram rodando no Render…")
-    last_update = None
+    print("🤖 Bot do Telegram rodando no Render (long polling)…")
+    threading.Thread(target=rotina_prefetch, daemon=True).start()
+    threading.Thread(target=rotina_metricas, daemon=True).start()
+    despachante = Despachante(diario=DiarioPendentes())
+    retomados = despachante.retomar()
+    if retomados:
+        print(f"Reprocessando {retomados} updates pendentes da execução anterior")
 
     while True:
         try:
-            updates = tg_get_updates(last_update)
+            updates = tg_get_updates(despachante.offset())
             if "result" in updates:
                 for u in updates["result"]:
-                    last_update = u["update_id"] + 1
-
-                    # mensagem normal
-                    if "message" in u and "text" in u["message"]:
-                        texto = u["message"]["text"]
-                        if texto.startswith("/start"):
-                            process_start(u["message"])
-
-                    # callback
-                    if "callback_query" in u:
-                        process_callback(u["callback_query"])
+                    despachante.despachar(u)
+            else:
+                # ex.: 409 (outro getUpdates ativo) ou 429 — não martela a API
+                print("Telegram recusou getUpdates:", updates.get("description"))
+                time.sleep(updates.get("parameters", {}).get("retry_after", 1))
 
         except Exception as e:
             print("Erro no bot:", e)
-
-        time.sleep(1)
+            time.sleep(1)  # só espera em caso de erro; sem erro o long polling já bloqueia
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+import os
+import hmac
+import json
+import threading
+import argparse
+
+import bot
+
+# ============================================================
+# CONFIGURAÇÕES
+# ============================================================
+# Mesmo segredo informado no setWebhook (secret_token); o Telegram manda
+# de volta no header X-Telegram-Bot-Api-Secret-Token em cada update
+WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", 40))
+
+
+# ============================================================
+# DESPACHO (um por processo/worker web)
+# ============================================================
+_despachante = None
+_lock = threading.Lock()
+
+
+def obter_despachante():
+    """Cria o despachante e o prefetch do cache na 1ª requisição do processo"""
+    global _despachante
+    with _lock:
+        if _despachante is None:
+            threading.Thread(target=bot.rotina_prefetch, daemon=True).start()
+            _despachante = bot.Despachante(ordenado=False)
+        return _despachante
+
+
+def segredo_valido(recebido):
+    if not WEBHOOK_SECRET:
+        return False
+    return hmac.compare_digest(recebido or "", WEBHOOK_SECRET)
+
+
+# ============================================================
+# APP WSGI  (gunicorn bot_webhook:app)
+# ============================================================
+def _responder(start_response, status, corpo=b""):
+    start_response(status, [("Content-Type", "text/plain"), ("Content-Length", str(len(corpo)))])
+    return [corpo]
+
+
+def app(environ, start_response):
+    metodo = environ.get("REQUEST_METHOD", "GET")
+    path = environ.get("PATH_INFO", "")
+
+    if metodo == "GET" and path == "/health":
+        return _responder(start_response, "200 OK", b"ok")
+    if metodo == "GET" and path == "/metrics":
+        return _responder(start_response, "200 OK", json.dumps(bot.AGENDADOR.metricas()).encode())
+
+    if path != WEBHOOK_PATH:
+        return _responder(start_response, "404 Not Found")
+    if metodo != "POST":
+        return _responder(start_response, "405 Method Not Allowed")
+
+    if not segredo_valido(environ.get("HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN")):
+        return _responder(start_response, "403 Forbidden")
+
+    try:
+        tamanho = int(environ.get("CONTENT_LENGTH") or 0)
+        update = json.loads(environ["wsgi.input"].read(tamanho))
+        update["update_id"]
+    except (ValueError, KeyError, TypeError):
+        return _responder(start_response, "400 Bad Request")
+
+    # responde 200 na hora; o processamento segue no pool de threads
+    obter_despachante().despachar(update)
+    return _responder(start_response, "200 OK")
+
+
+# ============================================================
+# REGISTRO DO WEBHOOK NO TELEGRAM
+# ============================================================
+def set_webhook(url):
+    payload = {
+        "url": url.rstrip("/") + WEBHOOK_PATH,
+        "secret_token": WEBHOOK_SECRET,
+        "allowed_updates": bot.ALLOWED_UPDATES,
+        "max_connections": WEBHOOK_MAX_CONNECTIONS,
+    }
+    return bot.SESSION.post(bot.BASE_API + "/setWebhook", json=payload, timeout=15).json()
+
+
+def delete_webhook():
+    """Volta para o modo polling (bot.py)"""
+    return bot.SESSION.post(bot.BASE_API + "/deleteWebhook", timeout=15).json()
+
+
+# ============================================================
+# EXECUÇÃO LOCAL  (em produção use gunicorn/uwsgi com vários workers)
+# ============================================================
+def main():
+    from wsgiref.simple_server import make_server, WSGIServer
+    from socketserver import ThreadingMixIn
+
+    parser = argparse.ArgumentParser(description="Bot do Telegram em modo webhook")
+    parser.add_argument("--porta", type=int, default=int(os.getenv("PORT", 8080)))
+    parser.add_argument("--set-webhook", metavar="URL_PUBLICA", help="registra o webhook e sai")
+    parser.add_argument("--delete-webhook", action="store_true", help="remove o webhook e sai")
+    args = parser.parse_args()
+
+    if not WEBHOOK_SECRET:
+        raise SystemExit("Defina TELEGRAM_WEBHOOK_SECRET antes de usar o modo webhook.")
+
+    if args.set_webhook:
+        print(set_webhook(args.set_webhook))
+        return
+    if args.delete_webhook:
+        print(delete_webhook())
+        return
+
+    class ServidorThreads(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+
+    print(f"🤖 Bot do Telegram em modo webhook na porta {args.porta} ({WEBHOOK_PATH})…")
+    make_server("", args.porta, app, server_class=ServidorThreads).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
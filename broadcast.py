@@ -0,0 +1,251 @@
+# broadcast.py
+# ------------------------------------------------------------
+# Aviso em massa pelo Telegram para quem assina uma carteira
+# - Destinatários: clientes ativos (data_fim >= hoje) com telegram_id
+#   cuja lista de carteiras, já expandida pelos pacotes Phoenix,
+#   contém a carteira escolhida (um envio por telegram_id)
+# - Envio pelo agendador do bot (telegram_envio.py): paralelo, dentro
+#   dos limites do Telegram e respeitando o retry_after
+# - Checkpoint em SQLite: cada destinatário fica gravado como
+#   pendente/enviado/falhou; rodar de novo o mesmo aviso na mesma
+#   rodada retoma de onde parou, sem reenviar para quem já recebeu
+# - Rodada: entra no id do aviso junto com carteira e texto. Padrão
+#   é o dia de hoje, então o mesmo texto num outro dia (aviso
+#   recorrente) é um envio novo; --rodada dá um nome explícito (para
+#   repetir no mesmo dia ou retomar num dia seguinte)
+#
+# Uso:
+#   python broadcast.py "Carteira de Opções" --texto "Live hoje às 19h!"
+#   python broadcast.py "Carteira de Opções" --arquivo aviso.html --dry-run
+#   python broadcast.py "Carteira de Opções" --arquivo aviso.html --reenviar-falhas
+#   python broadcast.py "Carteira de Opções" --texto "Reunião às 20h" --rodada 2026-10-18-extra
+#
+# Arquivo: BROADCAST_DB (padrão broadcast.sqlite3 ao lado deste arquivo)
+# ------------------------------------------------------------
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import as_completed
+from contextlib import contextmanager
+from datetime import date
+
+from carteiras import BIT_CARTEIRA, CARTEIRAS_OPCOES, expandir_mascara, mascara
+from config import get_secret
+from snapshot_clientes import TAMANHO_PAGINA
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_DB = os.getenv("BROADCAST_DB", os.path.join(_BASE_DIR, "broadcast.sqlite3"))
+
+LOTE_CHECKPOINT = 50   # resultados gravados por transação
+
+_SCHEMA = """
+create table if not exists broadcasts (
+    id        text primary key,
+    carteira  text not null,
+    texto     text not null,
+    criado_em real not null
+);
+create table if not exists broadcast_envios (
+    broadcast_id  text not null,
+    telegram_id   text not null,
+    status        text not null default 'pendente',   -- pendente | enviado | falhou
+    erro          text,
+    atualizado_em real,
+    primary key (broadcast_id, telegram_id)
+);
+"""
+
+
+def id_broadcast(carteira: str, texto: str, rodada: str) -> str:
+    """Mesmo aviso, mesma carteira e mesma rodada → mesmo id (é o que permite retomar)."""
+    return hashlib.sha1(f"{carteira}\n{texto}\n{rodada}".encode()).hexdigest()[:12]
+
+
+# ---------------------- DESTINATÁRIOS ----------------------
+def buscar_destinatarios(supabase, carteira: str, hoje: date = None) -> list:
+    """telegram_ids (str, sem repetição) dos clientes ativos com acesso à carteira."""
+    hoje = hoje or date.today()
+    bit = BIT_CARTEIRA[carteira]
+    ids, vistos, inicio = [], set(), 0
+    while True:
+        lote = (
+            supabase.table("clientes")
+            .select("id,carteiras,telegram_id")
+            .gte("data_fim", str(hoje))
+            .not_.is_("telegram_id", "null")
+            .order("id")
+            .range(inicio, inicio + TAMANHO_PAGINA - 1)
+            .execute()
+        ).data or []
+        for r in lote:
+            tg = str(r["telegram_id"])
+            m = mascara(r["carteiras"])
+            # m: o pacote em si (broadcast para "Phoenix Full"); expandida: quem o pacote inclui
+            if tg not in vistos and (m | expandir_mascara(m)) & bit:
+                vistos.add(tg)
+                ids.append(tg)
+        if len(lote) < TAMANHO_PAGINA:
+            return ids
+        inicio += TAMANHO_PAGINA
+
+
+# ---------------------- CHECKPOINT ----------------------
+class Checkpoint:
+    def __init__(self, caminho: str = ARQUIVO_DB):
+        self.caminho = caminho
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        try:
+            conn.execute("pragma journal_mode=wal")
+            yield conn
+        finally:
+            conn.close()
+
+    def registrar(self, broadcast_id: str, carteira: str, texto: str, telegram_ids: list) -> int:
+        """Grava o aviso e os destinatários novos como pendentes. Devolve quantos entraram."""
+        with self._conn() as conn:
+            conn.execute("begin immediate")
+            conn.execute(
+                "insert or ignore into broadcasts (id, carteira, texto, criado_em) values (?, ?, ?, ?)",
+                (broadcast_id, carteira, texto, time.time()),
+            )
+            antes = conn.total_changes
+            conn.executemany(
+                "insert or ignore into broadcast_envios (broadcast_id, telegram_id) values (?, ?)",
+                [(broadcast_id, tg) for tg in telegram_ids],
+            )
+            novos = conn.total_changes - antes
+            conn.execute("commit")
+        return novos
+
+    def a_enviar(self, broadcast_id: str, reenviar_falhas: bool = False) -> list:
+        status = ("pendente", "falhou") if reenviar_falhas else ("pendente",)
+        with self._conn() as conn:
+            linhas = conn.execute(
+                f"select telegram_id from broadcast_envios where broadcast_id = ? "
+                f"and status in ({','.join('?' * len(status))})",
+                (broadcast_id, *status),
+            ).fetchall()
+        return [r[0] for r in linhas]
+
+    def gravar(self, broadcast_id: str, resultados: list):
+        """resultados: lista de (telegram_id, ok, erro)."""
+        agora = time.time()
+        with self._conn() as conn:
+            conn.execute("begin immediate")
+            conn.executemany(
+                "update broadcast_envios set status = ?, erro = ?, atualizado_em = ? "
+                "where broadcast_id = ? and telegram_id = ?",
+                [("enviado" if ok else "falhou", erro, agora, broadcast_id, tg) for tg, ok, erro in resultados],
+            )
+            conn.execute("commit")
+
+    def contagem(self, broadcast_id: str) -> dict:
+        with self._conn() as conn:
+            linhas = conn.execute(
+                "select status, count(*) from broadcast_envios where broadcast_id = ? group by status",
+                (broadcast_id,),
+            ).fetchall()
+        return dict(linhas)
+
+
+# ---------------------- ENVIO ----------------------
+def executar(supabase, carteira: str, texto: str, reenviar_falhas: bool = False,
+             dry_run: bool = False, checkpoint: Checkpoint = None, rodada: str = None) -> dict:
+    """`rodada` padrão: a data de hoje (o mesmo texto amanhã é outro envio)."""
+    checkpoint = checkpoint or Checkpoint()
+    rodada = rodada or date.today().isoformat()
+    bid = id_broadcast(carteira, texto, rodada)
+
+    destinatarios = buscar_destinatarios(supabase, carteira)
+    if dry_run:
+        return {"broadcast_id": bid, "rodada": rodada, "destinatarios": len(destinatarios)}
+
+    checkpoint.registrar(bid, carteira, texto, destinatarios)
+    fila = checkpoint.a_enviar(bid, reenviar_falhas)
+
+    from bot import AGENDADOR
+
+    inicio = time.monotonic()
+    futuros = {
+        AGENDADOR.enviar("sendMessage", {"chat_id": tg, "text": texto, "parse_mode": "HTML"}, chat_id=tg): tg
+        for tg in fila
+    }
+
+    enviados = falhas = 0
+    buffer = []
+    try:
+        for fut in as_completed(futuros):
+            tg = futuros[fut]
+            try:
+                r = fut.result()
+                ok, erro = bool(r.get("ok")), r.get("description")
+            except Exception as e:
+                ok, erro = False, str(e)
+            enviados += ok
+            falhas += not ok
+            buffer.append((tg, ok, None if ok else erro))
+            if len(buffer) >= LOTE_CHECKPOINT:
+                checkpoint.gravar(bid, buffer)
+                buffer.clear()
+    finally:
+        # interrompido (Ctrl+C) ou não, o que já saiu fica gravado
+        if buffer:
+            checkpoint.gravar(bid, buffer)
+
+    duracao = time.monotonic() - inicio
+    return {
+        "broadcast_id": bid,
+        "rodada": rodada,
+        "destinatarios": len(destinatarios),
+        "nesta_execucao": len(fila),
+        "enviados": enviados,
+        "falhas": falhas,
+        "duracao_s": round(duracao, 1),
+        "msgs_por_s": round(len(fila) / duracao, 1) if duracao > 0 else None,
+        "acumulado": checkpoint.contagem(bid),
+    }
+
+
+# ---------------------- CLI ----------------------
+def main():
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Envia um aviso no Telegram para os assinantes de uma carteira.")
+    parser.add_argument("carteira", choices=[c for c in CARTEIRAS_OPCOES if c != "Leads"])
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--texto", help="mensagem (HTML do Telegram)")
+    grupo.add_argument("--arquivo", help="arquivo com a mensagem (HTML do Telegram)")
+    parser.add_argument("--reenviar-falhas", action="store_true", help="tenta de novo quem falhou antes")
+    parser.add_argument("--dry-run", action="store_true", help="só conta os destinatários")
+    parser.add_argument("--rodada", help="identifica o envio (padrão: data de hoje); repita para retomar")
+    args = parser.parse_args()
+
+    texto = args.texto
+    if args.arquivo:
+        with open(args.arquivo, encoding="utf-8") as f:
+            texto = f.read().strip()
+
+    supabase = create_client(get_secret("SUPABASE_URL"), get_secret("SUPABASE_KEY"))
+    resumo = executar(supabase, args.carteira, texto, args.reenviar_falhas, args.dry_run, rodada=args.rodada)
+
+    if args.dry_run:
+        print(f"Broadcast {resumo['broadcast_id']} (rodada {resumo['rodada']}): "
+              f"{resumo['destinatarios']} destinatários para {args.carteira}")
+        return
+    print(
+        f"Broadcast {resumo['broadcast_id']} (rodada {resumo['rodada']}): {resumo['enviados']} enviados, {resumo['falhas']} falhas "
+        f"de {resumo['nesta_execucao']} nesta execução ({resumo['msgs_por_s']} msg/s) — "
+        f"acumulado {resumo['acumulado']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
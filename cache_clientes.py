@@ -0,0 +1,97 @@
+# cache_clientes.py
+# ------------------------------------------------------------
+# Cópia local do snapshot de `clientes` em arquivo Arrow (IPC)
+# - Tipos preservados: datas como date32, carteiras como lista,
+#   máscaras de bits em int64, valor em float64
+# - Leitura por memory-map (sem parse de JSON nem rede): a página
+#   renderiza com o que está em disco e o snapshot reconcilia com
+#   o Supabase em segundo plano (snapshot_clientes.py)
+# - Junto vão a marca d'água e a coluna de sync, para o delta
+#   continuar de onde o arquivo parou
+# - Escrita atômica (arquivo temporário + rename): um leitor
+#   nunca vê arquivo pela metade
+# - Sem pyarrow instalado, o cache fica desligado (carga normal)
+#
+# Arquivo: CLIENTES_CACHE (padrão clientes_cache.arrow ao lado deste arquivo)
+# ------------------------------------------------------------
+
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_CACHE = os.getenv("CLIENTES_CACHE", os.path.join(_BASE_DIR, "clientes_cache.arrow"))
+
+# muda quando o formato do arquivo muda; arquivo de outro formato é ignorado
+FORMATO = 1
+
+_CHAVE_META = b"snapshot_clientes"
+
+
+def disponivel() -> bool:
+    return pa is not None
+
+
+def _tipos_fixos() -> dict:
+    return {
+        "id": pa.string(),
+        "carteiras": pa.list_(pa.string()),
+        "carteiras_mask": pa.int64(),
+        "carteiras_mask_exp": pa.int64(),
+        "data_inicio": pa.date32(),
+        "data_fim": pa.date32(),
+        "valor": pa.float64(),
+    }
+
+
+def _coluna(serie: pd.Series, tipo=None):
+    """Coluna Arrow; o que o Arrow não consegue inferir (tipos misturados) vira texto."""
+    if tipo is not None:
+        return pa.array(serie, type=tipo, from_pandas=True)
+    try:
+        return pa.array(serie, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        texto = serie.map(lambda v: None if v is None or (isinstance(v, float) and v != v) else str(v))
+        return pa.array(texto, type=pa.string())
+
+
+def salvar(df: pd.DataFrame, meta: dict, caminho: str = ARQUIVO_CACHE) -> bool:
+    """Grava o snapshot e os metadados de sync. Devolve False se o cache está desligado."""
+    if pa is None:
+        return False
+    fixos = _tipos_fixos()
+    tabela = pa.table({col: _coluna(df[col], fixos.get(col)) for col in df.columns})
+    tabela = tabela.replace_schema_metadata(
+        {_CHAVE_META: json.dumps({**meta, "formato": FORMATO}, default=str).encode()}
+    )
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as f, pa.ipc.new_file(f, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(tmp, caminho)
+    return True
+
+
+def carregar(caminho: str = ARQUIVO_CACHE):
+    """(DataFrame, meta) do arquivo, ou None se não existe / está ilegível / é de outro formato."""
+    if pa is None or not os.path.exists(caminho):
+        return None
+    try:
+        with pa.memory_map(caminho, "r") as mapa:
+            tabela = pa.ipc.open_file(mapa).read_all()
+            meta = json.loads((tabela.schema.metadata or {}).get(_CHAVE_META, b"{}"))
+            if meta.get("formato") != FORMATO:
+                return None
+            df = tabela.to_pandas(date_as_object=True)
+    except (OSError, pa.ArrowException, ValueError):
+        return None
+
+    # Arrow devolve listas como ndarray; as páginas esperam list
+    if "carteiras" in df.columns:
+        df["carteiras"] = df["carteiras"].map(lambda v: [] if v is None else list(v))
+    return df, meta
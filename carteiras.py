@@ -0,0 +1,140 @@
+# carteiras.py
+# ------------------------------------------------------------
+# Carteiras oferecidas no CRM e expansão dos pacotes Phoenix
+# (usado pelo app, pelos e-mails e pelas rotinas headless)
+#
+# Representação canônica:
+# - normalizar_carteiras: lista ou lista "stringificada" → lista
+# - máscara de bits sobre CARTEIRAS_OPCOES (1 bit por carteira),
+#   com a expansão dos pacotes já pré-calculada por bit
+#
+#   df["carteiras_mask"] & mascara(["Carteira de Opções"]) != 0
+# ------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+# ============================ NOVAS CARTEIRAS PHOENIX ============================
+# ============================ CARTEIRAS DISPONÍVEIS NO CRM ============================
+CARTEIRAS_OPCOES = [
+    # Carteiras individuais
+    "Carteira de Ações IBOV",
+    "Carteira de BDRs",
+    "Carteira de Small Caps",
+    "Carteira de Opções",
+
+    # 🔥 Pacotes Phoenix
+    "Carteira Phoenix Equity",
+    "Carteira Phoenix Full",
+
+    # 🔥 SCANNERS (NOVO)
+    "Scanner de Ações",
+    "Scanner de Opções",
+
+    # Sistema
+    "Leads"
+]
+
+
+# =========================================================
+# 🔁 EXPANSÃO DE PACOTES PHOENIX → CARTEIRAS REAIS
+# =========================================================
+PHOENIX_EXPANSION_MAP = {
+    "Carteira Phoenix Equity": [
+        "Carteira de Ações IBOV",
+        "Carteira de Small Caps",
+        "Carteira de BDRs",
+    ],
+    "Carteira Phoenix Full": [
+        "Carteira de Ações IBOV",
+        "Carteira de Small Caps",
+        "Carteira de BDRs",
+        "Carteira de Opções",
+    ],
+}
+
+
+# peso de cada carteira real dentro do pacote (soma 1) para dividir a receita;
+# padrão: partes iguais — troque aqui se algum componente valer mais
+PESOS_EXPANSAO = {
+    pacote: {sub: 1 / len(subs) for sub in subs}
+    for pacote, subs in PHOENIX_EXPANSION_MAP.items()
+}
+
+# carteiras que recebem receita (pacotes são divididos entre elas)
+CARTEIRAS_RECEITA = [c for c in CARTEIRAS_OPCOES if c not in PHOENIX_EXPANSION_MAP and c != "Leads"]
+
+
+def expandir_carteiras(carteiras: list[str]) -> list[str]:
+    """
+    Recebe as carteiras cadastradas no CRM e
+    devolve a lista REAL de carteiras para envio de e-mails.
+    """
+    resultado = []
+
+    for c in carteiras:
+        # Se for pacote Phoenix → expande
+        if c in PHOENIX_EXPANSION_MAP:
+            for sub in PHOENIX_EXPANSION_MAP[c]:
+                if sub not in resultado:
+                    resultado.append(sub)
+        else:
+            # Carteira normal
+            if c not in resultado:
+                resultado.append(c)
+
+    return resultado
+
+
+# =========================================================
+# 🧮 NORMALIZAÇÃO E MÁSCARA DE BITS
+# =========================================================
+def normalizar_carteiras(v) -> list:
+    """Aceita lista ou lista 'stringificada' e devolve sempre uma lista."""
+    if isinstance(v, list):
+        return v
+    if isinstance(v, str):
+        return [x.strip().strip("'").strip('"') for x in v.strip("[]").split(",") if x.strip()]
+    return []
+
+
+BIT_CARTEIRA = {c: 1 << i for i, c in enumerate(CARTEIRAS_OPCOES)}
+BIT_LEADS = BIT_CARTEIRA["Leads"]
+
+# bit de cada carteira → bits das carteiras reais que ela dá acesso
+_EXPANSAO_BIT = {
+    BIT_CARTEIRA[c]: sum(BIT_CARTEIRA[sub] for sub in PHOENIX_EXPANSION_MAP.get(c, [c]))
+    for c in CARTEIRAS_OPCOES
+}
+
+
+def mascara(carteiras) -> int:
+    """Máscara das carteiras (nomes fora de CARTEIRAS_OPCOES são ignorados)."""
+    m = 0
+    for c in normalizar_carteiras(carteiras):
+        m |= BIT_CARTEIRA.get(c, 0)
+    return m
+
+
+def expandir_mascara(m: int) -> int:
+    """Troca os bits de pacote Phoenix pelos bits das carteiras reais."""
+    resultado = 0
+    for bit, expandido in _EXPANSAO_BIT.items():
+        if m & bit:
+            resultado |= expandido
+    return resultado
+
+
+def mascaras_da_serie(carteiras: pd.Series) -> tuple:
+    """(máscara, máscara expandida) de uma coluna de listas, numa passada vetorizada."""
+    explodido = carteiras.map(normalizar_carteiras).explode()
+    pares = pd.DataFrame({"linha": explodido.index, "bit": explodido.map(BIT_CARTEIRA).to_numpy()})
+    pares = pares.dropna().drop_duplicates()
+    m = (
+        pares["bit"].astype("int64").groupby(pares["linha"]).sum()
+        .reindex(carteiras.index, fill_value=0).astype("int64")
+    )
+    exp = pd.Series(0, index=carteiras.index, dtype="int64")
+    for bit, expandido in _EXPANSAO_BIT.items():
+        exp |= np.where((m & bit) != 0, expandido, 0)
+    return m, exp
@@ -22,8 +22,6 @@
 # ------------------------------------------------------------
 
 import os
-import smtplib
-from email.mime.text import MIMEText
 from datetime import date, timedelta, datetime
 
 import pandas as pd
@@ -32,6 +30,20 @@ import re
 from supabase import create_client, Client
 import secrets
 
+from carteiras import CARTEIRAS_OPCOES, normalizar_carteiras
+from consulta_clientes import (
+    POR_PAGINA_OPCOES, FiltroCarteirasIndisponivel, buscar_pagina, ordem_padrao, pagina_local,
+)
+from indice_busca import obter_indice
+from indice_vencimentos import obter_indice_vencimentos
+from linha_do_tempo import obter_linha_do_tempo
+from emails import montar_email_consolidado, montar_emails_por_carteira
+from outbox import acordar_worker, chave_idempotencia, obter_outbox
+from outbox import iniciar_worker as iniciar_worker_outbox
+from renovacoes import iniciar_worker, ultimo_status
+from snapshot_clientes import obter_snapshot
+from status_clientes import FILTROS_STATUS, LEAD, ROTULOS_TABELA, calcular_status
+
 st.markdown("""
 <style>
 .card {
@@ -80,13 +92,6 @@ def get_secret(name: str, default=None):
 SUPABASE_URL = get_secret("SUPABASE_URL")
 SUPABASE_KEY = get_secret("SUPABASE_KEY")
 
-# Seu padrão de e-mail (iguais aos outros apps)
-EMAIL_USER = get_secret("email_sender")
-EMAIL_PASS = get_secret("gmail_app_password")
-
-EMAIL_HOST = "smtp.gmail.com"
-EMAIL_PORT = 587
-
 if not SUPABASE_URL or not SUPABASE_KEY:
     st.error("Configuração do Supabase ausente. Defina SUPABASE_URL e SUPABASE_KEY em Secrets.")
     st.stop()
@@ -120,6 +125,12 @@ if not st.session_state.auth:
             st.error("Credenciais inválidas.")
     st.stop()
 
+# ---------------------- ROTINAS EM BACKGROUND ----------------------
+# Uma thread de cada por processo (renovações + fila de e-mails); nada disso bloqueia a página.
+# Só depois do login: um acesso anônimo à página não liga as rotinas
+iniciar_worker(supabase)
+iniciar_worker_outbox()
+
 # ---------------------- FUNÇÕES AUXILIARES ----------------------
 PAISES = {
     "🇧🇷 Brasil (+55)": "+55",
@@ -153,667 +164,9 @@ def status_cor_data_fim(data_fim: date) -> str:
         return "background-color: yellow"
     return "background-color: lightgreen"
 
-# ---------------------- LINKS E TEMPLATES DE E-MAIL ----------------------
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from email.mime.text import MIMEText
-
-# ============================ NOVAS CARTEIRAS PHOENIX ============================
-# ============================ CARTEIRAS DISPONÍVEIS NO CRM ============================
-CARTEIRAS_OPCOES = [
-    # Carteiras individuais
-    "Carteira de Ações IBOV",
-    "Carteira de BDRs",
-    "Carteira de Small Caps",
-    "Carteira de Opções",
-
-    # 🔥 Pacotes Phoenix
-    "Carteira Phoenix Equity",
-    "Carteira Phoenix Full",
-
-    # 🔥 SCANNERS (NOVO)
-    "Scanner de Ações",
-    "Scanner de Opções",
-
-    # Sistema
-    "Leads"
-]
-
-
-# ============================ LINKS GOOGLE GROUPS ============================
-LINK_GG_ACOES  = "https://groups.google.com/g/estrategias-phoenix"
-LINK_GG_BDRS   = "https://groups.google.com/g/estrategiasbdr-phoenix"
-LINK_GG_OPCOES = "https://groups.google.com/g/estrategiasopcoes-phoenix"
-LINK_GG_SMALL = "https://groups.google.com/g/estrategiassmll-phoenix"
-# ============================ BOTÕES ============================
-# ============================ BOTÕES (ESTILO PHOENIX) ============================
-# ============================ BOTÕES ============================
-
-def BOTAO_GOOGLE(texto: str, link: str) -> str:
-    return f"""
-<table border="0" cellspacing="0" cellpadding="0" style="margin: 14px 0;">
-  <tr>
-    <td align="center" bgcolor="#00C853" style="
-      border-radius: 10px;
-      padding: 12px 24px;
-    ">
-      <a href="{link}" target="_blank" style="
-        font-size: 16px;
-        font-weight: 700;
-        color: #FFFFFF;
-        text-decoration: none;
-        font-family: Arial, sans-serif;
-        display: inline-block;
-      ">
-        {texto}
-      </a>
-    </td>
-  </tr>
-</table>
-"""
-
-
-
-
-def BOTAO_TELEGRAM(texto: str, link: str) -> str:
-    return f"""
-<table border="0" cellspacing="0" cellpadding="0" style="margin: 14px 0;">
-  <tr>
-    <td align="center" bgcolor="#7C4DFF" style="
-      border-radius: 10px;
-      padding: 12px 24px;
-    ">
-      <a href="{link}" target="_blank" style="
-        font-size: 16px;
-        font-weight: 700;
-        color: #FFFFFF;
-        text-decoration: none;
-        font-family: Arial, sans-serif;
-        display: inline-block;
-      ">
-        {texto}
-      </a>
-    </td>
-  </tr>
-</table>
-"""
-
-
-
-
-WHATSAPP_BTN = """
-<table border="0" cellspacing="0" cellpadding="0" style="margin-top: 24px;">
-  <tr>
-    <td align="center" bgcolor="#25D366" style="
-      border-radius: 10px;
-      padding: 12px 24px;
-    ">
-      <a href="https://wa.me/351915323219" target="_blank" style="
-        font-size: 16px;
-        font-weight: 700;
-        color: #000000;
-        text-decoration: none;
-        font-family: Arial, sans-serif;
-        display: inline-block;
-      ">
-        💬 Falar com Suporte
-      </a>
-    </td>
-  </tr>
-</table>
-"""
-
-
-
-
-
-def BOTAO_PREMIUM(link: str) -> str:
-    return f"""
-<table border="0" cellspacing="0" cellpadding="0" style="margin: 18px 0 24px;">
-  <tr>
-    <td align="center" bgcolor="#FF8F00" style="
-      border-radius: 12px;
-      padding: 16px 30px;
-    ">
-      <a href="{link}" target="_blank" style="
-        font-size: 18px;
-        font-weight: 800;
-        color: #000000;
-        text-decoration: none;
-        font-family: Arial, sans-serif;
-        display: inline-block;
-      ">
-        🔑 Acessar Painel Premium
-      </a>
-    </td>
-  </tr>
-</table>
-"""
-
-
-
-
-
-
-
-
-
-
-
-# ============================ TEMPLATE DOS E-MAILS PHOENIX ============================
-# ============================ TEMPLATE DOS E-MAILS PHOENIX ============================
-
-EMAIL_CORPOS = {
-    # =====================================================================
-    # 1) AÇÕES IBOV
-    # =====================================================================
-    "Carteira de Ações IBOV": """
-<h2>📈 Olá [[nome]]!</h2>
-<p>Bem-vindo(a) à <b>Carteira de Ações IBOV — Projeto Phoenix</b>.</p>
-
-<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
-
-<h3>🔥 O que você recebe</h3>
-<ul>
-  <li><b>Análises automatizadas</b> com algoritmos proprietários</li>
-  <li><b>Alertas automáticos</b> de entrada, saída e gestão</li>
-  <li><b>Métricas exclusivas Phoenix</b> (momentum, volatilidade, força setorial, score Phoenix)</li>
-  <li><b>StopATR inteligente</b>: ajusta stops dinamicamente conforme volatilidade</li>
-</ul>
-
-<h3>🔑 Seu acesso ao Painel Premium</h3>
-<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
-Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
-</p>
-
-[[PAINEL_PREMIUM]]
-
-<p style="color:#777; font-size:13px; margin-bottom: 22px;">
-💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
-para entrar sempre que quiser.
-</p>
-
-<h3>🚀 Próximos passos</h3>
-<ol>
-  <li>Leia o documento anexo e responda <b>ACEITE</b></li>
-  <li>Acesse o Grupo Google e valide sua entrada</li>
-  <li>Entre no canal do Telegram (link personalizado)</li>
-</ol>
-
-{BOTAO_GOOGLE_ACOES}
-
-<hr>
-
-<p>
-O Projeto Phoenix é construído sobre automação, disciplina e métricas inteligentes.<br>
-Conte conosco para elevar seu nível como investidor(a)!
-</p>
-
-{WHATSAPP_BTN}
-""",
-
-
-    # =====================================================================
-    # 2) BDRs
-    # =====================================================================
-    "Carteira de BDRs": """
-<h2>🌎 Olá [[nome]]!</h2>
-<p>Você agora faz parte da <b>Carteira de BDRs — Projeto Phoenix</b>.</p>
-
-<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
-
-<h3>🔥 O que você recebe</h3>
-<ul>
-  <li><b>Análises automatizadas</b> com enfoque internacional</li>
-  <li><b>Alertas automáticos</b> de compra, venda e risco</li>
-  <li><b>Métricas Phoenix</b> aplicadas a BDRs (momentum global, volatilidade, força setorial)</li>
-  <li><b>StopATR automático</b> ajustado ao comportamento dos ativos globais</li>
-</ul>
-
-<h3>🔑 Seu acesso ao Painel Premium</h3>
-<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
-Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
-</p>
-
-[[PAINEL_PREMIUM]]
-
-<p style="color:#777; font-size:13px; margin-bottom: 22px;">
-💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
-para entrar sempre que quiser.
-</p>
-
-<h3>🚀 Próximos passos</h3>
-<ol>
-  <li>Leia o documento em anexo e responda <b>ACEITE</b></li>
-  <li>Entre no Grupo Google da carteira</li>
-  <li>Entre no canal do Telegram (link personalizado)</li>
-</ol>
-
-{BOTAO_GOOGLE_BDRS}
-
-<hr>
-
-<p>
-Estamos juntos dentro do ecossistema Phoenix — tecnologia, análise e execução com precisão.
-</p>
-
-{WHATSAPP_BTN}
-""",
-
-
-    # =====================================================================
-    # 3) SMALL CAPS
-    # =====================================================================
-    "Carteira de Small Caps": """
-<h2>📉 Olá [[nome]]!</h2>
-<p>Bem-vindo(a) à <b>Carteira de Small Caps — Projeto Phoenix</b>.</p>
-
-<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
-
-<h3>🔥 O que você recebe</h3>
-<ul>
-  <li><b>Análises automatizadas</b> focadas em empresas de menor capitalização</li>
-  <li><b>Alertas automáticos</b> de entrada, saída e gestão</li>
-  <li><b>Métricas exclusivas Phoenix</b>: momentum, volatilidade, força setorial, score Phoenix</li>
-  <li><b>StopATR inteligente</b>: ajusta stops dinamicamente conforme volatilidade</li>
-</ul>
-
-<h3>🔑 Seu acesso ao Painel Premium</h3>
-<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
-Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
-</p>
-
-[[PAINEL_PREMIUM]]
-
-<p style="color:#777; font-size:13px; margin-bottom: 22px;">
-💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
-para entrar sempre que quiser.
-</p>
-
-<h3>🚀 Próximos passos</h3>
-<ol>
-  <li>Leia o documento anexo e responda <b>ACEITE</b></li>
-  <li>Entre no Grupo Google da carteira (link abaixo)</li>
-  <li>Acesse o canal do Telegram (link personalizado)</li>
-</ol>
-
-{BOTAO_GOOGLE_ACOES}
-
-<hr>
-
-<p>
-O Projeto Phoenix é construído sobre automação, disciplina e métricas inteligentes.<br>
-Conte conosco para elevar seu nível como investidor(a)!
-</p>
-
-{WHATSAPP_BTN}
-""",
-
-
-    # =====================================================================
-    # 4) OPÇÕES
-    # =====================================================================
-    "Carteira de Opções": """
-<h2>🔥 Olá [[nome]]!</h2>
-<p>Seja bem-vindo(a) à <b>Carteira de Opções — Projeto Phoenix</b>.</p>
-
-<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
-
-<h3>🔥 O que você recebe</h3>
-<ul>
-  <li><b>Operações estruturadas</b> com critérios objetivos</li>
-  <li><b>Alertas automáticos</b> com ticker, strike, vencimento e preço</li>
-  <li><b>Sistema Phoenix</b> com métricas exclusivas (IV, volatilidade, posição dos players, momentum)</li>
-  <li><b>Atualizações contínuas</b> de gestão e ajustes</li>
-  <li><b>StopATR inteligente</b> para proteção dinâmica</li>
-</ul>
-
-<h3>🔑 Seu acesso ao Painel Premium</h3>
-<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
-Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
-</p>
-
-[[PAINEL_PREMIUM]]
-
-<p style="color:#777; font-size:13px; margin-bottom: 22px;">
-💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
-para entrar sempre que quiser.
-</p>
-
-<h3>📌 Importante</h3>
-<p>
-Opções possuem maior volatilidade — siga os alertas do Phoenix para não perder o timing.
-</p>
-
-<h3>🚀 Próximos passos</h3>
-<ol>
-  <li>Leia o documento em anexo e responda <b>ACEITE</b></li>
-  <li>Valide sua entrada no Grupo Google</li>
-  <li>Acesse o canal do Telegram (link abaixo)</li>
-</ol>
-
-{BOTAO_GOOGLE_OPCOES}
-
-<hr>
-
-<p>
-Vamos buscar precisão, gestão e estratégia — pilares que definem o Projeto Phoenix.
-</p>
-
-{WHATSAPP_BTN}
-""",
-
-
-    "Scanner de Ações": """
-<h2>🧠 Olá [[nome]]!</h2>
-
-<p>
-Bem-vindo(a) ao <b>Scanner de Ações — Projeto Phoenix</b>.
-Você agora tem acesso a uma ferramenta profissional de análise técnica,
-desenvolvida para identificar oportunidades objetivas no mercado.
-</p>
-
-<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
-
-<h3>🔥 O que você recebe</h3>
-<ul>
-  <li>Scanner diário de ações do IBOV, SMLL e BDRs</li>
-  <li>Ranking automático por <b>Score Fênix</b></li>
-  <li>Análise técnica completa (tendência, momentum, volatilidade e volume)</li>
-  <li>Radar gráfico e critérios explicados ativo por ativo</li>
-  <li>Geração de <b>Relatórios APIMEC (PDF)</b></li>
-</ul>
-
-<h3>🔑 Seu acesso ao Scanner</h3>
-<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
-Utilize o botão abaixo para acessar o scanner exclusivo.
-Este acesso é pessoal e não exige senha.
-</p>
-
-[[PAINEL_PREMIUM]]
-
-<p style="color:#777; font-size:13px; margin-bottom: 22px;">
-💡 <b>Dica:</b> abra este link uma vez e salve nos Favoritos para acessar sempre que quiser.
-</p>
-
-<hr>
-
-<p>
-O Scanner de Ações Phoenix foi criado para quem busca
-<b>disciplina, método e leitura objetiva do mercado</b>.
-</p>
-
-{WHATSAPP_BTN}
-""",
-
-
-    "Scanner de Opções": """
-<h2>⚙️ Olá [[nome]]!</h2>
-
-<p>
-Você agora tem acesso ao <b>Scanner de Opções — Projeto Phoenix</b>,
-uma ferramenta avançada para leitura estratégica do mercado de derivativos.
-</p>
-
-<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
-
-<h3>🔥 O que você recebe</h3>
-<ul>
-  <li>Scanner de opções por ativo e vencimento</li>
-  <li>Filtros por volatilidade implícita, moneyness e payoff</li>
-  <li>Análise objetiva de Calls e Puts</li>
-  <li>Identificação de oportunidades com assimetria favorável</li>
-  <li>Visualização clara para estudos e relatórios</li>
-</ul>
-
-<h3>🔑 Seu acesso ao Scanner</h3>
-<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
-Utilize o botão abaixo para acessar o scanner exclusivo.
-Este acesso é pessoal e não exige senha.
-</p>
-
-[[PAINEL_PREMIUM]]
-
-<p style="color:#777; font-size:13px; margin-bottom: 22px;">
-💡 <b>Dica:</b> salve este link para acessar rapidamente sempre que precisar.
-</p>
-
-<hr>
-
-<p>
-Ferramenta desenvolvida para leitura profissional de opções,
-com foco em <b>gestão de risco, probabilidade e estrutura</b>.
-</p>
-
-{WHATSAPP_BTN}
-""",
-}
-
-
-
-
-# ============================ RENOVAÇÕES ============================
-EMAIL_RENOVACAO_30 = f"""
-<h2>⚠️ Sua assinatura está a 30 dias do vencimento, {{nome}}</h2>
-
-<p>Sua carteira <b>{{carteira}}</b> do Projeto Phoenix está próxima de vencer.</p>
-
-<p><b>Período atual:</b> {{inicio}} → {{fim}}</p>
-
-<p>Para manter acesso às análises automatizadas, alertas e métricas Phoenix, responda:</p>
-
-<p><b>RENOVAR</b></p>
-
-{WHATSAPP_BTN}
-
-<p>Equipe Phoenix 💚</p>
-"""
-
-EMAIL_RENOVACAO_15 = f"""
-<h2>📈 Renovação — faltam 15 dias</h2>
-
-<p>Olá {{nome}}, sua assinatura da carteira <b>{{carteira}}</b> está próxima do vencimento.</p>
-
-<p><b>Período atual:</b> {{inicio}} → {{fim}}</p>
-
-<p>Deseja renovar? Basta responder este e-mail com:</p>
-
-<p><b>Quero renovar</b></p>
-
-{WHATSAPP_BTN}
-"""
-
-EMAIL_RENOVACAO_7 = f"""
-<h2>⏳ Atenção — sua assinatura vence em 7 dias</h2>
-
-<p>{{nome}}, sua carteira <b>{{carteira}}</b> está quase no fim.</p>
-
-<p><b>Período atual:</b> {{inicio}} → {{fim}}</p>
-
-<p>Responda <b>RENOVAR</b> para não perder o acesso ao Phoenix.</p>
-
-{WHATSAPP_BTN}
-
-<p>Obrigado pela confiança! 💪</p>
-"""
-
-# ============================ ENVIO DOS E-MAILS ============================
-def _format_date_br(d: date) -> str:
-    try:
-        return d.strftime("%d/%m/%Y")
-    except:
-        try:
-            return pd.to_datetime(d).strftime("%d/%m/%Y")
-        except:
-            return str(d)
-
-def _enviar_email(nome: str, email_destino: str, assunto: str, corpo: str, anexar_pdf: bool):
-    try:
-        # camada externa
-        msg = MIMEMultipart("mixed")
-        msg["Subject"] = assunto
-        msg["From"] = EMAIL_USER
-        msg["To"] = email_destino
-
-        # camada interna (corpo do email)
-        body = MIMEMultipart("alternative")
-
-        # versão texto simples (fallback)
-        body.attach(MIMEText("Seu e-mail contém conteúdo em HTML. Abra em um cliente compatível.", "plain"))
-
-        # versão HTML
-        body.attach(MIMEText(corpo, "html", "utf-8"))
-
-        # adiciona o corpo ao email
-        msg.attach(body)
-
-        # anexo PDF (se existir)
-        if anexar_pdf:
-            with open("contrato_Aurinvest.pdf", "rb") as f:
-                part = MIMEApplication(f.read(), _subtype="pdf")
-                part.add_header("Content-Disposition", "attachment", filename="Contrato_Aurinvest.pdf")
-                msg.attach(part)
-
-        # envia
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASS)
-        server.sendmail(EMAIL_USER, [email_destino], msg.as_string())
-        server.quit()
-        return True, "OK"
-    except Exception as e:
-        return False, str(e)
-
-
-        
-# =========================================================
-# 🔁 EXPANSÃO DE PACOTES PHOENIX → CARTEIRAS REAIS
-# =========================================================
-PHOENIX_EXPANSION_MAP = {
-    "Carteira Phoenix Equity": [
-        "Carteira de Ações IBOV",
-        "Carteira de Small Caps",
-        "Carteira de BDRs",
-    ],
-    "Carteira Phoenix Full": [
-        "Carteira de Ações IBOV",
-        "Carteira de Small Caps",
-        "Carteira de BDRs",
-        "Carteira de Opções",
-    ],
-}
-
-
-def _expandir_carteiras(carteiras: list[str]) -> list[str]:
-    """
-    Recebe as carteiras cadastradas no CRM e
-    devolve a lista REAL de carteiras para envio de e-mails.
-    """
-    resultado = []
-
-    for c in carteiras:
-        # Se for pacote Phoenix → expande
-        if c in PHOENIX_EXPANSION_MAP:
-            for sub in PHOENIX_EXPANSION_MAP[c]:
-                if sub not in resultado:
-                    resultado.append(sub)
-        else:
-            # Carteira normal
-            if c not in resultado:
-                resultado.append(c)
-
-    return resultado
-
-
-def enviar_emails_por_carteira(nome: str, email_destino: str, carteiras: list, inicio: date, fim: date):
-    resultados = []
-    inicio_br = _format_date_br(inicio)
-    fim_br = _format_date_br(fim)
-
-    # 🔥 AQUI ACONTECE A MÁGICA
-    carteiras_reais = _expandir_carteiras(carteiras)
-
-    for c in carteiras_reais:
-        template = EMAIL_CORPOS.get(c, "")
-        if not template:
-            resultados.append((c, False, "Sem template configurado"))
-            continue
-
-        # 1) Placeholders básicos
-        corpo = (
-            template
-            .replace("[[nome]]", nome)
-            .replace("[[inicio]]", inicio_br)
-            .replace("[[fim]]", fim_br)
-        )
-
-        # 2) Link do Telegram (via bot)
-        link_telegram = None
-        if st.session_state.get("last_cadastro") and st.session_state.last_cadastro.get("id"):
-            cliente_id = st.session_state.last_cadastro["id"]
-            link_telegram = f"https://t.me/milhao_crm_bot?start={cliente_id}"
-
-        botao_telegram = BOTAO_TELEGRAM("Entrar no Telegram", link_telegram) if link_telegram else ""
-
-        anchor = "<hr>"
-        if botao_telegram:
-            if anchor in corpo:
-                parte1, parte2 = corpo.split(anchor, 1)
-                corpo = parte1 + botao_telegram + anchor + parte2
-            else:
-                corpo += botao_telegram
-
-        # 3) Link mágico / Painel Premium
-        link_acesso = None
-        if st.session_state.get("last_cadastro"):
-            link_acesso = st.session_state.last_cadastro.get("link_acesso")
-
-        if link_acesso:
-            corpo = corpo.replace("[[PAINEL_PREMIUM]]", BOTAO_PREMIUM(link_acesso))
-        else:
-            corpo = corpo.replace("[[PAINEL_PREMIUM]]", "")
-
-        # 4) Botões Google (por carteira)
-        if c in ("Carteira de Ações IBOV", "Carteira de Small Caps"):
-            corpo = corpo.replace("{BOTAO_GOOGLE_ACOES}", BOTAO_GOOGLE("Entrar no Grupo Google", LINK_GG_ACOES))
-        else:
-            corpo = corpo.replace("{BOTAO_GOOGLE_ACOES}", "")
-
-        if c == "Carteira de BDRs":
-            corpo = corpo.replace("{BOTAO_GOOGLE_BDRS}", BOTAO_GOOGLE("Entrar no Grupo Google", LINK_GG_BDRS))
-        else:
-            corpo = corpo.replace("{BOTAO_GOOGLE_BDRS}", "")
-
-        if c == "Carteira de Opções":
-            corpo = corpo.replace("{BOTAO_GOOGLE_OPCOES}", BOTAO_GOOGLE("Entrar no Grupo Google", LINK_GG_OPCOES))
-        else:
-            corpo = corpo.replace("{BOTAO_GOOGLE_OPCOES}", "")
-
-        # 5) Botão WhatsApp
-        corpo = corpo.replace("{WHATSAPP_BTN}", WHATSAPP_BTN)
-
-        # 6) Envio
-        assunto = f"Bem-vindo(a) — {c}"
-        anexar_pdf = True
-
-        ok, msg = _enviar_email(nome, email_destino, assunto, corpo, anexar_pdf)
-        resultados.append((c, ok, msg))
-
-    return resultados
-
-
-def enviar_email_renovacao(nome, email_destino, carteira, inicio, fim, dias):
-    inicio_br = _format_date_br(inicio)
-    fim_br = _format_date_br(fim)
-
-    mapping = {30: EMAIL_RENOVACAO_30, 15: EMAIL_RENOVACAO_15, 7: EMAIL_RENOVACAO_7}
-    corpo = mapping[dias].format(nome=nome, carteira=carteira, inicio=inicio_br, fim=fim_br)
-
-    assunto = f"Renovação — {carteira} ({dias} dias)"
-
-    return _enviar_email(nome, email_destino, assunto, corpo, anexar_pdf=False)
-
-
+# ---------------------- CARTEIRAS E E-MAILS ----------------------
+# Listas de carteiras, templates e envio ficam em carteiras.py / emails.py
+# (compartilhados com a rotina de renovações, que roda fora do Streamlit).
 
 
 # ---------------------- UI: CABEÇALHO ----------------------
@@ -911,53 +264,25 @@ with st.expander("ℹ️ Como funciona este CRM", expanded=False):
 # ---------------------- DASHBOARD / KPIs ----------------------
 # ---------------------- DASHBOARD / KPIs ----------------------
 try:
-    query = supabase.table("clientes").select("*").execute()
-    dados_kpi = query.data or []
-    df_kpi = pd.DataFrame(dados_kpi)
-
-    if not df_kpi.empty:
-
-        df_kpi["data_fim"] = pd.to_datetime(df_kpi["data_fim"], errors="coerce").dt.date
+    # os quatro cards numa fonte só, com a regra da coluna de status; "ativos"
+    # é o mesmo número da página de MRR e do relatório (linha_do_tempo.py)
+    k = obter_indice_vencimentos(obter_snapshot(supabase)).kpis(date.today())
 
-        # --- Normaliza carteiras ---
-        def normalize_carteiras(v):
-            if isinstance(v, list):
-                return v
-            if isinstance(v, str):
-                try:
-                    return [x.strip().strip("'").strip('"') for x in v.strip("[]").split(",") if x.strip()]
-                except:
-                    return []
-            return []
-
-        df_kpi["carteiras"] = df_kpi["carteiras"].apply(normalize_carteiras)
-
-        today = date.today()
-
-        # 👉 Filtra LEADS
-        leads = df_kpi[df_kpi["carteiras"].apply(lambda x: "Leads" in x)]
-
-        # 👉 Clientes reais
-        clientes = df_kpi[df_kpi["carteiras"].apply(lambda x: "Leads" not in x)]
-
-        # KPIs corretos
-        ativos = clientes[clientes["data_fim"] >= today]
-        vencendo = clientes[(clientes["data_fim"] >= today) & (clientes["data_fim"] <= today + timedelta(days=30))]
-        vencidos = clientes[clientes["data_fim"] < today]
+    if any(k.values()):
 
         c1, c2, c3, c4 = st.columns(4)
 
         with c1:
-            st.markdown(f"<div class='card'><h3>🟢 {len(ativos)}</h3><p>Clientes Ativos</p></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='card'><h3>🟢 {k['ativos']}</h3><p>Clientes Ativos</p></div>", unsafe_allow_html=True)
         
         with c2:
-            st.markdown(f"<div class='card'><h3>🟡 {len(vencendo)}</h3><p>≤ 30 dias para vencer</p></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='card'><h3>🟡 {k['vencendo']}</h3><p>≤ 30 dias para vencer</p></div>", unsafe_allow_html=True)
         
         with c3:
-            st.markdown(f"<div class='card'><h3>🔴 {len(vencidos)}</h3><p>Vencidos</p></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='card'><h3>🔴 {k['vencidos']}</h3><p>Vencidos</p></div>", unsafe_allow_html=True)
 
         with c4:
-            st.markdown(f"<div class='card'><h3>⚪ {len(leads)}</h3><p>Leads</p></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='card'><h3>⚪ {k['leads']}</h3><p>Leads</p></div>", unsafe_allow_html=True)
 
 
 
@@ -1000,28 +325,8 @@ with st.expander("Formulário", expanded=is_edit):
         with c4:
             numero = st.text_input("Telefone", value=edit_data.get("telefone", ""), placeholder="(00) 00000-0000")
         with c5:                       
-            # tratar carteiras para o multiselect
-            # --- trata carteiras para o multiselect ---
-            raw_carteiras = edit_data.get("carteiras", [])
-            
-            if isinstance(raw_carteiras, list):
-                carteiras_val = raw_carteiras
-            
-            elif isinstance(raw_carteiras, str):
-                if raw_carteiras.strip() == "":
-                    carteiras_val = []
-                else:
-                    parts = [p.strip() for p in raw_carteiras.replace("[","").replace("]","").replace("'","").split(",")]
-                    carteiras_val = [p for p in parts if p != ""]
-            
-            elif raw_carteiras is None:
-                carteiras_val = []
-            
-            else:
-                carteiras_val = [str(raw_carteiras)]
-            
-            # garante que só valores válidos entrem
-            carteiras_val = [c for c in carteiras_val if c in CARTEIRAS_OPCOES]
+            # tratar carteiras para o multiselect (só valores válidos)
+            carteiras_val = [c for c in normalizar_carteiras(edit_data.get("carteiras")) if c in CARTEIRAS_OPCOES]
             
             carteiras = st.multiselect("Carteiras", CARTEIRAS_OPCOES, default=carteiras_val)
 
@@ -1071,7 +376,13 @@ with st.expander("Formulário", expanded=is_edit):
             if is_edit:
                 try:
                     edit_id = str(st.session_state.get("selected_client_id"))
-            
+
+                    # renovação (data_fim andou para frente): a varredura de
+                    # expiração volta a considerar o cliente quando vencer de novo
+                    fim_anterior = edit_data.get("data_fim")
+                    if pd.isna(fim_anterior) or fim > fim_anterior:
+                        payload["telegram_removed_at"] = None
+
                     # 🔄 Atualiza cliente no Supabase
                     response = (
                         supabase.table("clientes")
@@ -1079,6 +390,7 @@ with st.expander("Formulário", expanded=is_edit):
                         .eq("id", edit_id)
                         .execute()
                     )
+                    obter_snapshot(supabase).invalidar()
                     
                     telegram_link = f"https://t.me/milhao_crm_bot?start={edit_id}"
 
@@ -1146,6 +458,7 @@ with st.expander("Formulário", expanded=is_edit):
                     
                     # salvar token no BD
                     supabase.table("clientes").update({"token": token}).eq("id", cliente_id).execute()
+                    obter_snapshot(supabase).invalidar()
                     
                     # gerar link de acesso completo
                     link_acesso = f"https://phoenix-strategy.onrender.com/login/?token={token}"
@@ -1165,30 +478,59 @@ if "last_cadastro" in st.session_state and st.session_state.last_cadastro:
     lc = st.session_state.last_cadastro
     lista = ", ".join(lc.get("carteiras", [])) if lc.get("carteiras") else "Nenhuma carteira selecionada"
     st.info(f"Enviar e-mail de boas-vindas para **{lc['email']}** — carteiras: **{lista}**?")
+    modo_envio = st.radio(
+        "Formato do pack",
+        ["✉️ Um e-mail por carteira", "📦 Pack consolidado (um e-mail, um PDF)"],
+        horizontal=True,
+    )
     c1, c2 = st.columns([1, 1])
     with c1:
         if st.button("✉️ Enviar e-mails com Pack boas vindas", use_container_width=True):
             if not lc.get("carteiras"):
                 st.warning("Nenhuma carteira selecionada. Nada foi enviado.")
+                st.session_state.last_cadastro = None
             else:
-                resultados = enviar_emails_por_carteira(
+                dados_pack = dict(
                     nome=lc["nome"],
                     email_destino=lc["email"],
                     carteiras=lc["carteiras"],
                     inicio=lc["inicio"],
-                    fim=lc["fim"]
+                    fim=lc["fim"],
+                    cliente_id=lc.get("id"),
+                    link_acesso=lc.get("link_acesso")
                 )
-                # Feedback por carteira
-                ok_all = True
-                for carteira, ok, msg in resultados:
-                    if ok:
-                        st.success(f"✅ {carteira}: enviado")
-                    else:
-                        ok_all = False
-                        st.error(f"❌ {carteira}: falhou — {msg}")
-                if ok_all:
-                    st.toast("Todos os e-mails foram enviados com sucesso.", icon="✅")
-            st.session_state.last_cadastro = None
+                # lote: (rótulo, carteira da chave, item) — item None = sem template
+                if modo_envio.startswith("📦"):
+                    item, incluidas, sem_template = montar_email_consolidado(**dados_pack)
+                    lote = [(c, c, None) for c in sem_template]
+                    if item:
+                        lote.insert(0, (f"Pack consolidado ({', '.join(incluidas)})", "pack", item))
+                    template_chave = "boas_vindas_consolidado"
+                else:
+                    lote = [(c, c, item) for c, item in montar_emails_por_carteira(**dados_pack)]
+                    template_chave = "boas_vindas"
+
+                itens = [
+                    (chave_idempotencia(lc["id"], carteira, template_chave, date.today()), *item)
+                    for _, carteira, item in lote if item
+                ]
+                try:
+                    novos = iter(obter_outbox().enfileirar(itens))
+                except Exception as e:
+                    # mantém last_cadastro para poder tentar de novo
+                    st.error(f"❌ Não foi possível colocar os e-mails na fila: {e}")
+                else:
+                    acordar_worker()
+                    # Feedback por carteira
+                    for carteira, _, item in lote:
+                        if not item:
+                            st.error(f"❌ {carteira}: Sem template configurado")
+                        elif next(novos):
+                            st.success(f"📨 {carteira}: na fila de envio")
+                        else:
+                            st.info(f"ℹ️ {carteira}: já estava na fila hoje — não será reenviado")
+                    st.toast("E-mails na fila — o envio acontece em segundo plano.", icon="✅")
+                    st.session_state.last_cadastro = None
     with c2:
         if st.button("❌ Não enviar e-mails", use_container_width=True):
             st.session_state.last_cadastro = None
@@ -1207,56 +549,35 @@ st.markdown("<br><br>", unsafe_allow_html=True)
 st.subheader("🧑‍🤝‍🧑 Clientes Cadastrados")
 st.markdown("<br>", unsafe_allow_html=True)
 
-# 1️⃣ Buscar dados
+# 1️⃣ Buscar dados (snapshot compartilhado, já normalizado)
 try:
-    query = (
-        supabase
-        .table("clientes")
-        .select("*")
-        .order("created_at", desc=True)
-        .execute()
-    )
-    dados = query.data or []
+    df_clientes = obter_snapshot(supabase).dataframe()
 except Exception as e:
     st.error(f"Erro ao buscar dados no Supabase: {e}")
-    dados = []
-
-# 2️⃣ Disparador automático de avisos de renovação
-from datetime import date
-
-# Disparador automático de avisos de renovação
-for cli in dados:
-    try:
-        fim = pd.to_datetime(cli["data_fim"]).date()
-    except:
-        continue
-
-    today = date.today()
-    dias = (fim - today).days
-
-    avisos = {30: "aviso_30", 15: "aviso_15", 7: "aviso_7"}
-
-    if dias in avisos:
-        campo = avisos[dias]
-
-        if not cli.get(campo, False):
-            carteiras = cli.get("carteiras", [])
-            if isinstance(carteiras, str):
-                carteiras = [x.strip() for x in carteiras.split(",")]
-
-            for cart in carteiras:
-                enviar_email_renovacao(
-                    nome=cli["nome"],
-                    email_destino=cli["email"],
-                    carteira=cart,
-                    inicio=cli["data_inicio"],
-                    fim=cli["data_fim"],
-                    dias=dias
-                )
-
-            supabase.table("clientes").update({campo: True}).eq("id", cli["id"]).execute()
-
-            st.toast(f"📬 E-mail de renovação enviado ({dias} dias) — {cli['nome']}", icon="✅")
+    df_clientes = pd.DataFrame()
+
+# 2️⃣ Avisos de renovação: rodam em background (renovacoes.py); aqui só exibimos o resultado
+status_renov = ultimo_status()
+if status_renov and status_renov.get("enviados"):
+    enviados = status_renov["enviados"]
+    with st.expander(f"📬 Avisos de renovação — última execução {status_renov['executado_em']} ({len(enviados)} e-mails)"):
+        for e in enviados:
+            st.write(f"📨 {e['nome']} — {e['carteira']} ({e['dias']} dias): {e['msg']}")
+
+# 3️⃣ Fila de e-mails (outbox): envio em background com retry; falhas definitivas podem ser reenviadas
+outbox = obter_outbox()
+contagem_outbox = outbox.contagem()
+pendentes_outbox = contagem_outbox.get("pendente", 0) + contagem_outbox.get("enviando", 0)
+falhas_outbox = outbox.listar(status="falhou", limite=20)
+if pendentes_outbox or falhas_outbox:
+    with st.expander(f"📮 Fila de e-mails — {pendentes_outbox} pendentes, {contagem_outbox.get('falhou', 0)} com falha"):
+        for f in falhas_outbox:
+            c1, c2 = st.columns([5, 1])
+            c1.error(f"❌ {f['email_destino']} — {f['assunto']}: {f['ultimo_erro']}")
+            if c2.button("🔁 Reenviar", key=f"reenviar_{f['chave']}"):
+                outbox.reenviar(f["chave"])
+                acordar_worker()
+                st.rerun()
 
 
 
@@ -1266,18 +587,8 @@ for cli in dados:
 # ---------------------- FILTROS AVANÇADOS ----------------------
 
 # 4️⃣ Renderização da tabela
-if dados:
-    df = pd.DataFrame(dados)
-    df["id"] = df["id"].astype(str)
-
-    # 🔧 Ajusta campos obrigatórios
-    for col in ["nome","telefone","email","carteiras","data_inicio","data_fim","pagamento","valor","observacao","id"]:
-        if col not in df.columns:
-            df[col] = None
-    
-    # Converte datas antes dos filtros
-    df["data_inicio"] = pd.to_datetime(df["data_inicio"], errors="coerce").dt.date
-    df["data_fim"] = pd.to_datetime(df["data_fim"], errors="coerce").dt.date
+if not df_clientes.empty:
+    df_clientes["status"] = calcular_status(df_clientes)
     
     # ---------------------- FILTROS AVANÇADOS ----------------------
     with st.expander("⚙️ Filtros Avançados"):
@@ -1290,52 +601,50 @@ if dados:
             default=[]
         )
     
-        status_opcoes = ["🟢 Ativos", "🟡 Vencendo (≤ 30 dias)", "🔴 Vencidos"]
         filtro_status = st.multiselect(
             "Status da Vigência",
-            status_opcoes,
+            list(FILTROS_STATUS),
             default=[]
         )
+
+        por_pagina = st.selectbox("Clientes por página", POR_PAGINA_OPCOES, index=1)
     
-    # 🔎 Busca texto
-    if search:
-        df = df[
-            df["nome"].fillna("").str.contains(search, case=False, na=False) |
-            df["email"].fillna("").str.contains(search, case=False, na=False) |
-            df["telefone"].fillna("").str.contains(search, case=False, na=False)
-        ]
-    
-    # 📂 Filtro carteira
-    if filtro_carteira:
-        df = df[df["carteiras"].apply(
-            lambda x: any(c in x for c in filtro_carteira) if isinstance(x, list) else False
-        )]
-    
-    # 🟢🟡🔴 Filtro vigência
-    if filtro_status:
-        hoje = date.today()
-        def status_calc(d):
-            if d < hoje: 
-                return "🔴 Vencidos"
-            dias = (d - hoje).days
-            return "🟡 Vencendo (≤ 30 dias)" if dias <= 30 else "🟢 Ativos"
-    
-        df = df[df["data_fim"].apply(status_calc).isin(filtro_status)]
-    
-    # Ordenação final por data fim
-    df = df.sort_values(by="data_fim", ascending=True)
+    # 🔎 Com texto: índice em memória (acentos/erros de digitação, ranqueado) sobre o snapshot
+    # 📂🟢 Sem texto: carteiras e vigência filtradas no Supabase; só a página visível vem
+    chave_filtros = (search, tuple(filtro_carteira), tuple(filtro_status), por_pagina)
+    if st.session_state.get("lista_filtros") != chave_filtros:
+        st.session_state["lista_filtros"] = chave_filtros
+        st.session_state["lista_pagina"] = 0
+    pagina = st.session_state.get("lista_pagina", 0)
+
+    status_sel = [FILTROS_STATUS[f] for f in filtro_status]
+    try:
+        if search.strip():
+            ids_busca = [i for i, _ in obter_indice(obter_snapshot(supabase)).buscar(search)]
+            df, total_filtrado = pagina_local(
+                df_clientes, ids_busca, filtro_carteira, status_sel, pagina, por_pagina
+            )
+        else:
+            df, total_filtrado = buscar_pagina(
+                supabase,
+                carteiras=filtro_carteira,
+                status=status_sel,
+                pagina=pagina,
+                por_pagina=por_pagina,
+            )
+    except FiltroCarteirasIndisponivel:
+        # coluna carteiras não é text[]: mesmos filtros sobre o snapshot
+        df, total_filtrado = pagina_local(
+            df_clientes, ordem_padrao(df_clientes), filtro_carteira, status_sel, pagina, por_pagina
+        )
+    except Exception as e:
+        st.error(f"Erro ao buscar clientes no Supabase: {e}")
+        df, total_filtrado = df_clientes.iloc[0:0].copy(), 0
+    df["status"] = calcular_status(df)
+    total_paginas = max(1, -(-total_filtrado // por_pagina))
     
     # Formata carteiras p/ tabela
-    df["carteiras"] = df["carteiras"].apply(
-        lambda v: ", ".join(v) if isinstance(v, list) else (v or "")
-    )
-
-
-
-    def carteiras_to_str(v):
-        return ", ".join(v) if isinstance(v, list) else (v or "")
-
-    df["carteiras"] = df["carteiras"].apply(carteiras_to_str)
+    df["carteiras"] = df["carteiras"].str.join(", ")
 
     # Criar DataFrame da tabela
     df_view = pd.DataFrame({
@@ -1352,29 +661,7 @@ if dados:
     })
     
     # Status Vigência
-    def status_vigencia(data_fim, carteiras=None):        
-        # Leads sempre ficam com bolinha branca
-        if carteiras and "Leads" in carteiras:
-            return "⚪ Lead"
-    
-        hoje = date.today()
-    
-        if isinstance(data_fim, date):
-            if data_fim < hoje:
-                return "🔴 Vencida"
-            dias = (data_fim - hoje).days
-            return "🟡 < 30 dias" if dias <= 30 else "🟢 > 30 dias"
-    
-        return ""
-
-    
-    df_view["Status Vigência"] = df_view.apply(
-        lambda r: status_vigencia(
-            r["Fim"],
-            r["Carteiras"].split(", ") if isinstance(r["Carteiras"], str) else []
-        ),
-        axis=1
-    )
+    df_view["Status Vigência"] = df["status"].map(ROTULOS_TABELA).fillna("")
 
 
     
@@ -1402,6 +689,19 @@ if dados:
         disabled=["ID","Nome","Email","Telefone","Carteiras","Início","Fim","Pagamento","Valor (R$)","Observação","Status Vigência"],
     )
 
+    # Paginação
+    p1, p2, p3 = st.columns([1, 3, 1])
+    with p1:
+        if st.button("◀ Anterior", disabled=pagina == 0):
+            st.session_state["lista_pagina"] = pagina - 1
+            st.rerun()
+    with p2:
+        st.caption(f"Página {pagina + 1} de {total_paginas} — {total_filtrado} clientes")
+    with p3:
+        if st.button("Próxima ▶", disabled=pagina + 1 >= total_paginas):
+            st.session_state["lista_pagina"] = pagina + 1
+            st.rerun()
+
     selected_rows = edited[edited["Selecionar"]]
     if len(selected_rows) > 0:
         sel = selected_rows.iloc[0]
@@ -1459,6 +759,7 @@ if dados:
         with c1:
             if st.button("✅ Confirmar exclusão"):
                 supabase.table("clientes").delete().eq("id", st.session_state["delete_id"]).execute()
+                obter_snapshot(supabase).remover(st.session_state["delete_id"])
                 st.toast("✅ Cliente excluído", icon="🗑")
                 st.session_state["confirm_delete"] = False
                 st.session_state["selected_client_id"] = None
@@ -1477,21 +778,8 @@ if dados:
         dt_inicio = c1.date_input("Data inicial", value=date.today().replace(day=1))
         dt_fim = c2.date_input("Data final", value=date.today())
 
-        # Normaliza carteiras antes do filtro
-        def normalize_carteiras(v):
-            if isinstance(v, list):
-                return v
-            if isinstance(v, str):
-                try:
-                    return [x.strip().strip("'").strip('"') for x in v.strip("[]").split(",") if x.strip()]
-                except:
-                    return []
-            return []
-        
-        df["carteiras"] = df["carteiras"].apply(normalize_carteiras)
-        
         # Filtra apenas clientes NÃO Leads
-        df_sem_leads = df[df["carteiras"].apply(lambda x: "Leads" not in x)]
+        df_sem_leads = df_clientes[df_clientes["status"] != LEAD]
         
         # Relatório apenas com clientes reais
         df_rel = df_sem_leads[
@@ -1502,7 +790,19 @@ if dados:
 
         st.write(f"🔎 Registros encontrados: **{len(df_rel)}**")
 
+        # base no período (linha_do_tempo.py: mesmos números da página de MRR)
+        if dt_fim >= dt_inicio:
+            periodo = obter_linha_do_tempo(obter_snapshot(supabase)).serie(dt_inicio, dt_fim)
+            p1, p2, p3, p4 = st.columns(4)
+            p1.metric("Ativos no fim", int(periodo["ativos"].iloc[-1]),
+                      int(periodo["ativos"].iloc[-1] - periodo["ativos"].iloc[0]))
+            p2.metric("MRR no fim", f"R$ {periodo['mrr'].iloc[-1]:,.2f}")
+            p3.metric("Novos", int(periodo["novos"].sum()))
+            p4.metric("Cancelados", int(periodo["cancelados"].sum()))
+            st.line_chart(periodo, x="dia", y="ativos")
+
         df_rel["valor"] = pd.to_numeric(df_rel["valor"], errors="coerce").fillna(0)
+        df_rel["carteiras"] = df_rel["carteiras"].str.join(", ")
         total = df_rel["valor"].sum()
 
         st.dataframe(df_rel[["nome","email","carteiras","data_inicio","data_fim","valor"]], use_container_width=True)
@@ -0,0 +1,26 @@
+# config.py
+# ------------------------------------------------------------
+# Leitura de segredos compartilhada entre o app Streamlit e os
+# processos headless (renovações, bot, rotinas agendadas).
+# - No Streamlit Cloud: st.secrets
+# - Fora do Streamlit: variáveis de ambiente (.env, se existir)
+# ------------------------------------------------------------
+
+import os
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+
+def get_secret(name: str, default=None):
+    # Prioriza st.secrets (Cloud). Sem Streamlit ou sem secrets.toml, cai para o ambiente.
+    try:
+        import streamlit as st
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        pass
+    return os.getenv(name, default)
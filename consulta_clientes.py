@@ -0,0 +1,135 @@
+# consulta_clientes.py
+# ------------------------------------------------------------
+# Consulta paginada da tabela `clientes` direto no Supabase
+# - Busca (ilike em nome/email/telefone), carteiras e faixas de
+#   data_fim viram filtros do PostgREST
+# - Só a página visível trafega (range), com o total (count=exact)
+# - Devolve o mesmo DataFrame normalizado do snapshot
+#
+# Uso:
+#   df, total = buscar_pagina(supabase, busca="maria", carteiras=["Carteira de Opções"],
+#                             status=["vencendo"], pagina=0, por_pagina=50)
+#
+# Com texto na busca, a tela usa o índice em memória (indice_busca.py,
+# tolera acento e erro de digitação) e pagina o snapshot com
+# pagina_local(), na ordem do ranking.
+#
+# Carteiras: filtro por sobreposição (ov), que exige coluna text[].
+# Se o banco recusar o operador (coluna text/json), buscar_pagina
+# levanta FiltroCarteirasIndisponivel e a tela pagina o snapshot com
+# pagina_local() na ordem de ordem_padrao().
+# ------------------------------------------------------------
+
+import re
+from datetime import date, timedelta
+
+import pandas as pd
+
+from carteiras import mascara
+from snapshot_clientes import normalizar_clientes
+from status_clientes import A_INICIAR, ATIVO, DIAS_VENCENDO, VENCENDO, VENCIDO, calcular_status
+
+POR_PAGINA_OPCOES = [25, 50, 100, 200]
+
+# erros do Postgres quando `carteiras` não é array: operador inexistente,
+# literal de array inválido, tipo incompatível
+_ERROS_TIPO_ARRAY = {"42883", "22P02", "42804"}
+
+
+class FiltroCarteirasIndisponivel(Exception):
+    """O banco recusou o filtro de array em `carteiras` (a coluna não é text[])."""
+
+
+def recusou_array(e: Exception) -> bool:
+    """Erro do PostgREST por `carteiras` não ser text[] (usado também por expiracao.py)."""
+    return str(getattr(e, "code", "")) in _ERROS_TIPO_ARRAY or "operator does not exist" in str(e)
+
+# caracteres com significado na sintaxe de filtros do PostgREST
+_RESERVADOS = re.compile(r'[,()*%"\\:]')
+
+
+def _termo_busca(texto: str) -> str:
+    """Reservados viram curinga: "Jo(ão)" busca como *Jo*ão*."""
+    return re.sub(r"\*+", "*", _RESERVADOS.sub("*", texto.strip())).strip("*")
+
+
+def _faixas_status(status: list, hoje: date) -> list:
+    """Status de vigência → condições em data_fim/data_inicio (para um or=(...))."""
+    limite = (hoje + timedelta(days=DIAS_VENCENDO)).isoformat()
+    hoje = hoje.isoformat()
+    faixas = {
+        VENCIDO: f"data_fim.lt.{hoje}",
+        VENCENDO: f"and(data_fim.gte.{hoje},data_fim.lte.{limite},data_inicio.lte.{hoje})",
+        ATIVO: f"and(data_fim.gt.{limite},data_inicio.lte.{hoje})",
+        A_INICIAR: f"and(data_fim.gte.{hoje},data_inicio.gt.{hoje})",
+    }
+    return [faixas[s] for s in status if s in faixas]
+
+
+def montar_query(supabase, busca: str = "", carteiras: list = None, status: list = None,
+                 hoje: date = None, **kwargs_select):
+    hoje = hoje or date.today()
+    q = supabase.table("clientes").select("*", **kwargs_select)
+    grupos_or = []
+
+    termo = _termo_busca(busca or "")
+    if termo:
+        grupos_or.append([f"{col}.ilike.*{termo}*" for col in ("nome", "email", "telefone")])
+
+    if carteiras:
+        q = q.overlaps("carteiras", list(carteiras))
+
+    faixas = _faixas_status(status or [], hoje)
+    if faixas:
+        grupos_or.append(faixas)
+        # com filtro de vigência, Leads ficam de fora (mesma regra da coluna de
+        # status); carteiras null não é Lead, mas not.ov sozinho a descartaria
+        grupos_or.append(["carteiras.is.null", "not.carteiras.ov.{Leads}"])
+
+    # um único parâmetro or=(...): vários grupos viram or=(and(or(...),or(...),...))
+    if len(grupos_or) == 1:
+        q = q.or_(",".join(grupos_or[0]))
+    elif grupos_or:
+        q = q.or_("and(" + ",".join(f"or({','.join(g)})" for g in grupos_or) + ")")
+
+    return q
+
+
+def buscar_pagina(supabase, busca: str = "", carteiras: list = None, status: list = None,
+                  pagina: int = 0, por_pagina: int = 50, hoje: date = None) -> tuple:
+    """(DataFrame da página, total de linhas que atendem aos filtros)."""
+    inicio = pagina * por_pagina
+    try:
+        res = (
+            montar_query(supabase, busca, carteiras, status, hoje, count="exact")
+            .order("data_fim")
+            .order("id")
+            .range(inicio, inicio + por_pagina - 1)
+            .execute()
+        )
+    except Exception as e:
+        # carteiras e status usam ov em `carteiras`
+        if (carteiras or status) and recusou_array(e):
+            raise FiltroCarteirasIndisponivel(str(e)) from e
+        raise
+    return normalizar_clientes(res.data or []), res.count or 0
+
+
+def ordem_padrao(df: pd.DataFrame) -> list:
+    """ids na ordem do buscar_pagina (data_fim, id; sem data por último)."""
+    return df.sort_values(["data_fim", "id"], na_position="last", kind="stable")["id"].tolist()
+
+
+def pagina_local(df: pd.DataFrame, ids: list, carteiras: list = None, status: list = None,
+                 pagina: int = 0, por_pagina: int = 50) -> tuple:
+    """Mesmos filtros sobre o snapshot, só com `ids` e na ordem deles (ranking da busca)."""
+    ordem = pd.Series(range(len(ids)), index=ids)
+    df = df[df["id"].isin(ordem.index)]
+    if carteiras:
+        df = df[(df["carteiras_mask"] & mascara(carteiras)) != 0]
+    if status:
+        st_col = df["status"] if "status" in df.columns else calcular_status(df)
+        df = df[st_col.isin(status)]
+    df = df.iloc[df["id"].map(ordem).argsort(kind="stable")]
+    inicio = pagina * por_pagina
+    return df.iloc[inicio:inicio + por_pagina].copy(), len(df)
@@ -0,0 +1,125 @@
+# coortes.py
+# ------------------------------------------------------------
+# Retenção por coorte (mês de entrada × meses desde a entrada)
+# - Coorte = mês de data_inicio; o cliente conta como retido no
+#   mês k se data_fim cai no mês (coorte + k) ou depois
+# - Sem laço por cliente: cada contrato vira um par (coorte,
+#   duração em meses); um bincount por célula conta quem sai em cada
+#   duração e a soma acumulada de trás para frente dá quantos
+#   ainda estão ativos em cada k (varredura de eventos de saída)
+# - Meses que ainda não aconteceram ficam NaN (coorte recente
+#   não puxa a curva para baixo)
+# - LTV = receita média acumulada por cliente ao longo da curva
+#   de retenção consolidada, com cauda geométrica pela retenção
+#   mensal dos últimos meses observados
+# - Guardado por (versão do snapshot, dia)
+#
+# Uso:
+#   c = obter_coortes(obter_snapshot(supabase))
+#   c.retencao      # DataFrame coorte × k (0..1)
+#   c.receita       # DataFrame coorte × k (R$ no mês k)
+#   c.ltv()         # R$ por cliente
+# ------------------------------------------------------------
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from linha_do_tempo import contratos
+
+MESES_CAUDA = 6       # meses finais da curva usados para estimar a retenção da cauda
+
+
+def _mes(dias: np.ndarray) -> np.ndarray:
+    """datetime64[D] → número do mês (meses desde 1970-01)."""
+    return dias.astype("datetime64[M]").astype(np.int64)
+
+
+class Coortes:
+    def __init__(self, df: pd.DataFrame, hoje: date = None):
+        hoje = hoje or date.today()
+        inicio, fim, mensal = contratos(df)
+        mes_hoje = int(_mes(np.datetime64(hoje, "D")))
+
+        ok = inicio <= np.datetime64(hoje, "D")
+        coorte = _mes(inicio[ok])
+        # meses completos de permanência; vigências em aberto são cortadas no mês atual
+        duracao = np.minimum(_mes(fim[ok]), mes_hoje) - coorte
+        duracao = np.maximum(duracao, 0)
+        mensal = mensal[ok]
+
+        if len(coorte) == 0:
+            vazio = pd.DataFrame(dtype=float)
+            self.tamanho, self.retencao, self.receita = pd.Series(dtype=int), vazio, vazio
+            return
+
+        c0 = int(coorte.min())
+        n_coortes = mes_hoje - c0 + 1
+        linha = coorte - c0
+
+        # saídas por (coorte, duração) → ativos em k = saídas com duração >= k
+        celula = linha * n_coortes + duracao
+        saidas = np.bincount(celula, minlength=n_coortes ** 2).reshape(n_coortes, n_coortes)
+        valor_saidas = np.bincount(celula, weights=mensal, minlength=n_coortes ** 2).reshape(n_coortes, n_coortes)
+        ativos = saidas[:, ::-1].cumsum(axis=1)[:, ::-1]
+        receita = valor_saidas[:, ::-1].cumsum(axis=1)[:, ::-1]
+
+        # k observável só até o mês atual
+        k = np.arange(n_coortes)
+        futuro = k[None, :] > (n_coortes - 1 - np.arange(n_coortes))[:, None]
+        tamanho = ativos[:, 0]
+
+        rotulos = pd.period_range(
+            pd.Timestamp(np.datetime64(c0, "M")), periods=n_coortes, freq="M"
+        ).astype(str)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ret = np.where(futuro, np.nan, ativos / tamanho[:, None])
+        rec = np.where(futuro, np.nan, receita.astype(float))
+
+        tem = tamanho > 0
+        self.tamanho = pd.Series(tamanho[tem], index=rotulos[tem], name="clientes")
+        self.retencao = pd.DataFrame(ret[tem], index=rotulos[tem], columns=k).rename_axis("coorte")
+        self.receita = pd.DataFrame(rec[tem], index=rotulos[tem], columns=k).rename_axis("coorte")
+        self._ativos = np.where(futuro, 0, ativos)[tem]
+        self._receita = np.where(futuro, 0.0, receita)[tem]
+        self._base = np.where(futuro, 0, tamanho[:, None])[tem]
+
+    def curva(self) -> pd.Series:
+        """Retenção consolidada em k: ativos em k ÷ tamanho das coortes que já chegaram em k."""
+        if self.retencao.empty:
+            return pd.Series(dtype=float)
+        base = self._base.sum(axis=0)
+        observados = base > 0
+        return pd.Series(self._ativos.sum(axis=0)[observados] / base[observados])
+
+    def receita_por_cliente(self) -> pd.Series:
+        """R$ médio que um cliente gera no mês k (já considerando quem saiu)."""
+        if self.retencao.empty:
+            return pd.Series(dtype=float)
+        base = self._base.sum(axis=0)
+        observados = base > 0
+        return pd.Series(self._receita.sum(axis=0)[observados] / base[observados])
+
+    def ltv(self) -> float:
+        """Receita acumulada esperada por cliente, com cauda geométrica além do observado."""
+        rpc = self.receita_por_cliente()
+        if rpc.empty:
+            return 0.0
+        total = float(rpc.sum())
+
+        curva = self.curva().to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            passos = curva[1:][-MESES_CAUDA:] / curva[:-1][-MESES_CAUDA:]
+        passos = passos[np.isfinite(passos)]
+        r = float(passos.mean()) if len(passos) else 0.0
+        if 0 < r < 1:
+            total += float(rpc.iloc[-1]) * r / (1 - r)
+        return total
+
+
+# ---------------------- COORTES DO SNAPSHOT ----------------------
+def obter_coortes(snapshot, hoje: date = None) -> Coortes:
+    """A matriz depende do dia (meses observáveis), então o dia entra na chave."""
+    hoje = hoje or date.today()
+    return snapshot.derivado(("coortes", hoje), lambda df: Coortes(df, hoje))
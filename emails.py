@@ -0,0 +1,686 @@
+# emails.py
+# ------------------------------------------------------------
+# Templates e envio dos e-mails Phoenix
+# - Pack de boas-vindas por carteira (PDF do contrato anexo)
+# - Avisos de renovação (30 / 15 / 7 dias)
+#
+# Secrets: email_sender, gmail_app_password
+# (fora do Streamlit também aceita EMAIL_USER / EMAIL_PASS / EMAIL_HOST / EMAIL_PORT)
+# Opcionais: EMAIL_POOL_SIZE (padrão 2), EMAIL_STARTTLS (padrão true)
+# ------------------------------------------------------------
+
+import os
+import threading
+from datetime import date
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pandas as pd
+
+from anexos import cache_anexos
+from carteiras import expandir_carteiras
+from config import get_secret
+from smtp_pool import PoolSMTP
+from templates_email import TemplateCompilado, compilar
+
+EMAIL_USER = get_secret("email_sender") or get_secret("EMAIL_USER")
+EMAIL_PASS = get_secret("gmail_app_password") or get_secret("EMAIL_PASS")
+
+EMAIL_HOST = get_secret("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(get_secret("EMAIL_PORT", 587))
+EMAIL_STARTTLS = str(get_secret("EMAIL_STARTTLS", "true")).lower() not in ("0", "false", "no")
+
+# Quantas conexões SMTP autenticadas ficam abertas ao mesmo tempo
+EMAIL_POOL_SIZE = int(get_secret("EMAIL_POOL_SIZE", 2))
+
+# Contrato anexado ao pack de boas-vindas (caminho independente do diretório atual)
+CONTRATO_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "contrato_Aurinvest.pdf")
+
+# ============================ LINKS GOOGLE GROUPS ============================
+LINK_GG_ACOES  = "https://groups.google.com/g/estrategias-phoenix"
+LINK_GG_BDRS   = "https://groups.google.com/g/estrategiasbdr-phoenix"
+LINK_GG_OPCOES = "https://groups.google.com/g/estrategiasopcoes-phoenix"
+LINK_GG_SMALL = "https://groups.google.com/g/estrategiassmll-phoenix"
+# ============================ BOTÕES ============================
+# ============================ BOTÕES (ESTILO PHOENIX) ============================
+# ============================ BOTÕES ============================
+
+def BOTAO_GOOGLE(texto: str, link: str) -> str:
+    return f"""
+<table border="0" cellspacing="0" cellpadding="0" style="margin: 14px 0;">
+  <tr>
+    <td align="center" bgcolor="#00C853" style="
+      border-radius: 10px;
+      padding: 12px 24px;
+    ">
+      <a href="{link}" target="_blank" style="
+        font-size: 16px;
+        font-weight: 700;
+        color: #FFFFFF;
+        text-decoration: none;
+        font-family: Arial, sans-serif;
+        display: inline-block;
+      ">
+        {texto}
+      </a>
+    </td>
+  </tr>
+</table>
+"""
+
+
+
+
+def BOTAO_TELEGRAM(texto: str, link: str) -> str:
+    return f"""
+<table border="0" cellspacing="0" cellpadding="0" style="margin: 14px 0;">
+  <tr>
+    <td align="center" bgcolor="#7C4DFF" style="
+      border-radius: 10px;
+      padding: 12px 24px;
+    ">
+      <a href="{link}" target="_blank" style="
+        font-size: 16px;
+        font-weight: 700;
+        color: #FFFFFF;
+        text-decoration: none;
+        font-family: Arial, sans-serif;
+        display: inline-block;
+      ">
+        {texto}
+      </a>
+    </td>
+  </tr>
+</table>
+"""
+
+
+
+
+WHATSAPP_BTN = """
+<table border="0" cellspacing="0" cellpadding="0" style="margin-top: 24px;">
+  <tr>
+    <td align="center" bgcolor="#25D366" style="
+      border-radius: 10px;
+      padding: 12px 24px;
+    ">
+      <a href="https://wa.me/351915323219" target="_blank" style="
+        font-size: 16px;
+        font-weight: 700;
+        color: #000000;
+        text-decoration: none;
+        font-family: Arial, sans-serif;
+        display: inline-block;
+      ">
+        💬 Falar com Suporte
+      </a>
+    </td>
+  </tr>
+</table>
+"""
+
+
+
+
+
+def BOTAO_PREMIUM(link: str) -> str:
+    return f"""
+<table border="0" cellspacing="0" cellpadding="0" style="margin: 18px 0 24px;">
+  <tr>
+    <td align="center" bgcolor="#FF8F00" style="
+      border-radius: 12px;
+      padding: 16px 30px;
+    ">
+      <a href="{link}" target="_blank" style="
+        font-size: 18px;
+        font-weight: 800;
+        color: #000000;
+        text-decoration: none;
+        font-family: Arial, sans-serif;
+        display: inline-block;
+      ">
+        🔑 Acessar Painel Premium
+      </a>
+    </td>
+  </tr>
+</table>
+"""
+
+
+
+
+
+
+
+
+
+
+
+# ============================ TEMPLATE DOS E-MAILS PHOENIX ============================
+# ============================ TEMPLATE DOS E-MAILS PHOENIX ============================
+
+EMAIL_CORPOS = {
+    # =====================================================================
+    # 1) AÇÕES IBOV
+    # =====================================================================
+    "Carteira de Ações IBOV": """
+<h2>📈 Olá [[nome]]!</h2>
+<p>Bem-vindo(a) à <b>Carteira de Ações IBOV — Projeto Phoenix</b>.</p>
+
+<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
+
+<h3>🔥 O que você recebe</h3>
+<ul>
+  <li><b>Análises automatizadas</b> com algoritmos proprietários</li>
+  <li><b>Alertas automáticos</b> de entrada, saída e gestão</li>
+  <li><b>Métricas exclusivas Phoenix</b> (momentum, volatilidade, força setorial, score Phoenix)</li>
+  <li><b>StopATR inteligente</b>: ajusta stops dinamicamente conforme volatilidade</li>
+</ul>
+
+<h3>🔑 Seu acesso ao Painel Premium</h3>
+<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
+Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
+</p>
+
+[[PAINEL_PREMIUM]]
+
+<p style="color:#777; font-size:13px; margin-bottom: 22px;">
+💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
+para entrar sempre que quiser.
+</p>
+
+<h3>🚀 Próximos passos</h3>
+<ol>
+  <li>Leia o documento anexo e responda <b>ACEITE</b></li>
+  <li>Acesse o Grupo Google e valide sua entrada</li>
+  <li>Entre no canal do Telegram (link personalizado)</li>
+</ol>
+
+{BOTAO_GOOGLE_ACOES}
+
+<hr>
+
+<p>
+O Projeto Phoenix é construído sobre automação, disciplina e métricas inteligentes.<br>
+Conte conosco para elevar seu nível como investidor(a)!
+</p>
+
+{WHATSAPP_BTN}
+""",
+
+
+    # =====================================================================
+    # 2) BDRs
+    # =====================================================================
+    "Carteira de BDRs": """
+<h2>🌎 Olá [[nome]]!</h2>
+<p>Você agora faz parte da <b>Carteira de BDRs — Projeto Phoenix</b>.</p>
+
+<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
+
+<h3>🔥 O que você recebe</h3>
+<ul>
+  <li><b>Análises automatizadas</b> com enfoque internacional</li>
+  <li><b>Alertas automáticos</b> de compra, venda e risco</li>
+  <li><b>Métricas Phoenix</b> aplicadas a BDRs (momentum global, volatilidade, força setorial)</li>
+  <li><b>StopATR automático</b> ajustado ao comportamento dos ativos globais</li>
+</ul>
+
+<h3>🔑 Seu acesso ao Painel Premium</h3>
+<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
+Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
+</p>
+
+[[PAINEL_PREMIUM]]
+
+<p style="color:#777; font-size:13px; margin-bottom: 22px;">
+💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
+para entrar sempre que quiser.
+</p>
+
+<h3>🚀 Próximos passos</h3>
+<ol>
+  <li>Leia o documento em anexo e responda <b>ACEITE</b></li>
+  <li>Entre no Grupo Google da carteira</li>
+  <li>Entre no canal do Telegram (link personalizado)</li>
+</ol>
+
+{BOTAO_GOOGLE_BDRS}
+
+<hr>
+
+<p>
+Estamos juntos dentro do ecossistema Phoenix — tecnologia, análise e execução com precisão.
+</p>
+
+{WHATSAPP_BTN}
+""",
+
+
+    # =====================================================================
+    # 3) SMALL CAPS
+    # =====================================================================
+    "Carteira de Small Caps": """
+<h2>📉 Olá [[nome]]!</h2>
+<p>Bem-vindo(a) à <b>Carteira de Small Caps — Projeto Phoenix</b>.</p>
+
+<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
+
+<h3>🔥 O que você recebe</h3>
+<ul>
+  <li><b>Análises automatizadas</b> focadas em empresas de menor capitalização</li>
+  <li><b>Alertas automáticos</b> de entrada, saída e gestão</li>
+  <li><b>Métricas exclusivas Phoenix</b>: momentum, volatilidade, força setorial, score Phoenix</li>
+  <li><b>StopATR inteligente</b>: ajusta stops dinamicamente conforme volatilidade</li>
+</ul>
+
+<h3>🔑 Seu acesso ao Painel Premium</h3>
+<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
+Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
+</p>
+
+[[PAINEL_PREMIUM]]
+
+<p style="color:#777; font-size:13px; margin-bottom: 22px;">
+💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
+para entrar sempre que quiser.
+</p>
+
+<h3>🚀 Próximos passos</h3>
+<ol>
+  <li>Leia o documento anexo e responda <b>ACEITE</b></li>
+  <li>Entre no Grupo Google da carteira (link abaixo)</li>
+  <li>Acesse o canal do Telegram (link personalizado)</li>
+</ol>
+
+{BOTAO_GOOGLE_ACOES}
+
+<hr>
+
+<p>
+O Projeto Phoenix é construído sobre automação, disciplina e métricas inteligentes.<br>
+Conte conosco para elevar seu nível como investidor(a)!
+</p>
+
+{WHATSAPP_BTN}
+""",
+
+
+    # =====================================================================
+    # 4) OPÇÕES
+    # =====================================================================
+    "Carteira de Opções": """
+<h2>🔥 Olá [[nome]]!</h2>
+<p>Seja bem-vindo(a) à <b>Carteira de Opções — Projeto Phoenix</b>.</p>
+
+<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
+
+<h3>🔥 O que você recebe</h3>
+<ul>
+  <li><b>Operações estruturadas</b> com critérios objetivos</li>
+  <li><b>Alertas automáticos</b> com ticker, strike, vencimento e preço</li>
+  <li><b>Sistema Phoenix</b> com métricas exclusivas (IV, volatilidade, posição dos players, momentum)</li>
+  <li><b>Atualizações contínuas</b> de gestão e ajustes</li>
+  <li><b>StopATR inteligente</b> para proteção dinâmica</li>
+</ul>
+
+<h3>🔑 Seu acesso ao Painel Premium</h3>
+<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
+Use o botão abaixo para entrar no seu painel exclusivo. Este acesso já está liberado e não exige senha.
+</p>
+
+[[PAINEL_PREMIUM]]
+
+<p style="color:#777; font-size:13px; margin-bottom: 22px;">
+💡 <b>Dica:</b> abra este acesso uma vez e salve nos Favoritos ou crie um atalho na Área de Trabalho
+para entrar sempre que quiser.
+</p>
+
+<h3>📌 Importante</h3>
+<p>
+Opções possuem maior volatilidade — siga os alertas do Phoenix para não perder o timing.
+</p>
+
+<h3>🚀 Próximos passos</h3>
+<ol>
+  <li>Leia o documento em anexo e responda <b>ACEITE</b></li>
+  <li>Valide sua entrada no Grupo Google</li>
+  <li>Acesse o canal do Telegram (link abaixo)</li>
+</ol>
+
+{BOTAO_GOOGLE_OPCOES}
+
+<hr>
+
+<p>
+Vamos buscar precisão, gestão e estratégia — pilares que definem o Projeto Phoenix.
+</p>
+
+{WHATSAPP_BTN}
+""",
+
+
+    "Scanner de Ações": """
+<h2>🧠 Olá [[nome]]!</h2>
+
+<p>
+Bem-vindo(a) ao <b>Scanner de Ações — Projeto Phoenix</b>.
+Você agora tem acesso a uma ferramenta profissional de análise técnica,
+desenvolvida para identificar oportunidades objetivas no mercado.
+</p>
+
+<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
+
+<h3>🔥 O que você recebe</h3>
+<ul>
+  <li>Scanner diário de ações do IBOV, SMLL e BDRs</li>
+  <li>Ranking automático por <b>Score Fênix</b></li>
+  <li>Análise técnica completa (tendência, momentum, volatilidade e volume)</li>
+  <li>Radar gráfico e critérios explicados ativo por ativo</li>
+  <li>Geração de <b>Relatórios APIMEC (PDF)</b></li>
+</ul>
+
+<h3>🔑 Seu acesso ao Scanner</h3>
+<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
+Utilize o botão abaixo para acessar o scanner exclusivo.
+Este acesso é pessoal e não exige senha.
+</p>
+
+[[PAINEL_PREMIUM]]
+
+<p style="color:#777; font-size:13px; margin-bottom: 22px;">
+💡 <b>Dica:</b> abra este link uma vez e salve nos Favoritos para acessar sempre que quiser.
+</p>
+
+<hr>
+
+<p>
+O Scanner de Ações Phoenix foi criado para quem busca
+<b>disciplina, método e leitura objetiva do mercado</b>.
+</p>
+
+{WHATSAPP_BTN}
+""",
+
+
+    "Scanner de Opções": """
+<h2>⚙️ Olá [[nome]]!</h2>
+
+<p>
+Você agora tem acesso ao <b>Scanner de Opções — Projeto Phoenix</b>,
+uma ferramenta avançada para leitura estratégica do mercado de derivativos.
+</p>
+
+<p><b>Período da assinatura:</b> [[inicio]] a [[fim]]</p>
+
+<h3>🔥 O que você recebe</h3>
+<ul>
+  <li>Scanner de opções por ativo e vencimento</li>
+  <li>Filtros por volatilidade implícita, moneyness e payoff</li>
+  <li>Análise objetiva de Calls e Puts</li>
+  <li>Identificação de oportunidades com assimetria favorável</li>
+  <li>Visualização clara para estudos e relatórios</li>
+</ul>
+
+<h3>🔑 Seu acesso ao Scanner</h3>
+<p style="margin: 4px 0 14px; color:#555; font-size:14px;">
+Utilize o botão abaixo para acessar o scanner exclusivo.
+Este acesso é pessoal e não exige senha.
+</p>
+
+[[PAINEL_PREMIUM]]
+
+<p style="color:#777; font-size:13px; margin-bottom: 22px;">
+💡 <b>Dica:</b> salve este link para acessar rapidamente sempre que precisar.
+</p>
+
+<hr>
+
+<p>
+Ferramenta desenvolvida para leitura profissional de opções,
+com foco em <b>gestão de risco, probabilidade e estrutura</b>.
+</p>
+
+{WHATSAPP_BTN}
+""",
+}
+
+
+
+
+# ============================ RENOVAÇÕES ============================
+EMAIL_RENOVACAO_30 = f"""
+<h2>⚠️ Sua assinatura está a 30 dias do vencimento, {{nome}}</h2>
+
+<p>Sua carteira <b>{{carteira}}</b> do Projeto Phoenix está próxima de vencer.</p>
+
+<p><b>Período atual:</b> {{inicio}} → {{fim}}</p>
+
+<p>Para manter acesso às análises automatizadas, alertas e métricas Phoenix, responda:</p>
+
+<p><b>RENOVAR</b></p>
+
+{WHATSAPP_BTN}
+
+<p>Equipe Phoenix 💚</p>
+"""
+
+EMAIL_RENOVACAO_15 = f"""
+<h2>📈 Renovação — faltam 15 dias</h2>
+
+<p>Olá {{nome}}, sua assinatura da carteira <b>{{carteira}}</b> está próxima do vencimento.</p>
+
+<p><b>Período atual:</b> {{inicio}} → {{fim}}</p>
+
+<p>Deseja renovar? Basta responder este e-mail com:</p>
+
+<p><b>Quero renovar</b></p>
+
+{WHATSAPP_BTN}
+"""
+
+EMAIL_RENOVACAO_7 = f"""
+<h2>⏳ Atenção — sua assinatura vence em 7 dias</h2>
+
+<p>{{nome}}, sua carteira <b>{{carteira}}</b> está quase no fim.</p>
+
+<p><b>Período atual:</b> {{inicio}} → {{fim}}</p>
+
+<p>Responda <b>RENOVAR</b> para não perder o acesso ao Phoenix.</p>
+
+{WHATSAPP_BTN}
+
+<p>Obrigado pela confiança! 💪</p>
+"""
+
+# ============================ TEMPLATES COMPILADOS ============================
+# Compilados uma vez no import; o envio só preenche os slots (templates_email.py)
+_BOTAO_GG_ACOES = BOTAO_GOOGLE("Entrar no Grupo Google", LINK_GG_ACOES)
+_BOTAO_GG_BDRS = BOTAO_GOOGLE("Entrar no Grupo Google", LINK_GG_BDRS)
+_BOTAO_GG_OPCOES = BOTAO_GOOGLE("Entrar no Grupo Google", LINK_GG_OPCOES)
+
+
+def _compilar_boas_vindas(carteira: str, html: str, secao: bool = False) -> TemplateCompilado:
+    """secao=True: versão para o pack consolidado (sem WhatsApp/Telegram, que vão uma vez só no fim)."""
+    acoes = carteira in ("Carteira de Ações IBOV", "Carteira de Small Caps")
+    return compilar(
+        html,
+        slots={
+            "[[nome]]": "nome",
+            "[[inicio]]": "inicio",
+            "[[fim]]": "fim",
+            "[[PAINEL_PREMIUM]]": "painel_premium",
+        },
+        estaticos={
+            "{BOTAO_GOOGLE_ACOES}": _BOTAO_GG_ACOES if acoes else "",
+            "{BOTAO_GOOGLE_BDRS}": _BOTAO_GG_BDRS if carteira == "Carteira de BDRs" else "",
+            "{BOTAO_GOOGLE_OPCOES}": _BOTAO_GG_OPCOES if carteira == "Carteira de Opções" else "",
+            "{WHATSAPP_BTN}": "" if secao else WHATSAPP_BTN,
+        },
+        # botão do Telegram entra antes do 1º <hr>
+        ancora=None if secao else "<hr>",
+        slot_ancora=None if secao else "telegram",
+    )
+
+
+TEMPLATES_BOAS_VINDAS = {c: _compilar_boas_vindas(c, html) for c, html in EMAIL_CORPOS.items()}
+TEMPLATES_SECOES = {c: _compilar_boas_vindas(c, html, secao=True) for c, html in EMAIL_CORPOS.items()}
+
+_SEPARADOR_SECAO = '<hr style="border: none; border-top: 2px solid #00C853; margin: 36px 0;">'
+
+_SLOTS_RENOVACAO = {"{nome}": "nome", "{carteira}": "carteira", "{inicio}": "inicio", "{fim}": "fim"}
+
+TEMPLATES_RENOVACAO = {
+    30: compilar(EMAIL_RENOVACAO_30, slots=_SLOTS_RENOVACAO),
+    15: compilar(EMAIL_RENOVACAO_15, slots=_SLOTS_RENOVACAO),
+    7: compilar(EMAIL_RENOVACAO_7, slots=_SLOTS_RENOVACAO),
+}
+
+
+# ============================ ENVIO DOS E-MAILS ============================
+def _format_date_br(d: date) -> str:
+    try:
+        return d.strftime("%d/%m/%Y")
+    except:
+        try:
+            return pd.to_datetime(d).strftime("%d/%m/%Y")
+        except:
+            return str(d)
+
+def _montar_email(email_destino: str, assunto: str, corpo: str, anexar_pdf: bool) -> str:
+    # camada externa
+    msg = MIMEMultipart("mixed")
+    msg["Subject"] = assunto
+    msg["From"] = EMAIL_USER
+    msg["To"] = email_destino
+
+    # camada interna (corpo do email)
+    body = MIMEMultipart("alternative")
+
+    # versão texto simples (fallback)
+    body.attach(MIMEText("Seu e-mail contém conteúdo em HTML. Abra em um cliente compatível.", "plain"))
+
+    # versão HTML
+    body.attach(MIMEText(corpo, "html", "utf-8"))
+
+    # adiciona o corpo ao email
+    msg.attach(body)
+
+    # anexo PDF (se existir)
+    if anexar_pdf:
+        # lido e codificado uma vez só (anexos.py); aqui só reaproveita o base64
+        msg.attach(cache_anexos.parte(CONTRATO_PDF, "Contrato_Aurinvest.pdf"))
+
+    return msg.as_string()
+
+
+# Pool único do processo: STARTTLS + login uma vez, conexões reaproveitadas
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool() -> PoolSMTP:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolSMTP(
+                EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASS,
+                tamanho=EMAIL_POOL_SIZE, starttls=EMAIL_STARTTLS,
+            )
+        return _pool
+
+
+def enviar_lote(itens: list) -> list:
+    """
+    itens: lista de (email_destino, assunto, corpo, anexar_pdf).
+    Monta todas as mensagens e empurra o lote inteiro pelo pool.
+    Devolve (ok, msg) por item, na mesma ordem.
+    """
+    resultados = [None] * len(itens)
+    envios, posicoes = [], []
+    for i, (email_destino, assunto, corpo, anexar_pdf) in enumerate(itens):
+        try:
+            envios.append((EMAIL_USER, [email_destino], _montar_email(email_destino, assunto, corpo, anexar_pdf)))
+            posicoes.append(i)
+        except Exception as e:
+            resultados[i] = (False, str(e))
+
+    for i, r in zip(posicoes, obter_pool().enviar_lote(envios)):
+        resultados[i] = r
+    return resultados
+
+
+def _valores_boas_vindas(nome: str, inicio, fim, cliente_id=None, link_acesso=None) -> dict:
+    link_telegram = f"https://t.me/milhao_crm_bot?start={cliente_id}" if cliente_id else None
+    return {
+        "nome": nome,
+        "inicio": _format_date_br(inicio),
+        "fim": _format_date_br(fim),
+        "telegram": BOTAO_TELEGRAM("Entrar no Telegram", link_telegram) if link_telegram else "",
+        "painel_premium": BOTAO_PREMIUM(link_acesso) if link_acesso else "",
+    }
+
+
+def montar_emails_por_carteira(nome: str, email_destino: str, carteiras: list, inicio: date, fim: date,
+                               cliente_id=None, link_acesso=None) -> list:
+    """Lista de (carteira, item de lote) — item é None quando a carteira não tem template."""
+    # valores do destinatário: calculados uma vez e usados em todas as carteiras
+    valores = _valores_boas_vindas(nome, inicio, fim, cliente_id, link_acesso)
+
+    lote = []
+    # 🔥 AQUI ACONTECE A MÁGICA
+    for c in expandir_carteiras(carteiras):
+        template = TEMPLATES_BOAS_VINDAS.get(c)
+        if not template:
+            lote.append((c, None))
+            continue
+
+        assunto = f"Bem-vindo(a) — {c}"
+        lote.append((c, (email_destino, assunto, template.render(**valores), True)))
+
+    return lote
+
+
+def montar_email_consolidado(nome: str, email_destino: str, carteiras: list, inicio: date, fim: date,
+                             cliente_id=None, link_acesso=None):
+    """
+    Pack consolidado: todas as carteiras reais do cliente num único e-mail,
+    com um só PDF anexo e os botões de Telegram/WhatsApp uma vez no fim.
+    Devolve (item de lote ou None, carteiras incluídas, carteiras sem template).
+    """
+    valores = _valores_boas_vindas(nome, inicio, fim, cliente_id, link_acesso)
+
+    incluidas, sem_template, secoes = [], [], []
+    for c in expandir_carteiras(carteiras):
+        template = TEMPLATES_SECOES.get(c)
+        if not template:
+            sem_template.append(c)
+            continue
+        incluidas.append(c)
+        secoes.append(template.render(**valores))
+
+    if not secoes:
+        return None, incluidas, sem_template
+
+    lista = "".join(f"<li><b>{c}</b></li>" for c in incluidas)
+    corpo = "".join([
+        f"<p>Seu pack Phoenix inclui:</p><ul>{lista}</ul>",
+        _SEPARADOR_SECAO.join(secoes),
+        _SEPARADOR_SECAO,
+        valores["telegram"],
+        WHATSAPP_BTN,
+    ])
+    contratadas = [c for c in carteiras if any(x in incluidas for x in expandir_carteiras([c]))]
+    assunto = f"Bem-vindo(a) — {', '.join(contratadas)}"
+    return (email_destino, assunto, corpo, True), incluidas, sem_template
+
+
+def montar_email_renovacao(nome, email_destino, carteira, inicio, fim, dias) -> tuple:
+    """Item de lote (email_destino, assunto, corpo, anexar_pdf) para o aviso de renovação."""
+    corpo = TEMPLATES_RENOVACAO[dias].render(
+        nome=nome, carteira=carteira, inicio=_format_date_br(inicio), fim=_format_date_br(fim)
+    )
+
+    assunto = f"Renovação — {carteira} ({dias} dias)"
+
+    return (email_destino, assunto, corpo, False)
@@ -0,0 +1,255 @@
+# expiracao.py
+# ------------------------------------------------------------
+# Varredura de assinaturas vencidas → remoção dos grupos do Telegram
+# - Seleciona (no banco, paginado) quem tem data_fim < hoje,
+#   telegram_id, ainda não foi removido (telegram_removed_at null) e
+#   tem alguma carteira com grupo mapeado; quem não tem grupo nenhum
+#   nem vem do banco (volta sozinho quando o mapeamento existir)
+# - Calcula de quais grupos cada um sai: carteiras expandidas dos
+#   pacotes Phoenix, menos os grupos que o mesmo telegram_id ainda
+#   tem direito por outra assinatura ativa
+# - Expulsões em paralelo pelo agendador do bot (telegram_envio.py),
+#   que segura a taxa e respeita o retry_after do Telegram (429)
+# - Grava telegram_removed_at em lote; o formulário de edição
+#   (clientes.py) limpa a marca quando data_fim avança (renovação)
+# - Roda headless (cron / --loop), fora do Streamlit
+#
+# Uso:
+#   python expiracao.py             # roda uma vez
+#   python expiracao.py --dry-run   # só mostra o que faria
+#   python expiracao.py --loop      # a cada INTERVALO_PADRAO segundos
+#
+# Chat ids dos grupos: TELEGRAM_GROUP_CHAT_IDS (JSON carteira -> chat_id)
+# ------------------------------------------------------------
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+
+from carteiras import CARTEIRAS_OPCOES, PHOENIX_EXPANSION_MAP, expandir_carteiras, normalizar_carteiras
+from config import get_secret
+from consulta_clientes import recusou_array
+from lock_arquivo import LockArquivo, LockOcupado
+from snapshot_clientes import TAMANHO_PAGINA
+
+INTERVALO_PADRAO = 24 * 60 * 60   # 1x por dia
+KICK_WORKERS = 8                  # chamadas em voo; a taxa quem controla é o agendador
+LOTE_UPDATE = 500
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_LOCK = os.getenv("EXPIRACAO_LOCK", os.path.join(_BASE_DIR, "expiracao.lock"))
+
+# Grupos antigos (antes das carteiras Phoenix)
+GROUP_CHAT_IDS_LEGADO = {
+    "Curto Prazo": -1002046197953,
+    "Curtíssimo Prazo": -1002074291817,
+    "Opções": -1002001152534,
+    "Criptomoedas": -1002947159530,
+}
+
+# carteira real -> chat_id do grupo (Leads e scanners não têm grupo)
+GROUP_CHAT_IDS = {
+    **GROUP_CHAT_IDS_LEGADO,
+    **{k: int(v) for k, v in json.loads(get_secret("TELEGRAM_GROUP_CHAT_IDS", "{}") or "{}").items()},
+}
+
+
+# ---------------------- SELEÇÃO ----------------------
+def grupos_das_carteiras(carteiras) -> set:
+    return {
+        GROUP_CHAT_IDS[c]
+        for c in expandir_carteiras(normalizar_carteiras(carteiras))
+        if c in GROUP_CHAT_IDS
+    }
+
+
+def carteiras_sem_grupo(carteiras) -> set:
+    """Carteiras (já expandidas) sem chat mapeado em GROUP_CHAT_IDS."""
+    return {
+        c for c in expandir_carteiras(normalizar_carteiras(carteiras))
+        if c not in GROUP_CHAT_IDS and c != "Leads"
+    }
+
+
+def carteiras_com_grupo() -> list:
+    """Nomes cadastráveis (carteiras, pacotes, grupos legados) que levam a algum grupo."""
+    nomes = dict.fromkeys([*CARTEIRAS_OPCOES, *PHOENIX_EXPANSION_MAP, *GROUP_CHAT_IDS])
+    return [c for c in nomes if grupos_das_carteiras([c])]
+
+
+def _paginado(montar_query) -> list:
+    dados, inicio = [], 0
+    while True:
+        lote = montar_query().range(inicio, inicio + TAMANHO_PAGINA - 1).execute().data or []
+        dados.extend(lote)
+        if len(lote) < TAMANHO_PAGINA:
+            return dados
+        inicio += TAMANHO_PAGINA
+
+
+def buscar_vencidos(supabase, hoje: date) -> list:
+    def query():
+        return (
+            supabase.table("clientes")
+            .select("id,nome,carteiras,data_fim,telegram_id")
+            .lt("data_fim", str(hoje))
+            .not_.is_("telegram_id", "null")
+            .is_("telegram_removed_at", "null")
+            .order("id")
+        )
+
+    try:
+        return _paginado(lambda: query().overlaps("carteiras", carteiras_com_grupo()))
+    except Exception as e:
+        # coluna carteiras que não é text[]: busca sem o filtro (quem não
+        # tem grupo vem junto e fica com plano vazio, sem marcação)
+        if not recusou_array(e):
+            raise
+        return _paginado(query)
+
+
+def buscar_direitos_ativos(supabase, telegram_ids: list, hoje: date) -> dict:
+    """telegram_id -> grupos que ele ainda pode frequentar (outra assinatura ativa)."""
+    direitos = {}
+    # ids em lotes (cabem na URL do in.(...)), cada lote paginado
+    for i in range(0, len(telegram_ids), LOTE_UPDATE):
+        linhas = _paginado(
+            lambda: supabase.table("clientes")
+            .select("id,telegram_id,carteiras")
+            .gte("data_fim", str(hoje))
+            .in_("telegram_id", telegram_ids[i:i + LOTE_UPDATE])
+            .order("id")
+        )
+        for r in linhas:
+            direitos.setdefault(str(r["telegram_id"]), set()).update(grupos_das_carteiras(r["carteiras"]))
+    return direitos
+
+
+def planejar_remocoes(vencidos: list, direitos: dict) -> list:
+    """Lista de (cliente, [chat_ids a sair])."""
+    plano = []
+    for cli in vencidos:
+        sair = grupos_das_carteiras(cli.get("carteiras")) - direitos.get(str(cli["telegram_id"]), set())
+        plano.append((cli, sorted(sair)))
+    return plano
+
+
+# ---------------------- EXPULSÃO ----------------------
+# erros do Telegram que significam "o usuário já não está no grupo";
+# "chat not found" (chat_id errado) NÃO entra aqui
+_ERROS_JA_FORA = ("user_not_participant", "participant_id_invalid", "member not found", "not a member")
+
+
+def _ja_fora(resposta: dict) -> bool:
+    desc = (resposta.get("description") or "").lower()
+    return any(e in desc for e in _ERROS_JA_FORA)
+
+
+def expulsar(chat_id, user_id):
+    """Devolve (ok, descrição). Usuário que já não está no grupo conta como ok."""
+    from bot import tg_kick_user
+
+    try:
+        r = tg_kick_user(chat_id, user_id)
+    except Exception as e:
+        return False, str(e)
+    if r.get("ok") or _ja_fora(r):
+        return True, "OK"
+    return False, r.get("description", "erro desconhecido")
+
+
+# ---------------------- EXECUÇÃO ----------------------
+def executar(supabase, hoje: date = None, dry_run: bool = False) -> dict:
+    hoje = hoje or date.today()
+
+    with LockArquivo(ARQUIVO_LOCK):
+        vencidos = buscar_vencidos(supabase, hoje)
+        ids_tg = sorted({str(c["telegram_id"]) for c in vencidos})
+        plano = planejar_remocoes(vencidos, buscar_direitos_ativos(supabase, ids_tg, hoje))
+
+        sem_grupo = set()
+        for cli in vencidos:
+            sem_grupo |= carteiras_sem_grupo(cli.get("carteiras"))
+        if sem_grupo:
+            print("Carteiras sem grupo em TELEGRAM_GROUP_CHAT_IDS (ninguém é removido delas):",
+                  ", ".join(sorted(sem_grupo)))
+
+        if dry_run:
+            return {"clientes": len(plano), "expulsoes": sum(len(g) for _, g in plano), "plano": plano,
+                    "sem_grupo": sorted(sem_grupo)}
+
+        tarefas = [(cli, chat_id) for cli, grupos in plano for chat_id in grupos]
+        with ThreadPoolExecutor(max_workers=KICK_WORKERS) as ex:
+            resultados = list(ex.map(lambda t: expulsar(t[1], t[0]["telegram_id"]), tarefas))
+
+        falhas = {}
+        for (cli, chat_id), (ok, msg) in zip(tarefas, resultados):
+            if not ok:
+                falhas.setdefault(cli["id"], []).append((chat_id, msg))
+
+        # só marca quem tinha grupo para sair e saiu de todos; plano vazio
+        # (carteira sem chat mapeado) fica para quando o mapeamento existir
+        removidos = [cli["id"] for cli, grupos in plano if grupos and cli["id"] not in falhas]
+        agora = datetime.now(timezone.utc).isoformat()
+        for i in range(0, len(removidos), LOTE_UPDATE):
+            (
+                supabase.table("clientes")
+                .update({"telegram_removed_at": agora})
+                .in_("id", removidos[i:i + LOTE_UPDATE])
+                .execute()
+            )
+
+    return {
+        "clientes": len(plano),
+        "expulsoes": len(tarefas),
+        "removidos": len(removidos),
+        "falhas": falhas,
+        "sem_grupo": sorted(sem_grupo),
+    }
+
+
+def rodar_em_loop(supabase, intervalo: int = INTERVALO_PADRAO):
+    while True:
+        try:
+            print("Expiração:", executar(supabase))
+        except LockOcupado:
+            pass
+        except Exception as e:
+            print("Erro na rotina de expiração:", e)
+        time.sleep(intervalo)
+
+
+# ---------------------- CLI ----------------------
+def main():
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Remove dos grupos do Telegram quem está com a assinatura vencida.")
+    parser.add_argument("--dry-run", action="store_true", help="só mostra quem sairia de quais grupos")
+    parser.add_argument("--loop", action="store_true", help="fica rodando a cada --intervalo segundos")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO_PADRAO)
+    args = parser.parse_args()
+
+    supabase = create_client(get_secret("SUPABASE_URL"), get_secret("SUPABASE_KEY"))
+
+    if args.loop:
+        rodar_em_loop(supabase, args.intervalo)
+        return
+
+    try:
+        resumo = executar(supabase, dry_run=args.dry_run)
+    except LockOcupado:
+        print("Outra execução de expiração está em andamento.")
+        return
+
+    if args.dry_run:
+        for cli, grupos in resumo["plano"]:
+            print(f"{cli['id']:>6}  {cli['nome']:<30}  sai de {grupos or '— (nenhum grupo)'}")
+    print(f"Expiração: {resumo['clientes']} clientes, {resumo['expulsoes']} expulsões"
+          + ("" if args.dry_run else f", {resumo['removidos']} marcados, {len(resumo['falhas'])} com falha"))
+
+
+if __name__ == "__main__":
+    main()
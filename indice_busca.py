@@ -0,0 +1,148 @@
+# indice_busca.py
+# ------------------------------------------------------------
+# Índice de busca em memória sobre nome / email / telefone
+# - Texto normalizado: minúsculo e sem acento ("João" → "joao")
+# - Vocabulário de termos → clientes, e trigramas → termos:
+#   a consulta só visita as listas dos trigramas do que foi
+#   digitado (não varre a base inteira)
+# - Prefixo (busca enquanto digita) por bisect no vocabulário
+# - Tolerância a erro de digitação por semelhança de trigramas
+# - Resultado ranqueado (melhor semelhança primeiro)
+# - Reconstruído sob demanda quando a versão do snapshot muda
+#   (SnapshotClientes.derivado)
+#
+# Uso:
+#   indice = obter_indice(obter_snapshot(supabase))
+#   indice.buscar("joao silva")      # [(id, score), ...]
+# ------------------------------------------------------------
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import pandas as pd
+
+SEMELHANCA_MINIMA = 0.45
+SCORE_EXATO = 1.0
+SCORE_PREFIXO = 0.9
+
+_TERMO = re.compile(r"[a-z0-9]+")
+
+
+def dobrar(texto) -> str:
+    """Minúsculo e sem acentos."""
+    if not isinstance(texto, str):
+        return ""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def termos(texto) -> list:
+    return _TERMO.findall(dobrar(texto))
+
+
+def trigramas(termo: str) -> set:
+    t = f"  {termo} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+def _termos_coluna(serie: pd.Series) -> pd.Series:
+    """termos() para a coluna inteira de uma vez (normalização vetorizada do pandas)."""
+    dobrada = (
+        serie.where(serie.map(lambda v: isinstance(v, str)), "")
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii").str.casefold()
+    )
+    return dobrada.str.findall(_TERMO)
+
+
+class IndiceBusca:
+    def __init__(self, df: pd.DataFrame):
+        self.ids = df["id"].astype(str).tolist()
+        telefones = df["telefone"].where(df["telefone"].map(lambda v: isinstance(v, str)), "")
+        digitos = telefones.str.replace(r"\D", "", regex=True)
+        colunas = zip(
+            _termos_coluna(df["nome"]), _termos_coluna(df["email"]), _termos_coluna(telefones), digitos
+        )
+
+        vocab = {}                          # termo -> posição no vocabulário
+        docs_do_termo = []                  # posição -> set de linhas
+        for linha, (t_nome, t_email, t_tel, dig) in enumerate(colunas):
+            for t in (*t_nome, *t_email, *t_tel, *((dig,) if dig else ())):
+                pos = vocab.get(t)
+                if pos is None:
+                    pos = vocab[t] = len(docs_do_termo)
+                    docs_do_termo.append(set())
+                docs_do_termo[pos].add(linha)
+
+        self._termos = list(vocab)
+        self._docs = docs_do_termo
+        self._ordenados = sorted(vocab.items())           # (termo, posição) p/ prefixo
+        self._chaves = [t for t, _ in self._ordenados]
+        self._n_tri = []
+        self._tri = defaultdict(list)                     # trigrama -> posições de termos
+        for pos, t in enumerate(self._termos):
+            tris = trigramas(t)
+            self._n_tri.append(len(tris))
+            for tri in tris:
+                self._tri[tri].append(pos)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _casar_termo(self, q: str) -> dict:
+        """posição do termo no vocabulário -> semelhança com q."""
+        casados = {}
+
+        # prefixo / exato
+        i = bisect_left(self._chaves, q)
+        while i < len(self._chaves) and self._chaves[i].startswith(q):
+            termo, pos = self._ordenados[i]
+            casados[pos] = SCORE_EXATO if termo == q else SCORE_PREFIXO
+            i += 1
+
+        # trigramas (erros de digitação e trechos do meio)
+        tq = trigramas(q)
+        comuns = defaultdict(int)
+        for tri in tq:
+            for pos in self._tri.get(tri, ()):
+                comuns[pos] += 1
+        for pos, n in comuns.items():
+            if pos in casados:
+                continue
+            jaccard = n / (len(tq) + self._n_tri[pos] - n)
+            contencao = n / len(tq)
+            sim = (jaccard + contencao) / 2
+            if sim >= SEMELHANCA_MINIMA:
+                casados[pos] = sim
+        return casados
+
+    def buscar(self, consulta: str, limite: int = None) -> list:
+        """[(id, score)] dos clientes que casam com TODOS os termos, melhor primeiro."""
+        qs = termos(consulta)
+        if not qs:
+            return []
+
+        total = None
+        for q in qs:
+            melhor = {}
+            for pos, sim in self._casar_termo(q).items():
+                for linha in self._docs[pos]:
+                    if sim > melhor.get(linha, 0):
+                        melhor[linha] = sim
+            if total is None:
+                total = melhor
+            else:
+                total = {linha: total[linha] + s for linha, s in melhor.items() if linha in total}
+            if not total:
+                return []
+
+        ranking = sorted(total.items(), key=lambda x: (-x[1], x[0]))
+        if limite:
+            ranking = ranking[:limite]
+        return [(self.ids[linha], round(score / len(qs), 3)) for linha, score in ranking]
+
+
+# ---------------------- ÍNDICE DO SNAPSHOT ----------------------
+def obter_indice(snapshot) -> IndiceBusca:
+    return snapshot.derivado("indice_busca", IndiceBusca)
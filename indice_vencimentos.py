@@ -0,0 +1,96 @@
+# indice_vencimentos.py
+# ------------------------------------------------------------
+# Calendário de vencimentos (índice por data_fim): cards de KPI e
+# avisos de renovação
+# - data_fim dos clientes (sem Leads) num array ordenado de dias
+#   (datetime64[D]), com os ids na mesma ordem; as consultas são
+#   searchsorted: O(log n) para contar, O(log n + k) para os ids
+# - Os quatro cards saem daqui, com a regra da coluna de status
+#   (status_clientes.py), então cards e tabela nunca divergem:
+#     vencido   data_fim < hoje
+#     vencendo  data_inicio <= hoje <= data_fim <= hoje + DIAS_VENCENDO
+#     ativos    data_inicio <= hoje <= data_fim — a mesma conta de
+#               LinhaDoTempo.ativos_em (página de MRR, relatório)
+#     lead      carteiras contêm "Leads" (com ou sem data)
+# - Avisos de renovação (renovacoes.py): ids com data_fim em
+#   hoje + 30/15/7, depois de sincronizar o snapshot na hora; as
+#   linhas em si (flags de aviso) vêm frescas do banco por id
+# - Guardado por versão do snapshot (insert/update/delete passam
+#   pelo snapshot)
+#
+# Uso:
+#   idx = obter_indice_vencimentos(obter_snapshot(supabase))
+#   idx.kpis(date.today())    # {"ativos": …, "vencendo": …, "vencidos": …, "leads": …}
+#   idx.entre(hoje, hoje + timedelta(days=30))   # ids que vencem na faixa
+#   idx.devidos(hoje, [30, 15, 7])                # {30: [ids], 15: [...], 7: [...]}
+# ------------------------------------------------------------
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from linha_do_tempo import contratos, dia64
+from status_clientes import DIAS_VENCENDO, mascara_leads
+
+
+class IndiceVencimentos:
+    def __init__(self, df: pd.DataFrame):
+        fim = pd.to_datetime(df["data_fim"], errors="coerce").to_numpy().astype("datetime64[D]")
+        leads = mascara_leads(df).to_numpy(dtype=bool) if len(df) else np.zeros(0, dtype=bool)
+        validos = ~np.isnat(fim) & ~leads
+        ordem = np.argsort(fim[validos], kind="stable")
+        self._dias = fim[validos][ordem]
+        self._ids = df["id"].to_numpy()[validos][ordem]
+        inicio = pd.to_datetime(df["data_inicio"], errors="coerce").to_numpy().astype("datetime64[D]")
+        self._inicios = inicio[validos][ordem]
+        self._leads = int(leads.sum())
+
+        # ativos: entradas e saídas dos contratos válidos, como em LinhaDoTempo
+        c_inicio, c_fim, _ = contratos(df)
+        self._entradas = np.sort(c_inicio)
+        self._fins = np.sort(c_fim)
+
+    def __len__(self):
+        return len(self._dias)
+
+    def _faixa(self, inicio, fim) -> tuple:
+        esq = np.searchsorted(self._dias, dia64(inicio), side="left")
+        dir_ = np.searchsorted(self._dias, dia64(fim), side="right")
+        return esq, max(esq, dir_)
+
+    def contar_entre(self, inicio, fim) -> int:
+        esq, dir_ = self._faixa(inicio, fim)
+        return int(dir_ - esq)
+
+    def entre(self, inicio, fim) -> list:
+        """ids com data_fim em [inicio, fim], em ordem de vencimento."""
+        esq, dir_ = self._faixa(inicio, fim)
+        return self._ids[esq:dir_].tolist()
+
+    def devidos(self, hoje, dias) -> dict:
+        """{d: ids com data_fim == hoje + d} — quem recebe o aviso de d dias hoje."""
+        hoje = pd.Timestamp(hoje).date()
+        return {d: self.entre(hoje + timedelta(days=d), hoje + timedelta(days=d)) for d in dias}
+
+    def kpis(self, hoje: date = None) -> dict:
+        """
+        Contagens dos cards, pela regra da coluna de status (calcular_status):
+        ativos = ativo + vencendo (= LinhaDoTempo.ativos_em(hoje)), vencendo,
+        vencido, lead.
+        """
+        hoje = hoje or date.today()
+        d = dia64(hoje)
+        esq, dir_ = self._faixa(hoje, hoje + timedelta(days=DIAS_VENCENDO))
+        return {
+            "ativos": int(np.searchsorted(self._entradas, d, side="right")
+                          - np.searchsorted(self._fins, d, side="left")),
+            "vencendo": int((self._inicios[esq:dir_] <= d).sum()),   # NaT nunca é <= d
+            "vencidos": int(np.searchsorted(self._dias, d, side="left")),
+            "leads": self._leads,
+        }
+
+
+# ---------------------- ÍNDICE DO SNAPSHOT ----------------------
+def obter_indice_vencimentos(snapshot) -> IndiceVencimentos:
+    return snapshot.derivado("indice_vencimentos", IndiceVencimentos)
@@ -0,0 +1,128 @@
+# linha_do_tempo.py
+# ------------------------------------------------------------
+# Assinantes ativos e MRR em qualquer dia (varredura de eventos)
+# - Cada contrato (sem Leads) vira dois eventos: +1 em data_inicio
+#   e −1 em data_fim + 1; ativos no dia d = entradas até d − saídas
+#   até d (somas de prefixo)
+# - Um dia isolado: searchsorted nos eventos ordenados, O(log N)
+# - Um intervalo inteiro: bincount dos eventos por dia + cumsum,
+#   O(N + D) numa passada só (sem laço por dia)
+# - Mesma regra em todo lugar: página de MRR (mrr_diario.py),
+#   relatório de vendas, cards de KPI (indice_vencimentos.py) e
+#   coluna de status (status_clientes.py)
+# - Guardada por versão do snapshot (SnapshotClientes.derivado)
+#
+# Regras:
+#   ativo no dia d      data_inicio <= d <= data_fim
+#   MRR no dia d        soma da mensalidade dos ativos, com
+#                       mensalidade = valor / dias de vigência × DIAS_POR_MES
+#                       (vale para qualquer prazo: 90, 180, 365 dias...)
+#   novo no dia d       data_inicio == d
+#   cancelado no dia d  data_fim == d - 1 (último dia ativo foi ontem)
+#
+# Uso:
+#   lt = obter_linha_do_tempo(obter_snapshot(supabase))
+#   lt.ativos_em(date.today()), lt.mrr_em(date.today())
+#   lt.serie(date(2024, 1, 1), date.today())   # dia, ativos, mrr, novos, cancelados
+# ------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+from carteiras import BIT_LEADS
+
+DIAS_POR_MES = 365.25 / 12   # mensalidade = valor por dia de vigência × dias de um mês médio
+
+COLUNAS_SERIE = ["dia", "ativos", "mrr", "novos", "cancelados"]
+
+
+def dia64(d) -> np.datetime64:
+    """date / Timestamp / "YYYY-MM-DD" → datetime64[D] (usado pelos índices do snapshot)."""
+    return np.datetime64(pd.Timestamp(d).date(), "D")
+
+
+def contratos(df: pd.DataFrame, *colunas) -> tuple:
+    """
+    (inicio, fim, mensalidade, *colunas) em arrays numpy, sem Leads e sem
+    datas faltando/invertidas. `colunas` são colunas extras do df, filtradas
+    do mesmo jeito.
+    """
+    inicio = pd.to_datetime(df["data_inicio"], errors="coerce").to_numpy().astype("datetime64[D]")
+    fim = pd.to_datetime(df["data_fim"], errors="coerce").to_numpy().astype("datetime64[D]")
+    ok = ~np.isnat(inicio) & ~np.isnat(fim) & (fim >= inicio)
+    if "carteiras_mask" in df.columns:
+        ok &= (df["carteiras_mask"].to_numpy() & BIT_LEADS) == 0
+    valor = pd.to_numeric(df["valor"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    dias = (fim[ok] - inicio[ok]).astype(np.int64) + 1
+    mensal = valor[ok] / dias * DIAS_POR_MES
+    extras = tuple(df[c].to_numpy()[ok] for c in colunas)
+    return (inicio[ok], fim[ok], mensal, *extras)
+
+
+class LinhaDoTempo:
+    def __init__(self, df: pd.DataFrame):
+        inicio, fim, mensal = contratos(df)
+        saida = fim + 1
+
+        o_ent = np.argsort(inicio, kind="stable")
+        o_sai = np.argsort(saida, kind="stable")
+        self._entradas = inicio[o_ent]
+        self._saidas = saida[o_sai]
+        self._mensal_ent = mensal[o_ent]
+        self._mensal_sai = mensal[o_sai]
+        # prefixos: [0, soma dos k primeiros eventos]
+        self._acum_ent = np.concatenate(([0.0], np.cumsum(self._mensal_ent)))
+        self._acum_sai = np.concatenate(([0.0], np.cumsum(self._mensal_sai)))
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _posicoes(self, dia) -> tuple:
+        d = dia64(dia)
+        return (
+            np.searchsorted(self._entradas, d, side="right"),
+            np.searchsorted(self._saidas, d, side="right"),
+        )
+
+    def ativos_em(self, dia) -> int:
+        e, s = self._posicoes(dia)
+        return int(e - s)
+
+    def mrr_em(self, dia) -> float:
+        e, s = self._posicoes(dia)
+        return float(self._acum_ent[e] - self._acum_sai[s])
+
+    def serie(self, inicio, fim) -> pd.DataFrame:
+        """Uma linha por dia em [inicio, fim]: dia, ativos, mrr, novos, cancelados."""
+        d0, d1 = dia64(inicio), dia64(fim)
+        n = int((d1 - d0).astype(int)) + 1
+        if n <= 0:
+            return pd.DataFrame(columns=COLUNAS_SERIE)
+
+        def pordia64(eventos, pesos=None):
+            """Eventos por dia do intervalo; os anteriores ao início caem no dia 0."""
+            desloc = (eventos - d0).astype(np.int64)
+            dentro = desloc < n
+            desloc, pesos = desloc[dentro], None if pesos is None else pesos[dentro]
+            no_dia = desloc >= 0
+            acumulado = np.bincount(np.maximum(desloc, 0), weights=pesos, minlength=n)
+            exatos = np.bincount(desloc[no_dia], minlength=n)
+            return acumulado, exatos
+
+        ent, novos = pordia64(self._entradas)
+        sai, cancelados = pordia64(self._saidas)
+        mrr_ent, _ = pordia64(self._entradas, self._mensal_ent)
+        mrr_sai, _ = pordia64(self._saidas, self._mensal_sai)
+
+        return pd.DataFrame({
+            "dia": pd.date_range(pd.Timestamp(d0), periods=n, freq="D"),
+            "ativos": np.cumsum(ent - sai).astype(np.int64),
+            "mrr": np.cumsum(mrr_ent - mrr_sai).round(2),
+            "novos": novos.astype(np.int64),
+            "cancelados": cancelados.astype(np.int64),
+        })
+
+
+# ---------------------- LINHA DO TEMPO DO SNAPSHOT ----------------------
+def obter_linha_do_tempo(snapshot) -> LinhaDoTempo:
+    return snapshot.derivado("linha_do_tempo", LinhaDoTempo)
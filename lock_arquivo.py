@@ -0,0 +1,40 @@
+# lock_arquivo.py
+# ------------------------------------------------------------
+# Lock exclusivo em arquivo (flock) para rotinas headless:
+# garante uma execução por vez na máquina
+#
+#   with LockArquivo("renovacoes.lock"):
+#       ...
+# ------------------------------------------------------------
+
+import fcntl
+import os
+
+
+class LockOcupado(Exception):
+    pass
+
+
+class LockArquivo:
+    """flock exclusivo e não bloqueante — se outra instância estiver rodando, desiste."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = open(self.caminho, "w")
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._fd.close()
+            self._fd = None
+            raise LockOcupado(self.caminho)
+        self._fd.write(str(os.getpid()))
+        self._fd.flush()
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._fd.close()
+        self._fd = None
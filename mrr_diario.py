@@ -0,0 +1,213 @@
+# mrr_diario.py
+# ------------------------------------------------------------
+# Série diária de MRR / assinantes / novos / cancelados
+# - Materializada em SQLite (uma linha por dia)
+# - Incremental: cada atualização só calcula os dias desde o
+#   último gravado (o último é refeito, pois "hoje" ainda muda)
+# - Correções retroativas: a tabela mrr_contratos guarda os
+#   contratos (id, início, fim, mensalidade) com que a série foi
+#   calculada; quem mudou, entrou ou saiu desde então faz a série
+#   ser refeita a partir da menor data envolvida
+# - A página de MRR só lê a série pronta
+# - Se a regra de cálculo muda (REGRA_MRR), a série é refeita sozinha
+#
+# Regras de ativo / MRR / novo / cancelado: linha_do_tempo.py
+#
+# Uso:
+#   python mrr_diario.py                 # atualiza até hoje
+#   python mrr_diario.py --recalcular    # apaga e refaz desde o 1º contrato
+#
+# Arquivo: ANALYTICS_DB (padrão analytics.sqlite3 ao lado deste arquivo)
+# ------------------------------------------------------------
+
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import pandas as pd
+
+from linha_do_tempo import LinhaDoTempo, contratos
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_DB = os.getenv("ANALYTICS_DB", os.path.join(_BASE_DIR, "analytics.sqlite3"))
+
+# muda quando a regra de cálculo muda; a série gravada com outra regra é refeita
+REGRA_MRR = 2   # 2: mensalidade proporcional à vigência real (antes: valor / 3)
+
+_SCHEMA = """
+create table if not exists mrr_diario (
+    dia          text primary key,   -- YYYY-MM-DD
+    ativos       integer not null,
+    mrr          real not null,
+    novos        integer not null,
+    cancelados   integer not null,
+    calculado_em real not null
+);
+create table if not exists mrr_contratos (
+    id      text primary key,
+    inicio  text not null,
+    fim     text not null,
+    mensal  real not null
+);
+"""
+
+
+# ---------------------- CÁLCULO ----------------------
+def calcular_dias(df: pd.DataFrame, primeiro: date, ultimo: date) -> pd.DataFrame:
+    """Uma linha por dia em [primeiro, ultimo], numa varredura só (linha_do_tempo.py)."""
+    linhas = LinhaDoTempo(df).serie(primeiro, ultimo)
+    linhas["dia"] = linhas["dia"].dt.strftime("%Y-%m-%d")
+    return linhas
+
+
+# ---------------------- ARMAZENAMENTO ----------------------
+class SerieMRR:
+    def __init__(self, caminho: str = ARQUIVO_DB):
+        self.caminho = caminho
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+            if conn.execute("pragma user_version").fetchone()[0] != REGRA_MRR:
+                conn.execute("delete from mrr_diario")
+                conn.execute("delete from mrr_contratos")
+                conn.execute(f"pragma user_version = {REGRA_MRR}")
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        try:
+            conn.execute("pragma journal_mode=wal")
+            yield conn
+        finally:
+            conn.close()
+
+    def ultimo_dia(self):
+        with self._conn() as conn:
+            dia = conn.execute("select max(dia) from mrr_diario").fetchone()[0]
+        return date.fromisoformat(dia) if dia else None
+
+    def contratos(self) -> pd.DataFrame:
+        """Contratos com que a série gravada foi calculada."""
+        with self._conn() as conn:
+            return pd.read_sql_query("select id, inicio, fim, mensal from mrr_contratos", conn)
+
+    def gravar(self, linhas: pd.DataFrame, contratos_atuais: pd.DataFrame = None):
+        """Grava os dias e, se vier, troca a foto dos contratos — na mesma transação."""
+        agora = time.time()
+        with self._conn() as conn:
+            conn.execute("begin immediate")
+            conn.executemany(
+                "insert or replace into mrr_diario (dia, ativos, mrr, novos, cancelados, calculado_em) "
+                "values (?, ?, ?, ?, ?, ?)",
+                [(r.dia, r.ativos, r.mrr, r.novos, r.cancelados, agora) for r in linhas.itertuples()],
+            )
+            if contratos_atuais is not None:
+                conn.execute("delete from mrr_contratos")
+                conn.executemany(
+                    "insert into mrr_contratos (id, inicio, fim, mensal) values (?, ?, ?, ?)",
+                    contratos_atuais[["id", "inicio", "fim", "mensal"]].itertuples(index=False),
+                )
+            conn.execute("commit")
+
+    def limpar(self):
+        with self._conn() as conn:
+            conn.execute("delete from mrr_diario")
+            conn.execute("delete from mrr_contratos")
+
+    def serie(self, inicio: date = None, fim: date = None) -> pd.DataFrame:
+        sql, args = "select dia, ativos, mrr, novos, cancelados from mrr_diario where 1 = 1", []
+        if inicio:
+            sql += " and dia >= ?"
+            args.append(str(inicio))
+        if fim:
+            sql += " and dia <= ?"
+            args.append(str(fim))
+        with self._conn() as conn:
+            df = pd.read_sql_query(sql + " order by dia", conn, params=args)
+        df["dia"] = pd.to_datetime(df["dia"])
+        return df
+
+
+def _foto_contratos(df: pd.DataFrame) -> pd.DataFrame:
+    inicio, fim, mensal, ids = contratos(df, "id")
+    return pd.DataFrame({
+        "id": ids.astype(str),
+        "inicio": inicio.astype(str),
+        "fim": fim.astype(str),
+        "mensal": mensal.round(6),
+    })
+
+
+def _menor_data_alterada(atual: pd.DataFrame, gravado: pd.DataFrame):
+    """Menor início/fim (antigo ou novo) entre os contratos que mudaram; None se nada mudou."""
+    m = atual.merge(gravado, on="id", how="outer", suffixes=("", "_ant"), indicator=True)
+    mudou = (
+        (m["_merge"] != "both")
+        | (m["inicio"] != m["inicio_ant"])
+        | (m["fim"] != m["fim_ant"])
+        | ((m["mensal"] - m["mensal_ant"]).abs() > 1e-6)
+    )
+    datas = pd.concat([m.loc[mudou, c] for c in ("inicio", "fim", "inicio_ant", "fim_ant")]).dropna()
+    return date.fromisoformat(datas.min()) if len(datas) else None
+
+
+def atualizar(serie: SerieMRR, df: pd.DataFrame, hoje: date = None) -> int:
+    """
+    Calcula e grava os dias que faltam (do último gravado até hoje) e, se
+    algum contrato mudou desde a última vez, refaz desde a menor data dele.
+    Devolve quantos dias foram calculados.
+    """
+    hoje = hoje or date.today()
+    atual = _foto_contratos(df)
+    ultimo = serie.ultimo_dia()
+
+    if ultimo is None:
+        if atual.empty:
+            return 0
+        primeiro = date.fromisoformat(atual["inicio"].min())
+        foto = atual
+    else:
+        primeiro = min(ultimo, hoje)
+        alterada = _menor_data_alterada(atual, serie.contratos())
+        foto = None if alterada is None else atual
+        if alterada is not None:
+            primeiro = min(primeiro, alterada)
+    if primeiro > hoje:
+        return 0
+    linhas = calcular_dias(df, primeiro, hoje)
+    serie.gravar(linhas, foto)
+    return len(linhas)
+
+
+def churn_30d(serie_df: pd.DataFrame) -> float:
+    """Cancelados nos últimos 30 dias ÷ (ativos hoje + esses cancelados)."""
+    if serie_df.empty:
+        return 0.0
+    cancelados = int(serie_df["cancelados"].tail(30).sum())
+    base = int(serie_df["ativos"].iloc[-1]) + cancelados
+    return cancelados / base if base else 0.0
+
+
+# ---------------------- CLI ----------------------
+def main():
+    from supabase import create_client
+
+    from config import get_secret
+    from snapshot_clientes import obter_snapshot
+
+    parser = argparse.ArgumentParser(description="Atualiza a série diária de MRR.")
+    parser.add_argument("--recalcular", action="store_true", help="apaga a série e refaz desde o 1º contrato")
+    args = parser.parse_args()
+
+    supabase = create_client(get_secret("SUPABASE_URL"), get_secret("SUPABASE_KEY"))
+    serie = SerieMRR()
+    if args.recalcular:
+        serie.limpar()
+    n = atualizar(serie, obter_snapshot(supabase).dataframe())
+    print(f"MRR diário: {n} dias calculados (último: {serie.ultimo_dia()})")
+
+
+if __name__ == "__main__":
+    main()
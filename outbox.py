@@ -0,0 +1,283 @@
+# outbox.py
+# ------------------------------------------------------------
+# Fila persistente de e-mails (outbox) em SQLite
+# - Cada mensagem tem uma chave de idempotência:
+#       cliente_id:carteira:template:data
+#   enfileirar a mesma chave de novo não gera segundo envio
+# - Worker drena a fila pelo pool SMTP (emails.enviar_lote) com
+#   backoff exponencial por mensagem e limite de envios por minuto
+# - Mensagens em envio ficam "reservadas" por um lease; se o
+#   processo morrer no meio, voltam para a fila quando o lease vence
+#
+# Uso:
+#   python outbox.py            # drena o que estiver vencido e sai
+#   python outbox.py --loop     # fica drenando
+#
+# Arquivo: OUTBOX_DB (padrão outbox.sqlite3 ao lado deste arquivo)
+# ------------------------------------------------------------
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_DB = os.getenv("OUTBOX_DB", os.path.join(_BASE_DIR, "outbox.sqlite3"))
+
+MAX_TENTATIVAS = 8
+BACKOFF_BASE = 30            # segundos; dobra a cada falha
+BACKOFF_MAX = 60 * 60        # teto de 1h entre tentativas
+LEASE = 5 * 60               # quanto tempo uma mensagem fica reservada para envio
+LIMITE_POR_MINUTO = 60       # Gmail/Workspace derrubam rajadas grandes
+TAMANHO_LOTE = 20
+INTERVALO_WORKER = 5         # segundos entre varreduras quando a fila está vazia
+
+_SCHEMA = """
+create table if not exists outbox (
+    chave             text primary key,
+    email_destino     text not null,
+    assunto           text not null,
+    corpo             text not null,
+    anexar_pdf        integer not null default 0,
+    status            text not null default 'pendente',   -- pendente | enviando | enviado | falhou
+    tentativas        integer not null default 0,
+    proxima_tentativa real not null,
+    lease_ate         real,
+    ultimo_erro       text,
+    criado_em         real not null,
+    enviado_em        real
+);
+create index if not exists outbox_fila on outbox (status, proxima_tentativa);
+"""
+
+
+def chave_idempotencia(cliente_id, carteira: str, template: str, data) -> str:
+    return f"{cliente_id}:{carteira}:{template}:{data}"
+
+
+# ---------------------- ARMAZENAMENTO ----------------------
+class Outbox:
+    def __init__(self, caminho: str = ARQUIVO_DB):
+        self.caminho = caminho
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("pragma journal_mode=wal")
+            yield conn
+        finally:
+            conn.close()
+
+    def enfileirar(self, itens: list) -> list:
+        """
+        itens: lista de (chave, email_destino, assunto, corpo, anexar_pdf).
+        Devolve, na mesma ordem, True se entrou na fila ou False se a chave já existia.
+        """
+        agora = time.time()
+        novos = []
+        with self._conn() as conn:
+            conn.execute("begin immediate")
+            for chave, email_destino, assunto, corpo, anexar_pdf in itens:
+                cur = conn.execute(
+                    "insert or ignore into outbox "
+                    "(chave, email_destino, assunto, corpo, anexar_pdf, proxima_tentativa, criado_em) "
+                    "values (?, ?, ?, ?, ?, ?, ?)",
+                    (chave, email_destino, assunto, corpo, int(bool(anexar_pdf)), agora, agora),
+                )
+                novos.append(cur.rowcount == 1)
+            conn.execute("commit")
+        return novos
+
+    def reservar(self, limite: int) -> list:
+        """Pega até `limite` mensagens vencidas e marca como 'enviando' (com lease)."""
+        agora = time.time()
+        with self._conn() as conn:
+            conn.execute("begin immediate")
+            linhas = conn.execute(
+                "select * from outbox "
+                "where (status = 'pendente' and proxima_tentativa <= ?) "
+                "   or (status = 'enviando' and lease_ate < ?) "
+                "order by proxima_tentativa limit ?",
+                (agora, agora, limite),
+            ).fetchall()
+            conn.executemany(
+                "update outbox set status = 'enviando', lease_ate = ? where chave = ?",
+                [(agora + LEASE, r["chave"]) for r in linhas],
+            )
+            conn.execute("commit")
+        return [dict(r) for r in linhas]
+
+    def concluir(self, chave: str, ok: bool, erro: str = None):
+        agora = time.time()
+        with self._conn() as conn:
+            if ok:
+                conn.execute(
+                    "update outbox set status = 'enviado', enviado_em = ?, lease_ate = null, "
+                    "tentativas = tentativas + 1, ultimo_erro = null where chave = ?",
+                    (agora, chave),
+                )
+                return
+            tentativas = conn.execute(
+                "select tentativas from outbox where chave = ?", (chave,)
+            ).fetchone()["tentativas"] + 1
+            espera = min(BACKOFF_BASE * 2 ** (tentativas - 1), BACKOFF_MAX)
+            conn.execute(
+                "update outbox set status = ?, tentativas = ?, proxima_tentativa = ?, "
+                "lease_ate = null, ultimo_erro = ? where chave = ?",
+                ("falhou" if tentativas >= MAX_TENTATIVAS else "pendente",
+                 tentativas, agora + espera, erro, chave),
+            )
+
+    def reenviar(self, chave: str):
+        """Devolve uma mensagem que esgotou as tentativas para a fila."""
+        with self._conn() as conn:
+            conn.execute(
+                "update outbox set status = 'pendente', tentativas = 0, proxima_tentativa = ? "
+                "where chave = ? and status = 'falhou'",
+                (time.time(), chave),
+            )
+
+    def contagem(self) -> dict:
+        with self._conn() as conn:
+            linhas = conn.execute("select status, count(*) n from outbox group by status").fetchall()
+        return {r["status"]: r["n"] for r in linhas}
+
+    def listar(self, status: str = None, prefixo_chave: str = None, limite: int = 100) -> list:
+        sql, args = "select * from outbox where 1 = 1", []
+        if status:
+            sql += " and status = ?"
+            args.append(status)
+        if prefixo_chave:
+            sql += " and chave like ?"
+            args.append(prefixo_chave + "%")
+        sql += " order by criado_em desc limit ?"
+        args.append(limite)
+        with self._conn() as conn:
+            return [dict(r) for r in conn.execute(sql, args).fetchall()]
+
+
+# ---------------------- LIMITE DE TAXA ----------------------
+class LimiteTaxa:
+    """Janela deslizante de 60s: no máximo `por_minuto` envios."""
+
+    def __init__(self, por_minuto: int = LIMITE_POR_MINUTO):
+        self.por_minuto = por_minuto
+        self._envios = deque()
+
+    def disponiveis(self) -> int:
+        limite = time.monotonic() - 60
+        while self._envios and self._envios[0] < limite:
+            self._envios.popleft()
+        return max(0, self.por_minuto - len(self._envios))
+
+    def registrar(self, n: int):
+        agora = time.monotonic()
+        self._envios.extend([agora] * n)
+
+
+# ---------------------- WORKER ----------------------
+def drenar(outbox: Outbox, limite_taxa: LimiteTaxa = None, tamanho_lote: int = TAMANHO_LOTE) -> int:
+    """Envia um lote do que estiver vencido. Devolve quantas mensagens foram tentadas."""
+    from emails import enviar_lote
+
+    vagas = limite_taxa.disponiveis() if limite_taxa else tamanho_lote
+    if vagas <= 0:
+        return 0
+
+    reservadas = outbox.reservar(min(vagas, tamanho_lote))
+    if not reservadas:
+        return 0
+
+    resultados = enviar_lote([
+        (r["email_destino"], r["assunto"], r["corpo"], bool(r["anexar_pdf"])) for r in reservadas
+    ])
+    if limite_taxa:
+        limite_taxa.registrar(len(reservadas))
+
+    for r, (ok, msg) in zip(reservadas, resultados):
+        outbox.concluir(r["chave"], ok, None if ok else msg)
+    return len(reservadas)
+
+
+def rodar_em_loop(outbox: Outbox, acordar: threading.Event = None, intervalo: int = INTERVALO_WORKER):
+    limite_taxa = LimiteTaxa()
+    acordar = acordar or threading.Event()
+    while True:
+        try:
+            if drenar(outbox, limite_taxa):
+                continue
+        except Exception as e:
+            print("Erro no worker da outbox:", e)
+        acordar.wait(intervalo)
+        acordar.clear()
+
+
+_outbox = None
+_worker = None
+_acordar = threading.Event()
+_worker_lock = threading.Lock()
+
+
+def obter_outbox() -> Outbox:
+    global _outbox
+    with _worker_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
+
+
+def iniciar_worker() -> bool:
+    """Sobe o worker em thread daemon, uma única vez por processo."""
+    global _worker
+    outbox = obter_outbox()
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return False
+        _worker = threading.Thread(target=rodar_em_loop, args=(outbox, _acordar), daemon=True)
+        _worker.start()
+        return True
+
+
+def acordar_worker():
+    """Pede ao worker para drenar já (ex.: logo após enfileirar um pack)."""
+    _acordar.set()
+
+
+def drenar_tudo(outbox: Outbox) -> int:
+    """Drena até a fila não ter mais nada vencido (respeitando o limite por minuto)."""
+    limite_taxa = LimiteTaxa()
+    total = 0
+    while True:
+        n = drenar(outbox, limite_taxa)
+        if n:
+            total += n
+        elif limite_taxa.disponiveis() == 0:
+            time.sleep(1)  # estourou o limite por minuto; espera a janela andar
+        else:
+            return total
+
+
+# ---------------------- CLI ----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Drena a outbox de e-mails.")
+    parser.add_argument("--loop", action="store_true", help="fica drenando em vez de sair")
+    args = parser.parse_args()
+
+    outbox = obter_outbox()
+    if args.loop:
+        rodar_em_loop(outbox)
+        return
+
+    total = drenar_tudo(outbox)
+    print(f"Outbox: {total} mensagens processadas — {outbox.contagem()}")
+
+
+if __name__ == "__main__":
+    main()
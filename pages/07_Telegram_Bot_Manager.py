@@ -8,6 +8,8 @@ import telebot
 from telebot import types
 from supabase import create_client, Client
 
+from snapshot_clientes import obter_snapshot
+
 # =========================================
 # CONFIG - LINKS DOS GRUPOS TELEGRAM (ENTRADA)
 # =========================================
@@ -22,13 +24,8 @@ LINKS_TELEGRAM = {
 # =========================================
 # CONFIG - CHAT_ID DOS GRUPOS (PARA EXPULSAR)
 # =========================================
-GROUP_CHAT_IDS = {
-    "Curto Prazo": -1002046197953,
-    "Curtíssimo Prazo": -1002074291817,
-    "Opções": -1002001152534,
-    "Criptomoedas": -1002947159530,
-    # "Leads": None  # não é grupo
-}
+# Mapa único em expiracao.py (grupos antigos + TELEGRAM_GROUP_CHAT_IDS)
+from expiracao import GROUP_CHAT_IDS
 
 # =========================================
 # SUPABASE
@@ -59,22 +56,15 @@ st.subheader("👤 Clientes e Status Telegram")
 
 # Carrega clientes
 try:
-    resp = supabase.table("clientes").select("*").execute()
-    dados = resp.data or []
+    df = obter_snapshot(supabase).dataframe()
 except Exception as e:
     st.error(f"Erro ao carregar dados: {e}")
     st.stop()
 
-if not dados:
+if df.empty:
     st.info("Nenhum cliente encontrado.")
     st.stop()
 
-df = pd.DataFrame(dados)
-
-# Normalizar datas
-if "data_fim" in df.columns:
-    df["data_fim"] = pd.to_datetime(df["data_fim"], errors="coerce").dt.date
-
 # Garantir colunas de Telegram / controle
 for col in ["telegram_id", "telegram_username", "telegram_connected",
             "telegram_last_sync", "telegram_removed_at"]:
@@ -107,15 +97,6 @@ if not TELEGRAM_TOKEN:
 # =========================================
 # FUNÇÕES AUXILIARES
 # =========================================
-def carteiras_to_list(raw):
-    if isinstance(raw, list):
-        return raw
-    if isinstance(raw, str):
-        raw = raw.replace("[", "").replace("]", "").replace("'", "")
-        return [x.strip() for x in raw.split(",") if x.strip()]
-    return []
-
-
 def parse_date(d):
     try:
         return pd.to_datetime(d).date()
@@ -140,13 +121,10 @@ def parse_date(d):
 
 
 # =========================================
-# REMOÇÃO AUTOMÁTICA — DESATIVADO
+# REMOÇÃO AUTOMÁTICA
 # =========================================
-# def remover_cliente_dos_grupos_e_virar_lead(cli) -> bool:
-#     (... INTEIRO, MANTIDO, MAS COMENTADO ...)
-
-# def verificar_e_excluir_vencidos() -> int:
-#     (... INTEIRO, MANTIDO, MAS COMENTADO ...)
+# Substituída pela varredura headless em expiracao.py
+# (cron: python expiracao.py  |  serviço: python expiracao.py --loop)
 
 
 # =========================================
@@ -156,37 +134,17 @@ def parse_date(d):
 #     bot.infinity_polling(timeout=10, long_polling_timeout=5)
 
 
-# =========================================
-# THREAD ROTINA — DESATIVADA
-# =========================================
-# def rotina_remocao_vencidos():
-#     while True:
-#         try:
-#             verificar_e_excluir_vencidos()
-#         except Exception:
-#             pass
-#         time.sleep(24 * 60 * 60)
-
-
 # =========================================
 # INICIALIZAÇÃO DAS THREADS — DESATIVADA
 # =========================================
 if "bot_started" not in st.session_state:
     st.session_state["bot_started"] = False
 
-if "cleanup_started" not in st.session_state:
-    st.session_state["cleanup_started"] = False
-
 # if not st.session_state["bot_started"]:
 #     thread_bot = threading.Thread(target=iniciar_bot, daemon=True)
 #     thread_bot.start()
 #     st.session_state["bot_started"] = True
 
-# if not st.session_state["cleanup_started"]:
-#     thread_clean = threading.Thread(target=rotina_remocao_vencidos, daemon=True)
-#     thread_clean.start()
-#     st.session_state["cleanup_started"] = True
-
 
 # =========================================
 # CONTROLES VISUAIS (STATUS) — DESATIVADOS
@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
-from datetime import date, timedelta
+from datetime import date
 from supabase import create_client
 import os
 
+from coortes import obter_coortes
+from receita import obter_receita
+from mrr_diario import SerieMRR, atualizar, churn_30d
+from snapshot_clientes import obter_snapshot
+
 st.set_page_config(page_title="MRR Analytics", layout="wide")
 
 # --------- SUPABASE CONFIG ---------
@@ -18,57 +23,101 @@ SUPABASE_KEY = get_secret("SUPABASE_KEY")
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # --------- LOAD CLIENT DATA ---------
-query = supabase.table("clientes").select("*").execute()
-dados = query.data or []
-df = pd.DataFrame(dados)
+df = obter_snapshot(supabase).dataframe()
 
 if df.empty:
     st.warning("Nenhum cliente cadastrado ainda.")
     st.stop()
 
-df["data_inicio"] = pd.to_datetime(df["data_inicio"], errors="coerce")
-df["data_fim"] = pd.to_datetime(df["data_fim"], errors="coerce")
-
 today = date.today()
 
-# --------- METRICS CALC ---------
-df["ativo"] = df["data_fim"] >= pd.to_datetime(today)
-df_ativos = df[df["ativo"] == True]
-
-# MRR (soma dos valores mensais)
-df_ativos["valor_mensal"] = df_ativos["valor"] / 3  # contratos trimestrais
-MRR = df_ativos["valor_mensal"].sum()
+# --------- SÉRIE DIÁRIA (mrr_diario.py) ---------
+# só os dias desde a última atualização são calculados; o resto já está gravado
+serie = SerieMRR()
+atualizar(serie, df, today)
+hist = serie.serie(fim=today)
 
-# churn last 30 days
-df_cancelados = df[df["data_fim"] < pd.to_datetime(today)]
-df_cancelados_30 = df_cancelados[df_cancelados["data_fim"] >= pd.to_datetime(today - timedelta(days=30))]
+if hist.empty:
+    st.warning("Nenhum contrato com vigência cadastrada ainda.")
+    st.stop()
 
-churn = 0
-if len(df_ativos) + len(df_cancelados_30) > 0:
-    churn = len(df_cancelados_30) / (len(df_ativos) + len(df_cancelados_30))
+hoje_linha = hist.iloc[-1]
+MRR = hoje_linha["mrr"]
+ativos = int(hoje_linha["ativos"])
+churn = churn_30d(hist)
 
-# LTV simples: ticket médio x 3 meses (pra melhorar depois)
-ticket_medio = df_ativos["valor_mensal"].mean() if not df_ativos.empty else 0
-LTV = ticket_medio * 3
+# LTV pela retenção real das coortes (coortes.py)
+coortes = obter_coortes(obter_snapshot(supabase), today)
+LTV = coortes.ltv()
 
 # --------- KPIs ---------
 c1, c2, c3, c4 = st.columns(4)
 
 c1.metric("MRR Atual", f"R$ {MRR:,.2f}")
-c2.metric("Assinantes Ativos", len(df_ativos))
+c2.metric("Assinantes Ativos", ativos)
 c3.metric("Churn 30 dias", f"{(churn*100):.2f}%")
 c4.metric("LTV Estimado", f"R$ {LTV:,.2f}")
 
 st.divider()
 
-# --------- CHART ---------
-st.subheader("📈 Evolução do número de clientes por mês")
-
-df["mes"] = df["data_inicio"].dt.to_period("M").astype(str)
-growth = df.groupby("mes")["id"].count().reset_index()
-growth = growth.rename(columns={"id": "novos_clientes"})
-
-st.line_chart(growth, x="mes", y="novos_clientes")
+# --------- CHARTS ---------
+st.subheader("💰 MRR diário")
+st.line_chart(hist, x="dia", y="mrr")
+
+st.subheader("📈 Evolução mensal da base")
+
+mensal = hist.set_index("dia").resample("MS").agg(
+    {"ativos": "last", "mrr": "last", "novos": "sum", "cancelados": "sum"}
+)
+mensal["churn_%"] = (mensal["cancelados"] / (mensal["ativos"] + mensal["cancelados"]).where(lambda s: s > 0) * 100).fillna(0)
+mensal.index = mensal.index.strftime("%Y-%m")
+mensal = mensal.rename_axis("mes").reset_index()
+
+st.line_chart(mensal, x="mes", y=["novos", "cancelados"])
+st.line_chart(mensal, x="mes", y="churn_%")
+
+# --------- RECEITA RECONHECIDA ---------
+st.subheader("💵 Receita por carteira e por pagamento")
+
+receita = obter_receita(obter_snapshot(supabase))
+QUEBRAS = {"Carteira": "carteira", "Pagamento": "pagamento", "Total": None}
+
+r1, r2 = st.columns([1, 2])
+quebra = QUEBRAS[r1.radio("Quebrar por", list(QUEBRAS), horizontal=True)]
+periodo = r2.date_input(
+    "Período", value=(date(today.year - 1, today.month, 1), today), format="DD/MM/YYYY"
+)
+
+mrr_hoje = receita.mrr_em(today, quebra)
+m1, m2 = st.columns([1, 2])
+m1.dataframe(
+    mrr_hoje.rename("MRR atual").to_frame(),
+    use_container_width=True,
+    column_config={"MRR atual": st.column_config.NumberColumn(format="R$ %.2f")},
+)
+if isinstance(periodo, tuple) and len(periodo) == 2:
+    m2.bar_chart(receita.mensal(periodo[0], periodo[1], quebra))
+    m2.caption("Receita reconhecida no mês: cada contrato rende valor ÷ dias de vigência por dia.")
+
+# --------- COORTES ---------
+st.subheader("🧩 Retenção por coorte")
+
+if coortes.retencao.empty:
+    st.info("Sem contratos suficientes para montar as coortes.")
+else:
+    ver_receita = st.toggle("Mostrar receita (R$) em vez de retenção (%)")
+    matriz = coortes.receita if ver_receita else coortes.retencao * 100
+    matriz = matriz.iloc[::-1]   # coortes mais recentes primeiro
+    matriz.insert(0, "clientes", coortes.tamanho)
+    st.dataframe(
+        matriz,
+        use_container_width=True,
+        column_config={
+            str(k): st.column_config.NumberColumn(f"M{k}", format="R$ %.0f" if ver_receita else "%.0f%%")
+            for k in coortes.retencao.columns
+        },
+    )
+    st.caption("Linhas: mês de entrada. Colunas: meses desde a entrada (M0 = mês da entrada).")
 
 # --------- EXPLICACAO DOS METRICOS ---------
 with st.expander("📘 Conceitos — entenda os indicadores"):
@@ -77,7 +126,10 @@ with st.expander("📘 Conceitos — entenda os indicadores"):
 Receita recorrente mensal.  
 É quanto o seu negócio gera por mês com assinaturas ativas.
 
-> **Fórmula simplificada:** soma de todos os valores mensais dos assinantes ativos
+> **Fórmula:** soma das mensalidades dos assinantes ativos, com mensalidade =
+> valor ÷ dias de vigência × 30,44 (vale para contratos de qualquer prazo)
+>
+> Pacotes Phoenix dividem a receita entre as carteiras que incluem.
 
 ---
 
@@ -94,7 +146,9 @@ Churn alto = alerta de retenção!
 ### 🧠 LTV — Lifetime Value
 Valor total que um cliente gera durante o tempo em que permanece ativo.
 
-> **Fórmula simplificada:** ticket mensal médio × tempo médio na base
+> **Como calculamos:** receita média por cliente em cada mês desde a entrada,
+> somada ao longo da curva de retenção das coortes (mais uma estimativa para
+> os meses que ainda não aconteceram)
 
 LTV alto = base fiel e receita mais previsível ✅
 """)
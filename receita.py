@@ -0,0 +1,122 @@
+# receita.py
+# ------------------------------------------------------------
+# Reconhecimento de receita (pro rata diário) com quebra por
+# carteira e por forma de pagamento
+# - Cada contrato reconhece valor / dias de vigência por dia,
+#   de data_inicio a data_fim (prazo real: 90, 180, 365...)
+# - Carteiras: o valor é dividido em partes iguais entre as
+#   carteiras do cliente; pacotes Phoenix repassam a parte deles
+#   às carteiras reais pelos PESOS_EXPANSAO (carteiras.py); a parte
+#   de nomes fora de CARTEIRAS_OPCOES (cadastros antigos) vai para
+#   OUTRAS, então as colunas sempre somam o total
+# - Tudo por eventos: a taxa diária entra em data_inicio e sai em
+#   data_fim + 1; um bincount por (grupo, dia) + cumsum dá a
+#   receita de cada dia do intervalo para todos os grupos de uma
+#   vez, O(N + G × D), sem laço por cliente
+# - Montada uma vez por versão do snapshot; recortar período ou
+#   agrupamento na tela não relê nada
+#
+# Uso:
+#   r = obter_receita(obter_snapshot(supabase))
+#   r.mrr_em(date.today(), por="carteira")       # Series carteira → MRR
+#   r.mensal(date(2024, 1, 1), date.today(), por="pagamento")   # mês × pagamento
+#   r.diaria(inicio, fim)                         # dia × "total"
+# ------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+from carteiras import BIT_CARTEIRA, CARTEIRAS_OPCOES, CARTEIRAS_RECEITA, PESOS_EXPANSAO
+from linha_do_tempo import DIAS_POR_MES, contratos, dia64
+
+AGRUPAMENTOS = (None, "carteira", "pagamento")
+
+OUTRAS = "Outras"
+
+_ITENS = [c for c in CARTEIRAS_OPCOES if c != "Leads"]
+
+# item cadastrado → fração que vai para cada carteira real (itens × CARTEIRAS_RECEITA)
+_PESOS = np.array([
+    [PESOS_EXPANSAO.get(item, {item: 1.0}).get(real, 0.0) for real in CARTEIRAS_RECEITA]
+    for item in _ITENS
+])
+
+
+def _alocacao(mascaras: np.ndarray, n_listadas: np.ndarray) -> tuple:
+    """
+    (linhas, códigos de carteira, pesos) na forma longa: só as partes não
+    nulas. `n_listadas` conta todas as carteiras do cliente (menos Leads),
+    inclusive as sem bit; a fatia delas vai para a última coluna (OUTRAS).
+    """
+    bits = np.array([BIT_CARTEIRA[c] for c in _ITENS], dtype=np.int64)
+    tem = (mascaras.astype(np.int64)[:, None] & bits[None, :]) != 0
+    n_itens = np.maximum(n_listadas, tem.sum(axis=1))[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fatias = np.where(n_itens > 0, tem / n_itens, 0.0)
+    conhecidas = fatias @ _PESOS
+    pesos = np.column_stack([conhecidas, np.clip(1 - conhecidas.sum(axis=1), 0, None)])
+    pesos[pesos < 1e-12] = 0.0
+    linhas, codigos = np.nonzero(pesos)
+    return linhas, codigos, pesos[linhas, codigos]
+
+
+class Receita:
+    def __init__(self, df: pd.DataFrame):
+        inicio, fim, mensal, mascaras, pagamento, carteiras = contratos(
+            df, "carteiras_mask", "pagamento", "carteiras"
+        )
+        self._inicio = inicio
+        self._saida = fim + 1
+        self._por_dia = mensal / DIAS_POR_MES
+
+        n = len(inicio)
+        todos = np.arange(n)
+        codigos_pag, formas = pd.factorize(pd.Series(pagamento, dtype=object).fillna("—").astype(str), sort=True)
+        n_listadas = np.fromiter((len(set(c) - {"Leads"}) for c in carteiras), dtype=np.int64, count=n)
+        linhas_cart, codigos_cart, pesos_cart = _alocacao(mascaras, n_listadas)
+
+        # agrupamento → (linhas, código do grupo, peso, rótulos)
+        self._grupos = {
+            None: (todos, np.zeros(n, dtype=np.int64), np.ones(n), ["total"]),
+            "carteira": (linhas_cart, codigos_cart, pesos_cart, [*CARTEIRAS_RECEITA, OUTRAS]),
+            "pagamento": (todos, codigos_pag, np.ones(n), list(formas)),
+        }
+
+    def __len__(self):
+        return len(self._inicio)
+
+    def diaria(self, inicio, fim, por: str = None) -> pd.DataFrame:
+        """Receita reconhecida em cada dia de [inicio, fim]; uma coluna por grupo."""
+        linhas, codigos, pesos, rotulos = self._grupos[por]
+        d0, d1 = dia64(inicio), dia64(fim)
+        n = max(int((d1 - d0).astype(int)) + 1, 0)
+        g = len(rotulos)
+        taxa = self._por_dia[linhas] * pesos
+
+        def por_celula(eventos):
+            desloc = (eventos[linhas] - d0).astype(np.int64)
+            dentro = desloc < n
+            celula = codigos[dentro] * n + np.maximum(desloc[dentro], 0)
+            return np.bincount(celula, weights=taxa[dentro], minlength=g * n).reshape(g, n)
+
+        valores = np.cumsum(por_celula(self._inicio) - por_celula(self._saida), axis=1) if n else np.zeros((g, 0))
+        return pd.DataFrame(
+            valores.T,
+            index=pd.date_range(pd.Timestamp(d0), periods=n, freq="D").rename("dia"),
+            columns=rotulos,
+        )
+
+    def mensal(self, inicio, fim, por: str = None) -> pd.DataFrame:
+        """Receita reconhecida por mês (mês × grupo), somando os dias de [inicio, fim]."""
+        meses = self.diaria(inicio, fim, por).resample("MS").sum().round(2)
+        meses.index = meses.index.strftime("%Y-%m").rename("mes")
+        return meses
+
+    def mrr_em(self, dia, por: str = None) -> pd.Series:
+        """MRR no dia: taxa diária dos contratos vigentes × dias de um mês médio."""
+        return (self.diaria(dia, dia, por).iloc[0] * DIAS_POR_MES).round(2)
+
+
+# ---------------------- RECEITA DO SNAPSHOT ----------------------
+def obter_receita(snapshot) -> Receita:
+    return snapshot.derivado("receita", Receita)
@@ -0,0 +1,241 @@
+# renovacoes.py
+# ------------------------------------------------------------
+# Rotina de avisos de renovação (30 / 15 / 7 dias)
+# - Roda fora da renderização do Streamlit (CLI ou thread em background)
+# - Lock em arquivo: só uma execução por vez na máquina
+# - Quem está devido sai do calendário de vencimentos
+#   (indice_vencimentos.py), depois de um delta do snapshot na hora
+# - Cada aviso é "reivindicado" no banco com UPDATE condicional
+#   (aviso_N só vira true se ainda era false/null), então duas
+#   instâncias nunca mandam o mesmo aviso
+# - Os e-mails vão para a outbox (outbox.py), que cuida do envio,
+#   retry e deduplicação
+# - O resultado da última execução fica em renovacoes_status.json,
+#   que a página apenas exibe
+#
+# Uso:
+#   python renovacoes.py            # roda uma vez (ex.: cron diário)
+#   python renovacoes.py --loop     # roda a cada INTERVALO_PADRAO segundos
+# ------------------------------------------------------------
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from carteiras import normalizar_carteiras
+from emails import montar_email_renovacao
+from indice_vencimentos import obter_indice_vencimentos
+from lock_arquivo import LockArquivo, LockOcupado
+from outbox import acordar_worker, chave_idempotencia, drenar_tudo, obter_outbox
+from outbox import iniciar_worker as iniciar_worker_outbox
+from snapshot_clientes import obter_snapshot
+
+AVISOS = {30: "aviso_30", 15: "aviso_15", 7: "aviso_7"}
+
+INTERVALO_PADRAO = 60 * 60  # 1h
+LOTE_IDS = 500              # ids por in.(...) na busca das linhas devidas
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_LOCK = os.getenv("RENOVACOES_LOCK", os.path.join(_BASE_DIR, "renovacoes.lock"))
+ARQUIVO_STATUS = os.getenv("RENOVACOES_STATUS", os.path.join(_BASE_DIR, "renovacoes_status.json"))
+
+
+# ---------------------- SELEÇÃO E REIVINDICAÇÃO ----------------------
+def buscar_devidos(supabase, hoje: date = None) -> list:
+    """
+    Só as linhas cujo data_fim cai exatamente em hoje + 30/15/7. Os ids
+    saem do calendário de vencimentos (indice_vencimentos.py), com o
+    snapshot sincronizado na hora (um cliente criado/renovado há pouco
+    não perde o aviso do dia); as linhas vêm frescas do banco por id,
+    com as flags de aviso atuais.
+    """
+    hoje = hoje or date.today()
+    snapshot = obter_snapshot(supabase)
+    snapshot.sincronizar_agora()
+    devidos = obter_indice_vencimentos(snapshot).devidos(hoje, AVISOS)
+    ids = [i for lista in devidos.values() for i in lista]
+
+    linhas = []
+    for i in range(0, len(ids), LOTE_IDS):
+        res = (
+            supabase.table("clientes")
+            .select("id,nome,email,carteiras,data_inicio,data_fim,aviso_30,aviso_15,aviso_7")
+            .in_("id", ids[i:i + LOTE_IDS])
+            .execute()
+        )
+        linhas.extend(res.data or [])
+    return linhas
+
+
+def avisos_devidos(dados: list, hoje: date = None) -> list:
+    """Lista de (cliente, dias, campo) ainda não avisados. Leads não recebem aviso."""
+    hoje = hoje or date.today()
+    devidos = []
+    for cli in dados:
+        try:
+            fim = datetime.strptime(str(cli["data_fim"])[:10], "%Y-%m-%d").date()
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        dias = (fim - hoje).days
+        campo = AVISOS.get(dias)
+        if not campo or cli.get(campo):
+            continue
+
+        carteiras = normalizar_carteiras(cli.get("carteiras"))
+        if not carteiras or "Leads" in carteiras:
+            continue
+
+        devidos.append((cli, dias, campo))
+    return devidos
+
+
+def reivindicar_aviso(supabase, cliente_id, campo: str) -> bool:
+    """UPDATE atômico: só marca (e devolve a linha) se ninguém marcou antes."""
+    res = (
+        supabase.table("clientes")
+        .update({campo: True})
+        .eq("id", cliente_id)
+        .or_(f"{campo}.is.null,{campo}.eq.false")
+        .execute()
+    )
+    return bool(res.data)
+
+
+def liberar_aviso(supabase, cliente_id, campo: str):
+    """Desfaz a reivindicação quando nenhum e-mail saiu, para tentar de novo depois."""
+    supabase.table("clientes").update({campo: False}).eq("id", cliente_id).execute()
+
+
+# ---------------------- EXECUÇÃO ----------------------
+def executar(supabase, hoje: date = None) -> dict:
+    """Uma passada completa. Devolve (e grava) o resumo da execução."""
+    hoje = hoje or date.today()
+    enviados = []
+
+    with LockArquivo(ARQUIVO_LOCK):
+        # qualquer falha antes de a fila aceitar os itens (numa reivindicação
+        # no meio do caminho ou no enfileirar) devolve tudo o que já foi
+        # reivindicado, senão esses avisos ficariam marcados sem sair
+        reivindicados = []
+        try:
+            # 1) reivindica tudo o que é devido hoje
+            for cli, dias, campo in avisos_devidos(buscar_devidos(supabase, hoje), hoje):
+                if reivindicar_aviso(supabase, cli["id"], campo):  # False = outra instância já pegou
+                    reivindicados.append((cli, dias, campo))
+
+            # 2) tudo vai para a outbox; a chave impede aviso duplicado mesmo em retry
+            itens, meta = [], []
+            for cli, dias, campo in reivindicados:
+                for cart in normalizar_carteiras(cli.get("carteiras")):
+                    chave = chave_idempotencia(cli["id"], cart, f"renovacao_{dias}", cli["data_fim"])
+                    itens.append((chave, *montar_email_renovacao(
+                        nome=cli["nome"],
+                        email_destino=cli["email"],
+                        carteira=cart,
+                        inicio=cli["data_inicio"],
+                        fim=cli["data_fim"],
+                        dias=dias
+                    )))
+                    meta.append((cli, dias, cart))
+
+            novos = obter_outbox().enfileirar(itens)
+        except Exception:
+            for cli, dias, campo in reivindicados:
+                try:
+                    liberar_aviso(supabase, cli["id"], campo)
+                except Exception as e:
+                    print(f"Não consegui liberar {campo} do cliente {cli['id']}:", e)
+            raise
+
+        for (cli, dias, cart), novo in zip(meta, novos):
+            enviados.append({
+                "id": cli["id"], "nome": cli["nome"], "carteira": cart,
+                "dias": dias, "ok": True, "msg": "na fila de envio" if novo else "já estava na fila",
+            })
+
+    if itens:
+        acordar_worker()
+
+    if enviados:
+        obter_snapshot(supabase).invalidar()
+
+    status = {"executado_em": datetime.now().isoformat(timespec="seconds"), "enviados": enviados}
+    salvar_status(status)
+    return status
+
+
+def salvar_status(status: dict, caminho: str = ARQUIVO_STATUS):
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False, default=str)
+    os.replace(tmp, caminho)
+
+
+def ultimo_status(caminho: str = ARQUIVO_STATUS):
+    """Resumo da última execução (ou None se nunca rodou)."""
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def rodar_em_loop(supabase, intervalo: int = INTERVALO_PADRAO):
+    while True:
+        try:
+            executar(supabase)
+        except LockOcupado:
+            pass
+        except Exception as e:
+            print("Erro na rotina de renovações:", e)
+        time.sleep(intervalo)
+
+
+# ---------------------- WORKER (DENTRO DO APP) ----------------------
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def iniciar_worker(supabase, intervalo: int = INTERVALO_PADRAO) -> bool:
+    """Sobe a rotina em thread daemon, uma única vez por processo."""
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return False
+        _worker = threading.Thread(target=rodar_em_loop, args=(supabase, intervalo), daemon=True)
+        _worker.start()
+        return True
+
+
+# ---------------------- CLI ----------------------
+def main():
+    from supabase import create_client
+    from config import get_secret
+
+    parser = argparse.ArgumentParser(description="Envia os avisos de renovação devidos hoje.")
+    parser.add_argument("--loop", action="store_true", help="fica rodando a cada --intervalo segundos")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO_PADRAO)
+    args = parser.parse_args()
+
+    supabase = create_client(get_secret("SUPABASE_URL"), get_secret("SUPABASE_KEY"))
+
+    if args.loop:
+        iniciar_worker_outbox()
+        rodar_em_loop(supabase, args.intervalo)
+        return
+
+    try:
+        status = executar(supabase)
+    except LockOcupado:
+        print("Outra execução de renovações está em andamento.")
+        return
+    print(f"Avisos de renovação: {len(status['enviados'])} e-mails na fila.")
+    print(f"Outbox: {drenar_tudo(obter_outbox())} mensagens processadas — {obter_outbox().contagem()}")
+
+
+if __name__ == "__main__":
+    main()
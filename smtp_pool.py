@@ -0,0 +1,134 @@
+# smtp_pool.py
+# ------------------------------------------------------------
+# Pool de conexões SMTP autenticadas e reutilizáveis
+# - Abre no máximo `tamanho` conexões (STARTTLS + login uma vez só)
+# - Reaproveita a conexão entre mensagens; se ficou ociosa demais,
+#   confere com NOOP antes de usar
+# - Se a conexão caiu no meio do envio, reconecta e tenta de novo
+# - enviar_lote() distribui um lote inteiro entre as conexões
+# ------------------------------------------------------------
+
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Erros que indicam conexão quebrada (vale reconectar e reenviar)
+ERROS_CONEXAO = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class PoolSMTP:
+    def __init__(self, host: str, port: int, usuario: str = None, senha: str = None,
+                 tamanho: int = 2, starttls: bool = True, timeout: int = 30, ocioso_max: int = 60):
+        self.host = host
+        self.port = port
+        self.usuario = usuario
+        self.senha = senha
+        self.tamanho = max(1, int(tamanho))
+        self.starttls = starttls
+        self.timeout = timeout
+        self.ocioso_max = ocioso_max
+
+        self._livres = queue.LifoQueue()          # (conexão, último uso)
+        self._vagas = threading.BoundedSemaphore(self.tamanho)
+        self._abertas = []
+        self._lock = threading.Lock()
+
+    # ---------------------- CONEXÕES ----------------------
+    def _conectar(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.usuario and self.senha:
+            conn.login(self.usuario, self.senha)
+        with self._lock:
+            self._abertas.append(conn)
+        return conn
+
+    def _descartar(self, conn: smtplib.SMTP):
+        with self._lock:
+            if conn in self._abertas:
+                self._abertas.remove(conn)
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _viva(self, conn: smtplib.SMTP, ultimo_uso: float) -> bool:
+        if time.monotonic() - ultimo_uso < self.ocioso_max:
+            return True
+        try:
+            return conn.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _pegar(self) -> smtplib.SMTP:
+        self._vagas.acquire()
+        try:
+            while True:
+                try:
+                    conn, ultimo_uso = self._livres.get_nowait()
+                except queue.Empty:
+                    return self._conectar()
+                if self._viva(conn, ultimo_uso):
+                    return conn
+                self._descartar(conn)
+        except BaseException:
+            self._vagas.release()
+            raise
+
+    def _devolver(self, conn: smtplib.SMTP, quebrada: bool = False):
+        if quebrada:
+            self._descartar(conn)
+        else:
+            self._livres.put((conn, time.monotonic()))
+        self._vagas.release()
+
+    # ---------------------- ENVIO ----------------------
+    def enviar(self, remetente: str, destinatarios: list, mensagem: str):
+        """Envia uma mensagem já serializada. Devolve (ok, msg) como o resto do app."""
+        for tentativa in (1, 2):
+            try:
+                conn = self._pegar()
+            except Exception as e:
+                return False, str(e)
+            try:
+                conn.sendmail(remetente, destinatarios, mensagem)
+            except ERROS_CONEXAO as e:
+                self._devolver(conn, quebrada=True)
+                if tentativa == 2:
+                    return False, str(e)
+                continue
+            except smtplib.SMTPException as e:
+                # recusa do servidor (destinatário inválido etc.): conexão segue boa
+                self._devolver(conn)
+                return False, str(e)
+            except Exception as e:
+                self._devolver(conn, quebrada=True)
+                return False, str(e)
+            self._devolver(conn)
+            return True, "OK"
+
+    def enviar_lote(self, mensagens: list) -> list:
+        """
+        mensagens: lista de (remetente, destinatarios, mensagem_str).
+        Devolve a lista de (ok, msg) na mesma ordem.
+        """
+        if not mensagens:
+            return []
+        if len(mensagens) == 1 or self.tamanho == 1:
+            return [self.enviar(*m) for m in mensagens]
+        with ThreadPoolExecutor(max_workers=min(self.tamanho, len(mensagens))) as ex:
+            return list(ex.map(lambda m: self.enviar(*m), mensagens))
+
+    def fechar(self):
+        while True:
+            try:
+                conn, _ = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conn)
@@ -0,0 +1,357 @@
+# snapshot_clientes.py
+# ------------------------------------------------------------
+# Snapshot compartilhado da tabela `clientes`
+# - Uma carga completa por processo; depois só deltas, com TTL
+# - Invalidação explícita após insert/update/delete
+# - Todas as páginas leem o mesmo DataFrame normalizado
+# - Cópia em disco (cache_clientes.py), só dentro do Streamlit: o
+#   processo novo abre o arquivo e já renderiza; o delta com o
+#   Supabase roda em segundo plano e o arquivo é regravado a cada
+#   versão nova. CLIs e rotinas headless sempre leem do banco.
+#
+# Uso:
+#   from snapshot_clientes import obter_snapshot
+#   snap = obter_snapshot(supabase)
+#   df = snap.dataframe()
+#   ...
+#   snap.invalidar()   # depois de insert/update
+#   snap.sincronizar_agora()   # delta já, para leituras que não toleram atraso
+#   snap.remover(id)   # depois de delete
+#   snap.derivado("indice", IndiceBusca)   # refeito só quando a versão muda
+#
+# Sync incremental: requer a coluna `updated_at` mantida por trigger.
+# Uma vez, no SQL Editor do Supabase:
+#   alter table clientes add column if not exists updated_at timestamptz default now();
+#   create extension if not exists moddatetime;
+#   create trigger clientes_updated_at before update on clientes
+#     for each row execute procedure moddatetime (updated_at);
+# ------------------------------------------------------------
+
+import threading
+import time
+
+import pandas as pd
+
+import cache_clientes
+from carteiras import mascaras_da_serie, normalizar_carteiras
+
+# Tempo (segundos) que o snapshot fica válido sem nova sincronização
+TTL_PADRAO = 60
+
+# De quanto em quanto tempo (segundos) conferimos os ids para achar exclusões
+RECONCILIAR_A_CADA = 300
+
+# O delta volta esta margem (segundos) antes da marca d'água: uma transação
+# que grava updated_at antes e só comita depois da última leitura ainda é
+# pega; as linhas repetidas que a margem traz são descartadas no merge
+MARGEM_DELTA = 300
+
+# PostgREST devolve no máximo ~1000 linhas por requisição
+TAMANHO_PAGINA = 1000
+
+# Colunas que as páginas esperam encontrar sempre
+COLUNAS_BASE = [
+    "id", "nome", "telefone", "email", "carteiras",
+    "data_inicio", "data_fim", "pagamento", "valor", "observacao",
+]
+
+
+# ---------------------- NORMALIZAÇÃO ----------------------
+def normalizar_clientes(dados: list) -> pd.DataFrame:
+    """Converte o retorno cru do Supabase no DataFrame usado pelas páginas."""
+    df = pd.DataFrame(dados)
+
+    for col in COLUNAS_BASE:
+        if col not in df.columns:
+            df[col] = None
+
+    if df.empty:
+        return df
+
+    df["id"] = df["id"].astype(str)
+    df["carteiras"] = df["carteiras"].map(normalizar_carteiras)
+    # máscaras de bits (carteiras.py): filtros e Leads viram operações bitwise
+    df["carteiras_mask"], df["carteiras_mask_exp"] = mascaras_da_serie(df["carteiras"])
+    df["data_inicio"] = pd.to_datetime(df["data_inicio"], errors="coerce").dt.date
+    df["data_fim"] = pd.to_datetime(df["data_fim"], errors="coerce").dt.date
+    df["valor"] = pd.to_numeric(df["valor"], errors="coerce").fillna(0.0).astype(float)
+
+    return df.reset_index(drop=True)
+
+
+# ---------------------- SNAPSHOT (SYNC INCREMENTAL) ----------------------
+class SnapshotClientes:
+    """
+    Cópia local de `clientes` sincronizada por delta.
+
+    - 1ª leitura: carga completa (paginada) e registro da marca d'água
+    - Depois: só busca linhas com `updated_at` >= marca d'água − MARGEM_DELTA
+    - Exclusões: `remover()` local + reconciliação periódica dos ids
+      (e tombstones, se a tabela tiver `deleted_at`)
+    - Sem `updated_at` na tabela, cai para `created_at` e qualquer
+      invalidação volta a fazer carga completa (comportamento antigo)
+    """
+
+    def __init__(self, supabase, ttl: int = TTL_PADRAO, reconciliar_a_cada: int = RECONCILIAR_A_CADA,
+                 cache: str = None):
+        self.supabase = supabase
+        self.ttl = ttl
+        self.reconciliar_a_cada = reconciliar_a_cada
+        self.cache = cache            # caminho do arquivo local; None = sem cópia em disco
+        self._versao_salva = None
+        self._df = None
+        self.versao = 0            # muda a cada alteração do DataFrame (índices derivados usam)
+        self._coluna_marca = None
+        self._marca_dagua = None
+        self._sincronizado_em = 0.0
+        self._reconciliado_em = 0.0
+        self._lock = threading.Lock()
+        self._derivados = {}          # chave -> (versão, objeto) — ver derivado()
+
+    # ---------- consultas ao Supabase ----------
+    def _buscar_paginado(self, montar_query) -> list:
+        dados = []
+        inicio = 0
+        while True:
+            lote = montar_query().range(inicio, inicio + TAMANHO_PAGINA - 1).execute().data or []
+            dados.extend(lote)
+            if len(lote) < TAMANHO_PAGINA:
+                return dados
+            inicio += TAMANHO_PAGINA
+
+    def _buscar_tudo(self) -> list:
+        return self._buscar_paginado(
+            lambda: self.supabase.table("clientes").select("*").order("created_at", desc=True)
+        )
+
+    def _buscar_delta(self, col: str, marca) -> list:
+        desde = (pd.Timestamp(marca) - pd.Timedelta(seconds=MARGEM_DELTA)).isoformat()
+        return self._buscar_paginado(
+            lambda: self.supabase.table("clientes").select("*").gte(col, desde).order(col)
+        )
+
+    def _buscar_ids(self) -> set:
+        dados = self._buscar_paginado(lambda: self.supabase.table("clientes").select("id").order("id"))
+        return {str(r["id"]) for r in dados}
+
+    def _carga_completa(self):
+        self._aplicar_carga(self._buscar_tudo())
+
+    def _aplicar_carga(self, dados: list):
+        self._coluna_marca = "updated_at" if any("updated_at" in r for r in dados) else "created_at"
+        self._marca_dagua = _maior_marca(dados, self._coluna_marca)
+        self._df = _ordenar(normalizar_clientes(_sem_tombstones(dados)))
+        self.versao += 1
+        agora = time.monotonic()
+        self._sincronizado_em = agora
+        self._reconciliado_em = agora
+
+    def _sync_delta(self):
+        if self._marca_dagua is None:
+            self._carga_completa()
+            return
+
+        self._aplicar_delta(self._buscar_delta(self._coluna_marca, self._marca_dagua))
+
+    def _aplicar_delta(self, delta: list):
+        col = self._coluna_marca
+        if delta:
+            self._marca_dagua = max(self._marca_dagua, _maior_marca(delta, col), key=pd.Timestamp)
+            delta = _so_alteradas(self._df, delta, col)
+        if delta:
+            ids_delta = {str(r["id"]) for r in delta}
+            vivos = normalizar_clientes(_sem_tombstones(delta))
+            base = self._df[~self._df["id"].isin(ids_delta)]
+            self._df = _ordenar(pd.concat([base, vivos], ignore_index=True) if not vivos.empty else base)
+            self.versao += 1
+        self._sincronizado_em = time.monotonic()
+
+    def _reconciliar_ids(self):
+        """Remove do cache linhas apagadas no banco por outro processo."""
+        self._aplicar_ids(self._buscar_ids())
+
+    def _aplicar_ids(self, ids: set):
+        antes = len(self._df)
+        self._df = self._df[self._df["id"].isin(ids)].reset_index(drop=True)
+        if len(self._df) != antes:
+            self.versao += 1
+        self._reconciliado_em = time.monotonic()
+
+    # ---------- cópia em disco ----------
+    def _meta_cache(self) -> dict:
+        return {
+            "supabase_url": getattr(self.supabase, "supabase_url", None),
+            "coluna_marca": self._coluna_marca,
+            "marca_dagua": self._marca_dagua,
+        }
+
+    def _abrir_cache(self) -> bool:
+        """Sobe o snapshot do arquivo local e agenda a reconciliação em segundo plano."""
+        carregado = cache_clientes.carregar(self.cache) if self.cache else None
+        if carregado is None:
+            return False
+        df, meta = carregado
+        if meta.get("supabase_url") != self._meta_cache()["supabase_url"] or not meta.get("coluna_marca"):
+            return False
+
+        self._df = _ordenar(df)
+        self._coluna_marca = meta["coluna_marca"]
+        self._marca_dagua = meta.get("marca_dagua")
+        self.versao += 1
+        self._versao_salva = self.versao
+        agora = time.monotonic()
+        self._sincronizado_em = agora
+        self._reconciliado_em = agora
+        threading.Thread(target=self._reconciliar_em_fundo, daemon=True).start()
+        return True
+
+    def _reconciliar_em_fundo(self):
+        """Delta + ids fora do lock (rede); só a aplicação segura o lock."""
+        with self._lock:
+            col, marca = self._coluna_marca, self._marca_dagua
+        try:
+            if col == "updated_at" and marca is not None:
+                delta, ids = self._buscar_delta(col, marca), self._buscar_ids()
+                with self._lock:
+                    # se uma sync em primeiro plano (ou recarregar) passou na frente, ela vale
+                    if self._df is not None and self._marca_dagua == marca:
+                        self._aplicar_delta(delta)
+                        self._aplicar_ids(ids)
+                        self._salvar_cache()
+            else:
+                dados = self._buscar_tudo()
+                with self._lock:
+                    if self._df is not None and self._marca_dagua == marca:
+                        self._aplicar_carga(dados)
+                        self._salvar_cache()
+        except Exception as e:
+            print("Erro ao reconciliar o cache de clientes:", e)
+            with self._lock:
+                self._sincronizado_em = 0.0   # próxima leitura sincroniza normalmente
+
+    def _salvar_cache(self):
+        if not self.cache or self._df is None or self.versao == self._versao_salva:
+            return
+        try:
+            cache_clientes.salvar(self._df, self._meta_cache(), self.cache)
+        except Exception as e:
+            print("Erro ao gravar o cache de clientes:", e)
+        self._versao_salva = self.versao
+
+    def _sincronizar(self):
+        agora = time.monotonic()
+        if self._df is None:
+            if not self._abrir_cache():
+                self._carga_completa()
+        elif agora - self._sincronizado_em > self.ttl:
+            if self._coluna_marca == "updated_at":
+                self._sync_delta()
+            else:
+                self._carga_completa()
+        if agora - self._reconciliado_em > self.reconciliar_a_cada:
+            self._reconciliar_ids()
+        self._salvar_cache()
+
+    # ---------- API ----------
+    def dataframe(self) -> pd.DataFrame:
+        """Devolve uma cópia do snapshot (a página pode alterá-la à vontade)."""
+        with self._lock:
+            self._sincronizar()
+            return self._df.copy()
+
+    def derivado(self, chave, fabrica):
+        """
+        Estrutura derivada do snapshot (índice, série, matriz...), guardada
+        por `chave` e refeita com fabrica(df) só quando a versão muda.
+        fabrica recebe o DataFrame interno (sem cópia): não pode alterá-lo.
+        """
+        with self._lock:
+            self._sincronizar()
+            versao, df = self.versao, self._df
+            guardado = self._derivados.get(chave)
+            if guardado is not None and guardado[0] == versao:
+                return guardado[1]
+
+        # fora do lock: montar um índice grande não trava quem só quer ler
+        objeto = fabrica(df)
+        with self._lock:
+            if self.versao == versao:
+                self._derivados = {k: v for k, v in self._derivados.items() if v[0] == versao}
+                self._derivados[chave] = (versao, objeto)
+        return objeto
+
+    def sincronizar_agora(self):
+        """
+        Delta com o banco agora, sem esperar o TTL (nem o arquivo local:
+        sem snapshot em memória, carga completa). Para quem não pode ler
+        atrasado, como os avisos de renovação.
+        """
+        with self._lock:
+            if self._df is not None and self._coluna_marca == "updated_at":
+                self._sync_delta()
+            else:
+                self._carga_completa()
+            self._salvar_cache()
+
+    def invalidar(self):
+        """Força sincronização no próximo acesso (chamar após insert/update)."""
+        with self._lock:
+            self._sincronizado_em = 0.0
+
+    def remover(self, cliente_id):
+        """Tira o cliente do cache na hora (chamar após delete)."""
+        with self._lock:
+            if self._df is not None:
+                self._df = self._df[self._df["id"] != str(cliente_id)].reset_index(drop=True)
+                self.versao += 1
+
+
+def _maior_marca(dados: list, coluna: str):
+    valores = [r[coluna] for r in dados if r.get(coluna)]
+    return max(valores, key=pd.Timestamp) if valores else None
+
+
+def _so_alteradas(df: pd.DataFrame, delta: list, col: str) -> list:
+    """Tira do delta as linhas que o snapshot já tem com o mesmo `col` (vindas pela margem)."""
+    if col not in df.columns:
+        return delta
+    ids = {str(r["id"]) for r in delta}
+    atuais = df.loc[df["id"].isin(ids), ["id", col]]
+    conhecidas = dict(zip(atuais["id"], atuais[col]))
+    return [r for r in delta if str(r["id"]) not in conhecidas or conhecidas[str(r["id"])] != r.get(col)]
+
+
+def _sem_tombstones(dados: list) -> list:
+    return [r for r in dados if not r.get("deleted_at")]
+
+
+def _ordenar(df: pd.DataFrame) -> pd.DataFrame:
+    if "created_at" in df.columns:
+        df = df.sort_values("created_at", ascending=False, kind="stable")
+    return df.reset_index(drop=True)
+
+
+_SNAPSHOT = None
+_SNAPSHOT_LOCK = threading.Lock()
+
+
+def _no_streamlit() -> bool:
+    try:
+        from streamlit import runtime
+        return runtime.exists()
+    except Exception:
+        return False
+
+
+def obter_snapshot(supabase, ttl: int = TTL_PADRAO) -> SnapshotClientes:
+    """
+    Snapshot único do processo — compartilhado entre páginas e sessões.
+    A cópia em disco só vale no app: fora dele (CLI, cron) a 1ª leitura é
+    sempre uma carga completa do banco.
+    """
+    global _SNAPSHOT
+    with _SNAPSHOT_LOCK:
+        if _SNAPSHOT is None:
+            cache = cache_clientes.ARQUIVO_CACHE if _no_streamlit() else None
+            _SNAPSHOT = SnapshotClientes(supabase, ttl=ttl, cache=cache)
+        return _SNAPSHOT
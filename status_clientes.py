@@ -0,0 +1,79 @@
+# status_clientes.py
+# ------------------------------------------------------------
+# Status de vigência e KPIs dos clientes, sem apply linha a linha
+# - data_fim vira datetime64 e os dias restantes saem numa
+#   subtração vetorizada
+# - np.select classifica tudo numa passada:
+#       lead | vencido | a iniciar | vencendo (≤ 30 dias) | ativo
+# - "Ativo" é a regra única de linha_do_tempo.py (data_inicio <= hoje
+#   <= data_fim): ativo + vencendo hoje = LinhaDoTempo.ativos_em(hoje),
+#   o número da página de MRR e do relatório; quem começa no futuro
+#   fica "a iniciar" e quem não tem data_inicio fica sem status
+# - Tabela e relatório usam a mesma coluna de status; os cards do
+#   dashboard contam pela mesma regra (indice_vencimentos.py)
+#
+# Uso:
+#   df["status"] = calcular_status(df)
+#   df["status"].map(ROTULOS_TABELA)
+# ------------------------------------------------------------
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from carteiras import BIT_LEADS, mascaras_da_serie
+
+DIAS_VENCENDO = 30
+
+LEAD = "lead"
+VENCIDO = "vencido"
+VENCENDO = "vencendo"
+ATIVO = "ativo"
+A_INICIAR = "a_iniciar"
+
+# Texto da coluna "Status Vigência" na tabela de clientes
+ROTULOS_TABELA = {
+    LEAD: "⚪ Lead",
+    VENCIDO: "🔴 Vencida",
+    VENCENDO: "🟡 < 30 dias",
+    ATIVO: "🟢 > 30 dias",
+    A_INICIAR: "🔵 A iniciar",
+}
+
+# Opções do filtro de vigência → status
+FILTROS_STATUS = {
+    "🟢 Ativos": ATIVO,
+    "🟡 Vencendo (≤ 30 dias)": VENCENDO,
+    "🔴 Vencidos": VENCIDO,
+    "🔵 A iniciar": A_INICIAR,
+}
+
+
+def mascara_leads(df: pd.DataFrame) -> pd.Series:
+    """True onde as carteiras contêm "Leads" (usa a máscara do snapshot se existir)."""
+    m = df["carteiras_mask"] if "carteiras_mask" in df.columns else mascaras_da_serie(df["carteiras"])[0]
+    return (m & BIT_LEADS) != 0
+
+
+def dias_restantes(data_fim: pd.Series, hoje: date = None) -> pd.Series:
+    """Dias até data_fim (negativo = já venceu; NaN se não houver data)."""
+    hoje = pd.Timestamp(hoje or date.today())
+    return (pd.to_datetime(data_fim, errors="coerce") - hoje).dt.days
+
+
+def calcular_status(df: pd.DataFrame, hoje: date = None) -> pd.Series:
+    """Status de cada linha; "" para quem não tem data_fim/data_inicio (e não é Lead)."""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+
+    dias = dias_restantes(df["data_fim"], hoje)
+    ja_comecou = dias_restantes(df["data_inicio"], hoje)   # <= 0: começou; NaN: sem data
+    status = np.select(
+        [mascara_leads(df), dias < 0, ja_comecou > 0, ja_comecou.isna(),
+         dias <= DIAS_VENCENDO, dias > DIAS_VENCENDO],
+        [LEAD, VENCIDO, A_INICIAR, "", VENCENDO, ATIVO],
+        default="",
+    )
+    return pd.Series(status, index=df.index, dtype=object)
+
@@ -0,0 +1,255 @@
+# telegram_envio.py
+# ------------------------------------------------------------
+# Agendador único das chamadas de saída para a API do Telegram
+# - Balde de tokens global (~30 req/s do bot inteiro) e um balde
+#   por chat: 1 msg/s em conversa privada, 20/min em grupo
+# - 429: respeita o retry_after — o chat (ou as chamadas sem chat,
+#   ex.: ban/unban) fica pausado e a chamada volta para a fila
+# - Falha de rede: nova tentativa (com backoff) só quando é seguro:
+#   a conexão nem chegou a abrir (o pedido não saiu) ou o método é
+#   idempotente (ban/unban, consultas). Timeout de leitura num
+#   sendMessage não se repete — a mensagem pode já ter sido aceita
+#   e sairia em dobro. Nada é descartado em silêncio: o chamador
+#   sempre recebe a resposta ou a exceção
+# - Métricas: profundidade da fila, em voo, espera na fila e
+#   latência da API (p50/p95)
+#
+# Uso:
+#   agendador = AgendadorTelegram(lambda metodo, payload: ...)
+#   fut = agendador.enviar("sendMessage", {...}, chat_id=123)
+#   fut.result()                        # resposta JSON do Telegram
+#   agendador.chamar("banChatMember", {...})   # atalho síncrono
+# ------------------------------------------------------------
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+LIMITE_GLOBAL = 30          # req/s para o bot todo
+LIMITE_PRIVADO = 1.0        # msg/s por conversa privada
+LIMITE_GRUPO = 20 / 60      # msg/s por grupo (20 por minuto)
+MAX_BALDES = 10000          # baldes por chat mantidos em memória (LRU)
+MAX_TENTATIVAS_429 = 10
+MAX_TENTATIVAS_REDE = 4
+BACKOFF_REDE = 1            # segundos; dobra a cada falha
+
+# repetir depois de um erro qualquer não muda o efeito destes métodos
+METODOS_IDEMPOTENTES = {"banChatMember", "unbanChatMember", "getChatMember", "getChat", "getMe"}
+
+
+def falhou_antes_do_envio(e: Exception) -> bool:
+    """True só se a conexão não abriu: o Telegram com certeza não recebeu o pedido."""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(e, requests.exceptions.ConnectionError) and e.args:
+        motivo = getattr(e.args[0], "reason", e.args[0])   # MaxRetryError → causa
+        return isinstance(motivo, NewConnectionError)
+    return False
+
+
+class BaldeTokens:
+    """Token bucket. `reservar` já consome e devolve o instante (monotonic) em que a vez chega."""
+
+    def __init__(self, taxa: float, capacidade: float = 1):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora: float):
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def reservar(self) -> float:
+        with self._lock:
+            agora = time.monotonic()
+            self._repor(agora)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return agora
+            return agora + (-self._tokens) / self.taxa
+
+    def espera(self) -> float:
+        """Segundos até haver um token inteiro (0 se já há; não consome)."""
+        with self._lock:
+            self._repor(time.monotonic())
+            return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.taxa
+
+
+class _Chamada:
+    __slots__ = ("metodo", "payload", "chat", "future", "criado_em", "tentativas_429", "tentativas_rede")
+
+    def __init__(self, metodo, payload, chat):
+        self.metodo = metodo
+        self.payload = payload
+        self.chat = chat
+        self.future = Future()
+        self.criado_em = time.monotonic()
+        self.tentativas_429 = 0
+        self.tentativas_rede = 0
+
+
+def _percentis(valores) -> dict:
+    if not valores:
+        return {"p50_ms": None, "p95_ms": None}
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    return {
+        "p50_ms": round(ordenados[n // 2] * 1000, 1),
+        "p95_ms": round(ordenados[min(n - 1, int(n * 0.95))] * 1000, 1),
+    }
+
+
+class AgendadorTelegram:
+    def __init__(self, chamar_api, workers: int = 8, limite_global: float = LIMITE_GLOBAL):
+        """chamar_api(metodo, payload) -> dict (JSON do Telegram); pode levantar exceção de rede."""
+        self.chamar_api = chamar_api
+        self.workers = workers
+        self._global = BaldeTokens(limite_global, capacidade=limite_global)
+        self._baldes = OrderedDict()    # chat_id -> BaldeTokens
+        self._pausas = {}               # chat_id (None = chamadas sem chat) -> monotonic de liberação
+        self._fila = []                 # heap de (pronto_em, seq, _Chamada)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+
+        self._em_voo = 0
+        self._contadores = {"enviadas": 0, "erros": 0, "limitadas_429": 0, "retentativas_rede": 0}
+        self._esperas = deque(maxlen=1000)
+        self._latencias = deque(maxlen=1000)
+
+    # ---------------------- ENTRADA ----------------------
+    def enviar(self, metodo: str, payload: dict, chat_id=None) -> Future:
+        """
+        Agenda a chamada. `chat_id` liga o limite por chat (mensagens);
+        ações administrativas (ban/unban) passam sem chat e só contam no global.
+        """
+        chamada = _Chamada(metodo, payload, chat_id)
+        with self._cond:
+            self._iniciar_threads()
+            heapq.heappush(self._fila, (chamada.criado_em, next(self._seq), chamada))
+            self._cond.notify()
+        return chamada.future
+
+    def chamar(self, metodo: str, payload: dict, chat_id=None, timeout: float = None) -> dict:
+        return self.enviar(metodo, payload, chat_id).result(timeout)
+
+    def metricas(self) -> dict:
+        with self._cond:
+            return {
+                "fila": len(self._fila),
+                "em_voo": self._em_voo,
+                "chats_pausados": sum(1 for ate in self._pausas.values() if ate > time.monotonic()),
+                **self._contadores,
+                "espera_fila": _percentis(list(self._esperas)),
+                "latencia_api": _percentis(list(self._latencias)),
+            }
+
+    # ---------------------- INTERNOS ----------------------
+    def _balde(self, chat_id) -> BaldeTokens:
+        with self._cond:
+            balde = self._baldes.get(chat_id)
+            if balde is None:
+                # grupos/canais: id negativo ou "@username"
+                taxa = LIMITE_GRUPO if str(chat_id).startswith(("-", "@")) else LIMITE_PRIVADO
+                balde = self._baldes[chat_id] = BaldeTokens(taxa)
+                if len(self._baldes) > MAX_BALDES:
+                    self._baldes.popitem(last=False)
+            else:
+                self._baldes.move_to_end(chat_id)
+            return balde
+
+    def _iniciar_threads(self):
+        # chamado com self._cond adquirido; sobe os workers só no 1º envio
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"telegram-envio-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _reagendar(self, chamada: _Chamada, pronto: float):
+        with self._cond:
+            heapq.heappush(self._fila, (pronto, next(self._seq), chamada))
+            self._cond.notify()
+
+    def _proxima(self) -> _Chamada:
+        with self._cond:
+            while True:
+                if not self._fila:
+                    self._cond.wait()
+                    continue
+                pronto, _, chamada = self._fila[0]
+                agora = time.monotonic()
+                balde = self._balde(chamada.chat) if chamada.chat is not None else None
+                espera_balde = balde.espera() if balde else 0
+                pronto = max(pronto, self._pausas.get(chamada.chat, 0), agora + espera_balde if espera_balde else 0)
+                if pronto > agora:
+                    if pronto > self._fila[0][0] + 0.001:
+                        # chat sem token (ou pausado por 429): volta para a fila na vez dele,
+                        # atrás das outras chamadas do mesmo chat que já estavam lá
+                        heapq.heapreplace(self._fila, (pronto, next(self._seq), chamada))
+                        continue
+                    self._cond.wait(pronto - agora)
+                    continue
+                heapq.heappop(self._fila)
+                if balde:
+                    balde.reservar()
+                self._em_voo += 1
+                return chamada
+
+    def _worker(self):
+        while True:
+            chamada = self._proxima()
+            espera = self._global.reservar() - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            try:
+                self._executar(chamada)
+            finally:
+                with self._cond:
+                    self._em_voo -= 1
+
+    def _executar(self, chamada: _Chamada):
+        inicio = time.monotonic()
+        try:
+            resposta = self.chamar_api(chamada.metodo, chamada.payload)
+        except Exception as e:
+            chamada.tentativas_rede += 1
+            repetivel = chamada.metodo in METODOS_IDEMPOTENTES or falhou_antes_do_envio(e)
+            if repetivel and chamada.tentativas_rede < MAX_TENTATIVAS_REDE:
+                with self._cond:
+                    self._contadores["retentativas_rede"] += 1
+                self._reagendar(chamada, time.monotonic() + BACKOFF_REDE * 2 ** (chamada.tentativas_rede - 1))
+                return
+            with self._cond:
+                self._contadores["erros"] += 1
+            chamada.future.set_exception(e)
+            return
+
+        fim = time.monotonic()
+        with self._cond:
+            self._latencias.append(fim - inicio)
+
+        if resposta.get("error_code") == 429 and chamada.tentativas_429 < MAX_TENTATIVAS_429:
+            chamada.tentativas_429 += 1
+            liberar = fim + resposta.get("parameters", {}).get("retry_after", 1)
+            with self._cond:
+                self._contadores["limitadas_429"] += 1
+                self._pausas[chamada.chat] = max(self._pausas.get(chamada.chat, 0), liberar)
+                if len(self._pausas) > MAX_BALDES:
+                    self._pausas = {k: v for k, v in self._pausas.items() if v > fim}
+            self._reagendar(chamada, liberar)
+            return
+
+        with self._cond:
+            self._esperas.append(inicio - chamada.criado_em)
+            self._contadores["enviadas" if resposta.get("ok") else "erros"] += 1
+        chamada.future.set_result(resposta)
@@ -0,0 +1,96 @@
+# templates_email.py
+# ------------------------------------------------------------
+# Motor de templates dos e-mails
+# - Cada template é "compilado" uma vez (no import): o HTML vira
+#   uma lista de trechos fixos intercalados com slots nomeados
+# - Placeholders estáticos (botões Google, WhatsApp) já entram
+#   resolvidos na compilação
+# - Renderizar = preencher os slots + um único "".join
+#
+# Uso:
+#   tpl = compilar(html, slots={"[[nome]]": "nome"}, estaticos={"{WHATSAPP_BTN}": WHATSAPP_BTN})
+#   tpl.render(nome="Maria")
+#   tpl.render_lote([{"nome": "Maria"}, {"nome": "João"}])
+# ------------------------------------------------------------
+
+import re
+
+
+class TemplateCompilado:
+    __slots__ = ("partes", "slots")
+
+    def __init__(self, partes: list, slots: list):
+        self.partes = partes   # trechos fixos; posições de slot ficam com ""
+        self.slots = slots     # lista de (posição em partes, nome do slot)
+
+    def render(self, **valores) -> str:
+        partes = self.partes.copy()
+        for pos, nome in self.slots:
+            partes[pos] = valores.get(nome) or ""
+        return "".join(partes)
+
+    def render_lote(self, lista_valores: list) -> list:
+        """Mesmo template para muitos destinatários (lista de dicts de valores)."""
+        base, slots = self.partes, self.slots
+        saida = []
+        for valores in lista_valores:
+            partes = base.copy()
+            for pos, nome in slots:
+                partes[pos] = valores.get(nome) or ""
+            saida.append("".join(partes))
+        return saida
+
+
+def compilar(texto: str, slots: dict = None, estaticos: dict = None,
+             ancora: str = None, slot_ancora: str = None) -> TemplateCompilado:
+    """
+    slots:      token -> nome do slot (preenchido no render)
+    estaticos:  token -> HTML fixo (resolvido agora)
+    ancora:     se informado, `slot_ancora` entra logo antes da 1ª ocorrência
+                da âncora (ou no fim, se ela não existir)
+    """
+    slots = slots or {}
+    estaticos = estaticos or {}
+
+    # a âncora só vale na 1ª ocorrência: separa o texto antes de tokenizar
+    pedacos = [texto]
+    if ancora and slot_ancora:
+        i = texto.find(ancora)
+        pedacos = [texto, None] if i < 0 else [texto[:i], None, texto[i:]]
+
+    tokens = sorted(set(slots) | set(estaticos), key=len, reverse=True)
+    padrao = re.compile("|".join(map(re.escape, tokens))) if tokens else None
+
+    partes, posicoes = [], []
+    buffer = []
+
+    def fechar_literal():
+        if buffer:
+            partes.append("".join(buffer))
+            buffer.clear()
+
+    def abrir_slot(nome):
+        fechar_literal()
+        posicoes.append((len(partes), nome))
+        partes.append("")
+
+    for pedaco in pedacos:
+        if pedaco is None:
+            abrir_slot(slot_ancora)
+            continue
+        if padrao is None:
+            buffer.append(pedaco)
+            continue
+        fim_anterior = 0
+        for m in padrao.finditer(pedaco):
+            buffer.append(pedaco[fim_anterior:m.start()])
+            token = m.group(0)
+            if token in estaticos:
+                buffer.append(estaticos[token])
+            else:
+                abrir_slot(slots[token])
+            fim_anterior = m.end()
+        buffer.append(pedaco[fim_anterior:])
+
+    fechar_literal()
+    return TemplateCompilado(partes, posicoes)